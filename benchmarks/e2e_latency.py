@@ -0,0 +1,187 @@
+"""
+End-to-end latency benchmark — drives lambda_handler with the recorded Slack
+events in benchmarks/events/ (signed like Slack does) against local stand-ins
+for the Slack Web API, OpenAI and DynamoDB, and reports per path:
+
+- time to first update: from invocation to the first Slack write carrying
+  model output (status messages like "이전 대화 내용 확인 중..." don't count)
+- total time of the invocation
+- Slack Web API calls per event
+- message text sent to Slack per event (full rewrites with chat.update,
+  only the new text with --renderer native)
+
+    $ python benchmarks/e2e_latency.py --runs 20 --tokens-per-second 50 --slack-latency 30
+
+The stand-ins are in benchmarks/standins.py; no network access is needed.
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+import types
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EVENTS = os.path.join(ROOT, "benchmarks", "events")
+PATHS = ["text", "emoji", "image", "vision"]
+
+SIGNING_SECRET = "benchmark-signing-secret"
+
+sys.path.insert(0, ROOT)
+
+from benchmarks.standins import DynamoDBStandIn, OpenAIStandIn, SlackStandIn  # noqa: E402
+
+
+# Point the bot at the stand-ins; must run before handler is imported
+def configure(slack, openai, dynamodb, engine, rate_limit, state, renderer):
+    os.environ.update({
+        "SLACK_BOT_TOKEN": "xoxb-benchmark",
+        "SLACK_SIGNING_SECRET": SIGNING_SECRET,
+        "SLACK_BOT_ID": "U_BENCH_BOT",
+        "SLACK_API_URL": slack.url + "/api/",
+        "OPENAI_ORG_ID": "None",
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_BASE_URL": openai.url + "/v1",
+        "OPENAI_MODEL": "gpt-5.4",
+        "AWS_ENDPOINT_URL_DYNAMODB": dynamodb.url,
+        "AWS_DEFAULT_REGION": "us-east-1",
+        "AWS_ACCESS_KEY_ID": "benchmark",
+        "AWS_SECRET_ACCESS_KEY": "benchmark",
+        "DYNAMODB_TABLE_NAME": "benchmark",
+        "ENGINE": engine,
+        "SLACK_RATE_LIMIT": "true" if rate_limit else "false",
+        "STATE_BACKEND": state,
+        "STREAM_RENDERER": renderer,
+    })
+
+
+# Fill in a recorded event and wrap it like API Gateway (HTTP API) does
+def make_event(path, slack_url, index):
+    with open(os.path.join(EVENTS, path + ".json")) as f:
+        template = f.read()
+
+    ts = "{}.{:06d}".format(int(time.time()), index)
+    body = (
+        template.replace("{client_msg_id}", str(uuid.uuid4()))
+        .replace("{event_id}", "Ev" + uuid.uuid4().hex[:10])
+        .replace("{thread_ts}", "{}.{:06d}".format(1700000000 + index, 0))
+        .replace("{ts}", ts)
+        .replace("{slack_url}", slack_url)
+    )
+    body = json.dumps(json.loads(body))
+
+    timestamp = str(int(time.time()))
+    base = "v0:{}:{}".format(timestamp, body).encode("utf-8")
+    signature = "v0=" + hmac.new(SIGNING_SECRET.encode("utf-8"), base, hashlib.sha256).hexdigest()
+
+    return {
+        "body": body,
+        "isBase64Encoded": False,
+        "headers": {
+            "content-type": "application/json",
+            "x-slack-request-timestamp": timestamp,
+            "x-slack-signature": signature,
+        },
+        "requestContext": {"http": {"method": "POST"}},
+    }
+
+
+# Nearest-rank percentile
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    index = max(0, min(len(values) - 1, round(p / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--paths", default=",".join(PATHS))
+    parser.add_argument("--engine", default="sync", choices=["sync", "async"])
+    parser.add_argument("--slack-latency", type=float, default=30, help="ms per Slack API call")
+    parser.add_argument("--first-token", type=float, default=300, help="ms before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    parser.add_argument("--reply-tokens", type=int, default=200)
+    parser.add_argument("--history", type=int, default=4, help="prior messages in each thread")
+    parser.add_argument("--state", default="dynamodb", choices=["dynamodb", "sqlite", "memory"])
+    parser.add_argument("--renderer", default="update", choices=["update", "native"])
+    parser.add_argument("--rate-limit", action="store_true", help="pace Slack calls like production")
+    parser.add_argument("--verbose", action="store_true", help="keep the bot's own log output")
+    args = parser.parse_args()
+
+    slack = SlackStandIn(args.slack_latency / 1000, args.history).start()
+    openai = OpenAIStandIn(args.first_token / 1000, args.tokens_per_second, args.reply_tokens).start()
+    dynamodb = DynamoDBStandIn().start()
+
+    configure(slack, openai, dynamodb, args.engine, args.rate_limit, args.state, args.renderer)
+
+    import handler
+
+    statuses = {handler.MSG_PREVIOUS, handler.MSG_IMAGE_DESCRIBE, handler.MSG_IMAGE_GENERATE, handler.BOT_CURSOR}
+    context = types.SimpleNamespace(
+        function_name="benchmark",
+        invoked_function_arn="arn:aws:lambda:us-east-1:000000000000:function:benchmark",
+    )
+
+    print("{:<8} {:>4} {:>22} {:>22} {:>12} {:>12}".format(
+        "path", "n", "first update p50/95/99", "total p50/95/99", "slack calls", "slack KB"
+    ))
+
+    index = 0
+    for path in args.paths.split(","):
+        first_updates, totals, calls, sent = [], [], [], []
+
+        for _ in range(args.runs):
+            index += 1
+            event = make_event(path, slack.url, index)
+            slack.reset()
+
+            stdout = sys.stdout
+            if not args.verbose:
+                sys.stdout = open(os.devnull, "w")
+            try:
+                started = time.perf_counter()
+                response = handler.lambda_handler(event, context)
+                finished = time.perf_counter()
+            finally:
+                if not args.verbose:
+                    sys.stdout.close()
+                    sys.stdout = stdout
+
+            if response.get("statusCode") != 200:
+                raise SystemExit("{}: lambda_handler returned {}".format(path, response))
+            if slack.problems():
+                raise SystemExit("{}: {}".format(path, "; ".join(slack.problems())))
+
+            writes = [
+                (at, params.get("text") or params.get("markdown_text") or "")
+                for at, api, params in slack.calls
+                if api in ("chat.update", "chat.postMessage", "chat.startStream", "chat.appendStream", "chat.stopStream")
+            ]
+            updates = [at for at, text in writes if text and text not in statuses]
+            if updates:
+                first_updates.append(updates[0] - started)
+            totals.append(finished - started)
+            calls.append(len(slack.calls))
+            sent.append(sum(len(text.encode("utf-8")) for _, text in writes))
+
+        def row(values):
+            return "{:>6.0f} {:>6.0f} {:>6.0f}ms".format(*(percentile(values, p) * 1000 for p in (50, 95, 99)))
+
+        print("{:<8} {:>4} {:>22} {:>22} {:>12.1f} {:>12.1f}".format(
+            path, len(totals), row(first_updates), row(totals), sum(calls) / len(calls),
+            sum(sent) / len(sent) / 1024,
+        ))
+
+    for stand_in in (slack, openai, dynamodb):
+        stand_in.stop()
+
+
+if __name__ == "__main__":
+    main()
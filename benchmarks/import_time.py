@@ -0,0 +1,98 @@
+"""
+Cold-start benchmark — measures `import handler` in a fresh interpreter,
+with the cost of each top-level module broken out (python -X importtime),
+plus the first Slack challenge handshake.
+
+    $ python benchmarks/import_time.py --repeat 5
+
+No network access is needed: clients are built lazily and the challenge
+is answered before any of them is touched.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENV = {
+    "SLACK_BOT_TOKEN": "xoxb-benchmark",
+    "SLACK_SIGNING_SECRET": "benchmark",
+    "SLACK_BOT_ID": "U_BENCHMARK",
+    "OPENAI_ORG_ID": "None",
+    "OPENAI_API_KEY": "sk-benchmark",
+    "AWS_DEFAULT_REGION": "us-east-1",
+}
+
+SCRIPT = """
+import json, time
+started = time.perf_counter()
+import handler
+imported = time.perf_counter()
+handler.lambda_handler({"body": json.dumps({"challenge": "x"})}, None)
+answered = time.perf_counter()
+print(json.dumps({"import": imported - started, "challenge": answered - imported}))
+"""
+
+
+# Run one cold start and return (timings, per-module cumulative seconds)
+def cold_start():
+    env = dict(os.environ, **ENV)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        # Keep handler and the modules it imports directly (one indent level)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            modules[name.strip()] = modules.get(name.strip(), 0.0) + int(cumulative) / 1e6
+
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [cold_start() for _ in range(args.repeat)]
+
+    print("{:<40} {:>10}".format("phase", "median ms"))
+    for phase in ["import", "challenge"]:
+        value = statistics.median(t[phase] for t, _ in runs)
+        print("{:<40} {:>10.1f}".format(phase, value * 1000))
+
+    names = set()
+    for _, modules in runs:
+        names.update(modules)
+
+    costs = {
+        name: statistics.median(m.get(name, 0.0) for _, m in runs)
+        for name in names
+    }
+
+    print()
+    print("{:<40} {:>10}".format("module (cumulative)", "median ms"))
+    for name, value in sorted(costs.items(), key=lambda x: -x[1])[: args.top]:
+        print("{:<40} {:>10.1f}".format(name, value * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Peak-memory benchmark for reply_image — measures, with tracemalloc, how much
+memory reply_image allocates on top of the OpenAI response for each image
+size, next to a full in-memory decode for reference.
+
+    $ python benchmarks/reply_image_memory.py --bytes-per-pixel 2
+
+OpenAI and Slack are replaced by in-process fakes; the upload fake reads the
+file object in 64 KiB chunks like the HTTP client does.
+"""
+
+import argparse
+import base64
+import os
+import sys
+import tracemalloc
+from unittest.mock import MagicMock, patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("SLACK_BOT_TOKEN", "xoxb-benchmark")
+os.environ.setdefault("SLACK_SIGNING_SECRET", "benchmark")
+os.environ.setdefault("SLACK_BOT_ID", "U_BENCHMARK")
+os.environ.setdefault("OPENAI_ORG_ID", "None")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+sys.path.insert(0, ROOT)
+
+import handler  # noqa: E402
+
+SIZES = ["1024x1024", "1024x1536", "1536x1024"]
+
+
+# Fake the Slack upload URL: consume the body in chunks
+def fake_post(url, data=None, timeout=None):
+    while data.read(64 * 1024):
+        pass
+    response = MagicMock()
+    response.status_code = 200
+    return response
+
+
+# Measure peak allocations of fn() above the current level, in MiB
+def peak(fn):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    fn()
+    result = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return result / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bytes-per-pixel", type=float, default=2.0)
+    args = parser.parse_args()
+
+    client = MagicMock()
+    client.files_getUploadURLExternal.return_value = {"upload_url": "https://upload", "file_id": "F1"}
+    client.files_completeUploadExternal.return_value = {"ok": True}
+
+    session = MagicMock()
+    session.post.side_effect = fake_post
+
+    print("{:<12} {:>10} {:>14} {:>14}".format("size", "png MiB", "full MiB", "reply_image MiB"))
+
+    for size in SIZES:
+        width, height = (int(x) for x in size.split("x"))
+        png = os.urandom(int(width * height * args.bytes_per_pixel))
+        b64_json = base64.b64encode(png).decode("ascii")
+        del png
+
+        image = MagicMock()
+        image.data = [MagicMock(b64_json=b64_json, url=None, revised_prompt="prompt")]
+
+        openai = MagicMock()
+        openai.images.generate.return_value = image
+
+        full = peak(lambda: base64.b64decode(b64_json))
+
+        with (
+            patch.object(handler, "openai_client", openai),
+            patch.object(handler, "http_session", session),
+            patch.object(handler.app, "_client", client),
+            patch.object(handler, "chat_update"),
+            patch("builtins.print"),
+        ):
+            streamed = peak(lambda: handler.reply_image("prompt", None, "C1", "1.0", "1.1"))
+
+        print("{:<12} {:>10.1f} {:>14.1f} {:>14.1f}".format(
+            size, len(b64_json) * 3 / 4 / (1024 * 1024), full, streamed
+        ))
+
+
+if __name__ == "__main__":
+    main()
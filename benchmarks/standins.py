@@ -0,0 +1,347 @@
+"""
+Local HTTP stand-ins for the services the bot talks to, for benchmarks:
+
+- SlackStandIn: Web API methods used by handler.py, file downloads and the
+  external upload URL; records every call with its arrival time, and checks
+  that native message streams are started, appended to and stopped in order
+- OpenAIStandIn: chat completions (streamed at a fixed token rate) and
+  image generation
+- DynamoDBStandIn: GetItem, PutItem (with attribute_not_exists conditions),
+  UpdateItem and DeleteItem on a single in-memory table
+
+Each stand-in runs a threaded HTTP/1.1 server on 127.0.0.1 and exposes its
+base URL as `.url`.
+"""
+
+import base64
+import io
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 1x1 transparent PNG, used when Pillow is not installed
+TINY_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+
+# Build a photo-sized test image (falls back to a tiny PNG without Pillow)
+def make_image(width=1600, height=1200):
+    try:
+        from PIL import Image
+    except ImportError:
+        return TINY_PNG, "image/png"
+
+    image = Image.effect_noise((width // 8, height // 8), 64).resize((width, height)).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue(), "image/jpeg"
+
+
+class StandIn:
+    """Threaded HTTP server with a request handler bound to this instance."""
+
+    def __init__(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                stand_in.handle(self, "GET")
+
+            def do_POST(self):
+                stand_in.handle(self, "POST")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = "http://127.0.0.1:{}".format(self.server.server_port)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def handle(self, request, method):
+        raise NotImplementedError
+
+    @staticmethod
+    def read_body(request):
+        length = int(request.headers.get("Content-Length") or 0)
+        return request.rfile.read(length) if length else b""
+
+    @staticmethod
+    def send(request, status, body, content_type="application/json"):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+
+class SlackStandIn(StandIn):
+    """Slack Web API, file downloads and uploads."""
+
+    def __init__(self, latency=0.0, history=4):
+        super().__init__()
+        self.latency = latency
+        self.history = history
+        self.image, self.image_type = make_image()
+        self.calls = []
+        self.streams = {}  # ts -> {"text": streamed markdown, "stopped": bool}
+        self.errors = []
+        self.lock = threading.RLock()
+        self.counter = 0
+
+    def reset(self):
+        with self.lock:
+            self.calls = []
+            self.streams = {}
+            self.errors = []
+
+    # Streams started but never stopped, and calls rejected by the stand-in
+    def problems(self):
+        with self.lock:
+            open_streams = [ts for ts, stream in self.streams.items() if not stream["stopped"]]
+            return ["stream {} not stopped".format(ts) for ts in open_streams] + list(self.errors)
+
+    def next_ts(self):
+        with self.lock:
+            self.counter += 1
+            return "{:.6f}".format(time.time() + self.counter / 1e6)
+
+    def handle(self, request, method):
+        path = urllib.parse.urlparse(request.path).path
+        body = self.read_body(request)
+
+        if path.startswith("/files/"):
+            self.send(request, 200, self.image, self.image_type)
+            return
+
+        if path.startswith("/upload/"):
+            self.send(request, 200, b"OK", "text/plain")
+            return
+
+        api = path.rsplit("/", 1)[-1]
+        if request.headers.get("Content-Type", "").startswith("application/json"):
+            params = json.loads(body or b"{}")
+        else:
+            query = urllib.parse.urlparse(request.path).query
+            params = {k: v[0] for k, v in urllib.parse.parse_qs(body.decode("utf-8") or query).items()}
+
+        with self.lock:
+            self.calls.append((time.perf_counter(), api, params))
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            response = self.respond(api, params)
+            if not response.get("ok"):
+                self.errors.append("{}: {}".format(api, response.get("error")))
+
+        self.send(request, 200, response)
+
+    def respond(self, api, params):
+        if api == "auth.test":
+            return {"ok": True, "user_id": "U_BENCH_BOT", "bot_id": "B_BENCH_BOT", "team_id": "T_BENCH"}
+        if api == "chat.postMessage":
+            return {"ok": True, "channel": params.get("channel"), "ts": self.next_ts()}
+        if api == "chat.update":
+            return {"ok": True, "channel": params.get("channel"), "ts": params.get("ts")}
+        if api == "chat.startStream":
+            if not params.get("thread_ts"):
+                return {"ok": False, "error": "invalid_arguments"}
+            ts = self.next_ts()
+            self.streams[ts] = {"text": params.get("markdown_text", ""), "stopped": False}
+            return {"ok": True, "channel": params.get("channel"), "ts": ts}
+        if api in ("chat.appendStream", "chat.stopStream"):
+            stream = self.streams.get(params.get("ts"))
+            if stream is None or stream["stopped"]:
+                return {"ok": False, "error": "message_not_in_streaming_state"}
+            stream["text"] += params.get("markdown_text", "")
+            stream["stopped"] = api == "chat.stopStream"
+            return {"ok": True, "channel": params.get("channel"), "ts": params.get("ts")}
+        if api == "chat.delete":
+            self.streams.pop(params.get("ts"), None)
+            return {"ok": True, "channel": params.get("channel"), "ts": params.get("ts")}
+        if api == "users.info":
+            return {"ok": True, "user": {"id": params.get("user"), "profile": {"display_name": "Bench"}}}
+        if api == "conversations.replies":
+            return {"ok": True, "messages": self.thread_messages(params.get("ts")), "has_more": False}
+        if api == "files.getUploadURLExternal":
+            return {"ok": True, "upload_url": self.url + "/upload/F_BENCH", "file_id": "F_BENCH"}
+        if api == "files.completeUploadExternal":
+            return {"ok": True, "files": [{"id": "F_BENCH"}]}
+        return {"ok": True}
+
+    # A thread of alternating user and bot messages
+    def thread_messages(self, thread_ts):
+        messages = [{"user": "U_BENCH", "text": "<@U_BENCH_BOT> hello", "ts": thread_ts}]
+        base = float(thread_ts or 0)
+        for index in range(self.history):
+            if index % 2:
+                message = {"user": "U_BENCH", "text": "follow-up question {}".format(index)}
+            else:
+                message = {"user": "U_BENCH_BOT", "bot_id": "B_BENCH_BOT", "text": "answer {}".format(index)}
+            message["ts"] = "{:.6f}".format(base + (index + 1) / 1000)
+            messages.append(message)
+        return messages
+
+
+class OpenAIStandIn(StandIn):
+    """OpenAI chat completions and image generation."""
+
+    def __init__(self, first_token=0.3, tokens_per_second=50.0, reply_tokens=200):
+        super().__init__()
+        self.first_token = first_token
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+
+    def handle(self, request, method):
+        path = urllib.parse.urlparse(request.path).path
+        params = json.loads(self.read_body(request) or b"{}")
+
+        if path.endswith("/images/generations"):
+            time.sleep(self.first_token)
+            data = [{"b64_json": base64.b64encode(TINY_PNG).decode("ascii"), "revised_prompt": params.get("prompt")}]
+            self.send(request, 200, {"created": int(time.time()), "data": data})
+            return
+
+        if not params.get("stream"):
+            time.sleep(self.first_token + self.reply_tokens / self.tokens_per_second)
+            self.send(request, 200, {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": params.get("model"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": self.text()},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 100, "completion_tokens": self.reply_tokens, "total_tokens": 100 + self.reply_tokens},
+            })
+            return
+
+        self.stream(request, params)
+
+    def text(self):
+        words = ["Lorem", "ipsum", "dolor", "sit", "amet,", "consectetur", "adipiscing", "elit."]
+        text = ""
+        for index in range(self.reply_tokens):
+            text += words[index % len(words)] + ("\n\n" if index % 40 == 39 else " ")
+        return text
+
+    # Server-sent events at a fixed token rate, over chunked transfer encoding
+    def stream(self, request, params):
+        request.send_response(200)
+        request.send_header("Content-Type", "text/event-stream")
+        request.send_header("Transfer-Encoding", "chunked")
+        request.end_headers()
+
+        def write(data):
+            event = "data: {}\n\n".format(data).encode("utf-8")
+            request.wfile.write("{:x}\r\n".format(len(event)).encode("ascii") + event + b"\r\n")
+            request.wfile.flush()
+
+        def chunk(delta, finish_reason=None):
+            return json.dumps({
+                "id": "chatcmpl-bench",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": params.get("model"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            })
+
+        time.sleep(self.first_token)
+        write(chunk({"role": "assistant", "content": ""}))
+
+        started = time.perf_counter()
+        for index, token in enumerate(self.text().split(" ")):
+            # Keep to the token rate without drifting
+            delay = started + index / self.tokens_per_second - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            write(chunk({"content": token + " "}))
+
+        write(chunk({}, "stop"))
+        if (params.get("stream_options") or {}).get("include_usage"):
+            write(json.dumps({
+                "id": "chatcmpl-bench",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": params.get("model"),
+                "choices": [],
+                "usage": {
+                    "prompt_tokens": 100,
+                    "completion_tokens": self.reply_tokens,
+                    "total_tokens": 100 + self.reply_tokens,
+                    "prompt_tokens_details": {"cached_tokens": 0},
+                },
+            }))
+        write("[DONE]")
+        request.wfile.write(b"0\r\n\r\n")
+
+
+class DynamoDBStandIn(StandIn):
+    """DynamoDB JSON protocol for one in-memory table keyed by `id`."""
+
+    def __init__(self):
+        super().__init__()
+        self.items = {}
+        self.lock = threading.Lock()
+
+    def handle(self, request, method):
+        target = request.headers.get("X-Amz-Target", "").split(".")[-1]
+        params = json.loads(self.read_body(request) or b"{}")
+
+        with self.lock:
+            status, body = self.respond(target, params)
+
+        self.send(request, status, body, "application/x-amz-json-1.0")
+
+    def respond(self, target, params):
+        if target == "GetItem":
+            item = self.items.get(json.dumps(params["Key"], sort_keys=True))
+            return 200, {"Item": item} if item else {}
+
+        if target == "PutItem":
+            item = params["Item"]
+            key = json.dumps({"id": item["id"]}, sort_keys=True)
+            if "attribute_not_exists" in params.get("ConditionExpression", "") and key in self.items:
+                return 400, {
+                    "__type": "com.amazonaws.dynamodb.v20120810#ConditionalCheckFailedException",
+                    "message": "The conditional request failed",
+                }
+            self.items[key] = item
+            return 200, {}
+
+        if target == "UpdateItem":
+            key = json.dumps(params["Key"], sort_keys=True)
+            item = self.items.setdefault(key, dict(params["Key"]))
+            values = params.get("ExpressionAttributeValues", {})
+            names = params.get("ExpressionAttributeNames", {})
+            # Only plain "SET a = :a, b = :b" expressions are supported
+            expression = params.get("UpdateExpression", "")
+            if expression.startswith("SET "):
+                for assignment in expression[4:].split(","):
+                    name, value = (part.strip() for part in assignment.split("="))
+                    item[names.get(name, name)] = values[value]
+            return 200, {}
+
+        if target == "DeleteItem":
+            self.items.pop(json.dumps(params["Key"], sort_keys=True), None)
+            return 200, {}
+
+        return 200, {}
@@ -0,0 +1,114 @@
+"""
+Streaming render benchmark — CPU time to render 10k–200k character replies
+into Slack messages, for the previous whole-message chat_update path and for
+StreamRenderer, with the cost per character to show how each scales.
+
+    $ python benchmarks/stream_render.py --chunk 4 --flush-every 10
+
+Slack is replaced by a no-op client; only rendering work is measured.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("SLACK_BOT_TOKEN", "xoxb-benchmark")
+os.environ.setdefault("SLACK_SIGNING_SECRET", "benchmark")
+os.environ.setdefault("SLACK_BOT_ID", "U_BENCHMARK")
+os.environ.setdefault("OPENAI_ORG_ID", "None")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+sys.path.insert(0, ROOT)
+
+import handler  # noqa: E402
+
+SIZES = [10_000, 50_000, 100_000, 200_000]
+
+
+class NullClient:
+    def chat_update(self, **kwargs):
+        return {"ok": True}
+
+    def chat_postMessage(self, **kwargs):
+        return {"ok": True, "ts": "1.0"}
+
+
+def say(text, thread_ts=None):
+    return {"ts": "1.0"}
+
+
+# Build a reply mixing prose, short code blocks and one long code block
+def make_reply(size, long_code):
+    paragraph = "Some **bold** words in a paragraph of prose. " * 4 + "\n\n"
+    code = "```python\n" + "x = compute(x)  # step\n" * 8 + "```\n\n"
+    blocks = [paragraph, paragraph, code]
+
+    text = ""
+    if long_code:
+        text += "```\n" + "print('a long generated listing')\n" * (size // 64) + "```\n\n"
+    while len(text) < size:
+        text += blocks[len(text) % 3]
+    return text[:size]
+
+
+# The previous path: grow the message and re-split/convert it on every flush
+def render_whole(chunks, flush_every):
+    message, latest_ts = "", "1.0"
+    for index, chunk in enumerate(chunks):
+        message += chunk
+        if index % flush_every == 0:
+            message, latest_ts = handler.chat_update(say, "C1", "1.0", latest_ts, message, True)
+    handler.chat_update(say, "C1", "1.0", latest_ts, message)
+
+
+def render_incremental(chunks, flush_every):
+    renderer = handler.StreamRenderer()
+    latest_ts = "1.0"
+    for index, chunk in enumerate(chunks):
+        renderer.feed(chunk)
+        if index % flush_every == 0:
+            latest_ts = handler.post_rendered(say, "C1", "1.0", latest_ts, renderer.take(True))
+    handler.post_rendered(say, "C1", "1.0", latest_ts, renderer.take())
+
+
+def timed(fn, *args):
+    started = time.process_time()
+    fn(*args)
+    return time.process_time() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunk", type=int, default=4, help="characters per streamed delta")
+    parser.add_argument("--flush-every", type=int, default=10, help="deltas per Slack update")
+    args = parser.parse_args()
+
+    handler.slack_api = NullClient()
+
+    print("{:<10} {:>6} {:>12} {:>10} {:>12} {:>10}".format(
+        "shape", "chars", "whole ms", "us/char", "stream ms", "us/char"
+    ))
+
+    for long_code in [False, True]:
+        for size in SIZES:
+            text = make_reply(size, long_code)
+            chunks = [text[i:i + args.chunk] for i in range(0, len(text), args.chunk)]
+
+            whole = timed(render_whole, chunks, args.flush_every)
+            stream = timed(render_incremental, chunks, args.flush_every)
+
+            print("{:<10} {:>6} {:>12.1f} {:>10.2f} {:>12.1f} {:>10.2f}".format(
+                "long code" if long_code else "prose",
+                size,
+                whole * 1000,
+                whole * 1e6 / size,
+                stream * 1000,
+                stream * 1e6 / size,
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,35 @@
-import boto3
-from botocore.exceptions import ClientError
 import json
 import os
 import re
 import time
 import base64
+import hashlib
+import io
+import sqlite3
+import tempfile
+import collections
+import contextlib
+import random
+import threading
+import unicodedata
+import zlib
+import concurrent.futures
+import asyncio
 import requests
 
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
 from slack_bolt import App, Say
 from slack_bolt.adapter.aws_lambda import SlackRequestHandler
-
-from openai import OpenAI
+from slack_bolt.adapter.aws_lambda.handler import to_aws_response
+from slack_bolt.request import BoltRequest
+from slack_bolt.authorization import AuthorizeResult
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from slack_sdk.signature import SignatureVerifier
 
 BOT_CURSOR = os.environ.get("BOT_CURSOR", ":robot_face:").strip()
 
@@ -18,14 +37,103 @@ BOT_CURSOR = os.environ.get("BOT_CURSOR", ":robot_face:").strip()
 SLACK_BOT_TOKEN = os.environ["SLACK_BOT_TOKEN"].strip()
 SLACK_SIGNING_SECRET = os.environ["SLACK_SIGNING_SECRET"].strip()
 
+# Slack Web API base URL (point at a local stand-in for benchmarks)
+SLACK_API_URL = os.environ.get("SLACK_API_URL", "https://slack.com/api/").strip()
+
+# Bot user id (skips auth.test), otherwise cached in /tmp and DynamoDB
+SLACK_BOT_ID = os.environ.get("SLACK_BOT_ID", "").strip()
+
 # Keep track of conversation history by thread and user
 DYNAMODB_TABLE_NAME = os.environ.get("DYNAMODB_TABLE_NAME", "chatgpt-ai-bot-dev").strip()
 
+# Attachment downloads (threads, seconds, bytes)
+IMAGE_FETCH_WORKERS = int(os.environ.get("IMAGE_FETCH_WORKERS", 4))
+IMAGE_FETCH_TIMEOUT = float(os.environ.get("IMAGE_FETCH_TIMEOUT", 10))
+IMAGE_FETCH_DEADLINE = float(os.environ.get("IMAGE_FETCH_DEADLINE", 20))
+IMAGE_MAX_BYTES = int(os.environ.get("IMAGE_MAX_BYTES", 20 * 1024 * 1024))
+
+# Vision input preprocessing (pixels, JPEG quality, "auto" picks low/high by size)
+IMAGE_MAX_SIDE = int(os.environ.get("IMAGE_MAX_SIDE", 2048))
+IMAGE_MIN_SIDE = int(os.environ.get("IMAGE_MIN_SIDE", 768))
+IMAGE_LOW_DETAIL_SIDE = int(os.environ.get("IMAGE_LOW_DETAIL_SIDE", 512))
+IMAGE_QUALITY = int(os.environ.get("IMAGE_QUALITY", 85))
+IMAGE_DETAIL = os.environ.get("IMAGE_DETAIL", "auto").strip()
+
+# Cache users_info display names across invocations (seconds, entries)
+USERS_CACHE_TTL = int(os.environ.get("USERS_CACHE_TTL", 3600))
+USERS_CACHE_NEGATIVE_TTL = int(os.environ.get("USERS_CACHE_NEGATIVE_TTL", 300))
+USERS_CACHE_SIZE = int(os.environ.get("USERS_CACHE_SIZE", 1000))
+USERS_CACHE_DYNAMODB = os.environ.get("USERS_CACHE_DYNAMODB", "false").strip().lower() == "true"
+
+# Cache processed thread history per thread (entries, seconds)
+THREAD_CACHE_SIZE = int(os.environ.get("THREAD_CACHE_SIZE", 500))
+THREAD_CACHE_TTL = int(os.environ.get("THREAD_CACHE_TTL", 86400))
+THREAD_CACHE_MAX_MESSAGES = int(os.environ.get("THREAD_CACHE_MAX_MESSAGES", 200))
+THREAD_CACHE_DYNAMODB = os.environ.get("THREAD_CACHE_DYNAMODB", "false").strip().lower() == "true"
+
+# Fold older thread messages into a rolling summary once the unsummarized history older than the
+# newest THREAD_SUMMARY_KEEP messages passes THREAD_SUMMARY_TOKENS; those are always sent verbatim (opt-in)
+THREAD_SUMMARY = os.environ.get("THREAD_SUMMARY", "false").strip().lower() == "true"
+THREAD_SUMMARY_TOKENS = int(os.environ.get("THREAD_SUMMARY_TOKENS", 4000))
+THREAD_SUMMARY_KEEP = int(os.environ.get("THREAD_SUMMARY_KEEP", 8))
+THREAD_SUMMARY_WORDS = int(os.environ.get("THREAD_SUMMARY_WORDS", 300))
+
+# Cache image descriptions by image content hash (seconds, entries)
+DESCRIBE_CACHE_TTL = int(os.environ.get("DESCRIBE_CACHE_TTL", 604800))
+DESCRIBE_CACHE_SIZE = int(os.environ.get("DESCRIBE_CACHE_SIZE", 200))
+DESCRIBE_CACHE_DYNAMODB = os.environ.get("DESCRIBE_CACHE_DYNAMODB", "false").strip().lower() == "true"
+
+# Cache replies to standalone text prompts, replayed on an exact match (opt-in; seconds, entries, chars)
+RESPONSE_CACHE = os.environ.get("RESPONSE_CACHE", "false").strip().lower() == "true"
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 86400))
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 500))
+RESPONSE_CACHE_MAX_CHARS = int(os.environ.get("RESPONSE_CACHE_MAX_CHARS", 20000))
+RESPONSE_CACHE_DYNAMODB = os.environ.get("RESPONSE_CACHE_DYNAMODB", "false").strip().lower() == "true"
+
+# Dedupe and cache state backend ("dynamodb", "sqlite", "memory") and DynamoDB throttle retries
+STATE_BACKEND = os.environ.get("STATE_BACKEND", "dynamodb").strip().lower()
+STATE_SQLITE_PATH = os.environ.get("STATE_SQLITE_PATH", "/tmp/state.db").strip()
+STATE_MAX_RETRIES = int(os.environ.get("STATE_MAX_RETRIES", 4))
+STATE_BACKOFF = float(os.environ.get("STATE_BACKOFF", 0.05))
+DEDUPE_TTL = int(os.environ.get("DEDUPE_TTL", 3600))
+
+# Remember recently seen event ids per container, to answer duplicates without DynamoDB (entries, seconds)
+DEDUPE_CACHE_SIZE = int(os.environ.get("DEDUPE_CACHE_SIZE", 10000))
+DEDUPE_CACHE_TTL = int(os.environ.get("DEDUPE_CACHE_TTL", 3600))
+
+# Acknowledge Slack at once and process events in a worker ("", "memory", "sqlite", "sqs")
+EVENT_QUEUE = os.environ.get("EVENT_QUEUE", "").strip()
+EVENT_QUEUE_URL = os.environ.get("EVENT_QUEUE_URL", "").strip()
+
+# Pace Slack Web API calls per method and channel, and retry on 429
+SLACK_RATE_LIMIT = os.environ.get("SLACK_RATE_LIMIT", "true").strip().lower() == "true"
+SLACK_CHANNEL_RATE = float(os.environ.get("SLACK_CHANNEL_RATE", 1.0))
+SLACK_CHANNEL_BURST = int(os.environ.get("SLACK_CHANNEL_BURST", 5))
+SLACK_MAX_RETRIES = int(os.environ.get("SLACK_MAX_RETRIES", 3))
+
+# Structured logging: level, share of invocations logged at DEBUG, field size caps
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").strip().upper()
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", 0.0))
+LOG_MAX_FIELD = int(os.environ.get("LOG_MAX_FIELD", 1000))
+LOG_MAX_ITEMS = int(os.environ.get("LOG_MAX_ITEMS", 50))
+
+# Emit per-invocation timings as CloudWatch embedded metric format (EMF) records
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "false").strip().lower() == "true"
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "ChatGPTBot").strip()
+
+# Run conversations on blocking clients or on asyncio ("sync", "async")
+ENGINE = os.environ.get("ENGINE", "sync").strip()
+
 # Set up ChatGPT API credentials
 OPENAI_ORG_ID = os.environ["OPENAI_ORG_ID"].strip()
 OPENAI_API_KEY = os.environ["OPENAI_API_KEY"].strip()
 OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-5.4").strip()
 
+# Route each OpenAI call to a model by call site ("chat", "describe", "rewrite", "summary") and request
+# features; MODEL_ROUTES is a JSON list of rules, the first match wins (see README)
+OPENAI_MODEL_SMALL = os.environ.get("OPENAI_MODEL_SMALL", "").strip()
+MODEL_ROUTES = os.environ.get("MODEL_ROUTES", "").strip()
+
 IMAGE_MODEL = os.environ.get("IMAGE_MODEL", "gpt-image-1.5").strip()
 IMAGE_SIZE = os.environ.get("IMAGE_SIZE", "1024x1024").strip()
 
@@ -33,7 +141,24 @@ IMAGE_SIZE = os.environ.get("IMAGE_SIZE", "1024x1024").strip()
 SYSTEM_MESSAGE = os.environ.get("SYSTEM_MESSAGE", "").strip() or None
 
 MAX_LEN_SLACK = int(os.environ.get("MAX_LEN_SLACK", 3000))
-MAX_LEN_OPENAI = int(os.environ.get("MAX_LEN_OPENAI", 4000))
+
+# Prompt token budget, capped by the model context window minus the reply reserve
+MAX_TOKENS_OPENAI = int(os.environ.get("MAX_TOKENS_OPENAI", 16000))
+MAX_TOKENS_REPLY = int(os.environ.get("MAX_TOKENS_REPLY", 4096))
+
+# Drop the oldest thread messages in steps of this many, keeping the prompt prefix stable between turns
+HISTORY_TRIM_STEP = int(os.environ.get("HISTORY_TRIM_STEP", 8))
+
+# Count tokens with tiktoken ("tiktoken") or a fast estimator ("estimate")
+TOKEN_COUNTER = os.environ.get("TOKEN_COUNTER", "estimate").strip()
+
+# Stream flush scheduling (seconds, characters)
+STREAM_FLUSH_INTERVAL = float(os.environ.get("STREAM_FLUSH_INTERVAL", 1.0))
+STREAM_FLUSH_SIZE = int(os.environ.get("STREAM_FLUSH_SIZE", 800))
+
+# Render streamed replies by rewriting messages with chat.update ("update"), or append only the new
+# text with Slack's chat.startStream/appendStream/stopStream ("native", thread replies only)
+STREAM_RENDERER = os.environ.get("STREAM_RENDERER", "update").strip()
 
 KEYWORD_IMAGE = os.environ.get("KEYWORD_IMAGE", "그려줘").strip()
 KEYWORD_EMOJI = os.environ.get("KEYWORD_EMOJI", "이모지").strip()
@@ -43,45 +168,1240 @@ MSG_IMAGE_DESCRIBE = "이미지 감상 중... " + BOT_CURSOR
 MSG_IMAGE_GENERATE = "이미지 생성 준비 중... " + BOT_CURSOR
 
 COMMAND_DESCRIBE = "Describe the image in great detail as if viewing a photo."
+COMMAND_SUMMARIZE = (
+    "Update the summary of this Slack thread with the new messages above. Keep names, decisions, "
+    "open questions and facts needed to continue the conversation, in the thread's language, "
+    "within {} words. Just give me the summary."
+)
 COMMAND_GENERATE = "Convert the above sentence into a command for DALL-E to generate an image within 1000 characters. Just give me a prompt."
 
+# Context window sizes by model prefix (longest prefix wins)
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-5": 400000,
+    "gpt-4.1": 1047576,
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "o1": 200000,
+    "o3": 200000,
+    "o4": 200000,
+}
+
+# Image input tokens by detail level (high assumes a 1024px image)
+IMAGE_TOKENS = {
+    "low": 85,
+    "high": 765,
+    "auto": 765,
+}
+
+# Slack Web API rate limit tiers, requests per minute
+SLACK_TIER_LIMITS = {
+    1: 1,
+    2: 20,
+    3: 50,
+    4: 100,
+}
+
+# Slack Web API methods by tier (unlisted methods use tier 3)
+SLACK_METHOD_TIERS = {
+    "auth_test": 4,
+    "users_info": 4,
+    "chat_postMessage": 4,
+    "chat_update": 3,
+    "chat_appendStream": 4,
+    "conversations_replies": 3,
+    "assistant_threads_setStatus": 3,
+    "files_getUploadURLExternal": 4,
+    "files_completeUploadExternal": 4,
+}
+
+# Longest markdown_text Slack takes per streaming call
+SLACK_STREAM_MAX_CHARS = 12000
+
 CONVERSION_ARRAY = [
     ["**", "*"],
 ]
 
 
+# Bot identity cache key, derived from the token so a new token gets a new identity
+BOT_IDENTITY_KEY = hashlib.sha256(SLACK_BOT_TOKEN.encode("utf-8")).hexdigest()[:16]
+BOT_IDENTITY_PATH = "/tmp/slack-bot-{}.json".format(BOT_IDENTITY_KEY)
+
+bot_identity = None
+openai_client = None
+dynamodb_table = None
+
+
+# Get the bot identity from env, /tmp, DynamoDB or auth.test (in that order)
+def get_bot_identity():
+    global bot_identity
+
+    if bot_identity is not None:
+        return bot_identity
+
+    if SLACK_BOT_ID:
+        bot_identity = {"user_id": SLACK_BOT_ID}
+        return bot_identity
+
+    try:
+        with open(BOT_IDENTITY_PATH) as f:
+            bot_identity = json.load(f)
+            return bot_identity
+    except (OSError, ValueError):
+        pass
+
+    try:
+        item = get_state_store().get("bot#" + BOT_IDENTITY_KEY)
+        if item:
+            bot_identity = json.loads(item["identity"])
+    except Exception as e:
+        log.warning("get_bot_identity", error=e)
+
+    if bot_identity is None:
+        result = slack_api.auth_test()
+        bot_identity = {
+            "user_id": result.get("user_id"),
+            "bot_id": result.get("bot_id"),
+            "team_id": result.get("team_id"),
+        }
+
+        try:
+            get_state_store().put("bot#" + BOT_IDENTITY_KEY, {"identity": json.dumps(bot_identity)})
+        except Exception as e:
+            log.warning("get_bot_identity", error=e)
+
+    try:
+        with open(BOT_IDENTITY_PATH, "w") as f:
+            json.dump(bot_identity, f)
+    except OSError as e:
+        log.warning("get_bot_identity", error=e)
+
+    return bot_identity
+
+
+# Get the bot user id
+def get_bot_id():
+    return get_bot_identity()["user_id"]
+
+
+# Authorize requests with the cached bot identity (no auth.test on cold start)
+def authorize(enterprise_id, team_id):
+    identity = get_bot_identity()
+    return AuthorizeResult(
+        enterprise_id=enterprise_id,
+        team_id=team_id or identity.get("team_id"),
+        bot_token=SLACK_BOT_TOKEN,
+        bot_id=identity.get("bot_id"),
+        bot_user_id=identity.get("user_id"),
+    )
+
+
 # Initialize Slack app
 app = App(
-    token=SLACK_BOT_TOKEN,
+    client=WebClient(token=SLACK_BOT_TOKEN, base_url=SLACK_API_URL),
     signing_secret=SLACK_SIGNING_SECRET,
+    authorize=authorize,
     process_before_response=True,
 )
 
-handler = SlackRequestHandler(app=app)
 
-bot_id = app.client.api_call("auth.test")["user_id"]
+# Bolt's Lambda adapter, reusing the body lambda_handler has already parsed
+class ParsedBodyRequestHandler:
+    def __init__(self, app):
+        self.app = app
+        self.adapter = SlackRequestHandler(app=app)
+        self.parsed = None  # (raw body, parsed body) for the next handle()
 
-# Initialize DynamoDB
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table(DYNAMODB_TABLE_NAME)
+    def reuse_body(self, raw_body, body):
+        self.parsed = (raw_body, body)
 
-# Initialize OpenAI
-openai = OpenAI(
-    organization=OPENAI_ORG_ID if OPENAI_ORG_ID and OPENAI_ORG_ID != "None" else None,
-    api_key=OPENAI_API_KEY,
-)
+    def handle(self, event, context):
+        parsed, self.parsed = self.parsed, None
+        request_context = event.get("requestContext") or {}
+        method = request_context.get("http", {}).get("method") or request_context.get("httpMethod")
+
+        if method != "POST" or parsed is None or parsed[0] is not event.get("body") or event.get("isBase64Encoded"):
+            return self.adapter.handle(event, context)
+
+        headers = dict(event.get("headers") or {})
+        headers["cookie"] = event.get("cookies") or []
+
+        # Built from the dict, then switched to HTTP mode so the signature is checked on the raw body
+        bolt_req = BoltRequest(
+            body=parsed[1],
+            query=event.get("queryStringParameters") or {},
+            headers=headers,
+            mode="socket_mode",
+        )
+        bolt_req.raw_body = parsed[0]
+        bolt_req.mode = "http"
+        bolt_req.context["aws_lambda_function_name"] = context.function_name
+        bolt_req.context["aws_lambda_invoked_function_arn"] = context.invoked_function_arn
+        bolt_req.context["lambda_request"] = event
+
+        return to_aws_response(self.app.dispatch(bolt_req))
+
+
+handler = ParsedBodyRequestHandler(app=app)
+
+signature_verifier = SignatureVerifier(SLACK_SIGNING_SECRET)
+
+
+# Get the DynamoDB table (created on first use)
+def get_table():
+    global dynamodb_table
+
+    if dynamodb_table is None:
+        import boto3
+
+        dynamodb = boto3.resource("dynamodb")
+        dynamodb_table = dynamodb.Table(DYNAMODB_TABLE_NAME)
+
+    return dynamodb_table
+
+
+# Get the OpenAI client (created on first use)
+def get_openai():
+    global openai_client
+
+    if openai_client is None:
+        from openai import OpenAI
+
+        openai_client = OpenAI(
+            organization=OPENAI_ORG_ID if OPENAI_ORG_ID and OPENAI_ORG_ID != "None" else None,
+            api_key=OPENAI_API_KEY,
+        )
+
+    return openai_client
+
+
+# Resolve lazily constructed module attributes (handler.openai, handler.table, handler.bot_id)
+def __getattr__(name):
+    if name == "openai":
+        return get_openai()
+    if name == "table":
+        return get_table()
+    if name == "bot_id":
+        return get_bot_id()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+# Least-recently-used cache with per-entry expiry
+class LRUCache:
+    def __init__(self, maxsize=1000, ttl=3600, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.items = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            item = self.items.get(key)
+            if item is not None and item[1] <= self.clock():
+                del self.items[key]
+                item = None
+
+            if item is None:
+                self.misses += 1
+                return default
+
+            self.items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            expire_at = self.clock() + (self.ttl if ttl is None else ttl)
+            self.items[key] = (value, expire_at)
+            self.items.move_to_end(key)
+
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+                self.evictions += 1
+
+    # Store value unless a live entry exists; returns whether it was stored
+    def add(self, key, value, ttl=None):
+        with self.lock:
+            item = self.items.get(key)
+            if item is not None and item[1] > self.clock():
+                self.items.move_to_end(key)
+                self.hits += 1
+                return False
+
+            self.misses += 1
+            self.items[key] = (value, self.clock() + (self.ttl if ttl is None else ttl))
+            self.items.move_to_end(key)
+
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    # Overwrite a live entry, never adding one; returns whether it was there
+    def replace(self, key, value, ttl=None):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None or item[1] <= self.clock():
+                return False
+
+            self.items[key] = (value, self.clock() + (self.ttl if ttl is None else ttl))
+            return True
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        return {
+            "size": len(self.items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Token bucket refilled at `rate` tokens per second, holding up to `capacity`
+class TokenBucket:
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    # Take a token and return how long to wait before using it
+    def reserve(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+
+        return -self.tokens / self.rate
+
+    # Hold back every caller for the given time (Retry-After)
+    def pause(self, seconds):
+        self.reserve()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+# Pace Slack Web API calls with per-method and per-channel token buckets
+class SlackRateLimiter:
+    def __init__(self, enabled=True, max_retries=3, clock=time.monotonic, sleep=time.sleep):
+        self.enabled = enabled
+        self.max_retries = max_retries
+        self.clock = clock
+        self.sleep = sleep
+        self.buckets = {}
+        self.generations = {}
+        self.counters = collections.defaultdict(collections.Counter)
+        self.lock = threading.Lock()
+
+    def bucket(self, method, channel=None):
+        key = (method, channel)
+        if key not in self.buckets:
+            if channel is None:
+                limit = SLACK_TIER_LIMITS[SLACK_METHOD_TIERS.get(method, 3)]
+                self.buckets[key] = TokenBucket(limit / 60, max(1, limit // 6), self.clock)
+            else:
+                self.buckets[key] = TokenBucket(SLACK_CHANNEL_RATE, SLACK_CHANNEL_BURST, self.clock)
+        return self.buckets[key]
+
+    # Reserve tokens for a call; returns (wait, coalescing key, generation)
+    def reserve(self, method, kwargs):
+        channel = kwargs.get("channel") or kwargs.get("channel_id")
+
+        with self.lock:
+            self.counters[method]["calls"] += 1
+
+            wait = 0.0
+            if self.enabled:
+                wait = self.bucket(method).reserve()
+                if channel is not None:
+                    wait = max(wait, self.bucket(method, channel).reserve())
+
+            if wait > 0:
+                self.counters[method]["waits"] += 1
+                self.counters[method]["wait_ms"] += round(wait * 1000)
+
+            # A newer update of the same message supersedes one still waiting
+            key = None
+            generation = 0
+            if method == "chat_update":
+                key = (channel, kwargs.get("ts"))
+                generation = self.generations.get(key, 0) + 1
+                self.generations[key] = generation
+
+        return wait, key, generation
+
+    def superseded(self, method, key, generation):
+        with self.lock:
+            if key is None or self.generations.get(key) == generation:
+                return False
+
+            self.counters[method]["superseded"] += 1
+            return True
+
+    # Seconds to wait before retrying a rate limited call, or None to give up
+    def retry_after(self, method, error, attempt):
+        response = error.response
+        if getattr(response, "status_code", None) != 429 or attempt >= self.max_retries:
+            return None
+
+        seconds = float(response.headers.get("Retry-After") or 1)
+
+        with self.lock:
+            self.counters[method]["retries"] += 1
+            self.bucket(method).pause(seconds)
+
+        return seconds
+
+    def call(self, client, method, **kwargs):
+        wait, key, generation = self.reserve(method, kwargs)
+        if wait > 0:
+            self.sleep(wait)
+
+        if self.superseded(method, key, generation):
+            return {"ok": True, "superseded": True}
+
+        attempt = 0
+        while True:
+            try:
+                return getattr(client, method)(**kwargs)
+            except SlackApiError as e:
+                seconds = self.retry_after(method, e, attempt)
+                if seconds is None:
+                    raise
+                log.warning("slack", "{} rate limited, retrying in {}s", method, seconds)
+                self.sleep(seconds)
+                attempt += 1
+
+    async def call_async(self, client, method, **kwargs):
+        wait, key, generation = self.reserve(method, kwargs)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        if self.superseded(method, key, generation):
+            return {"ok": True, "superseded": True}
+
+        attempt = 0
+        while True:
+            try:
+                return await getattr(client, method)(**kwargs)
+            except SlackApiError as e:
+                seconds = self.retry_after(method, e, attempt)
+                if seconds is None:
+                    raise
+                log.warning("slack", "{} rate limited, retrying in {}s", method, seconds)
+                await asyncio.sleep(seconds)
+                attempt += 1
+
+    def stats(self):
+        with self.lock:
+            return {method: dict(counter) for method, counter in self.counters.items()}
+
+
+# Slack client proxy sending every Web API call through the rate limiter
+class RateLimitedClient:
+    def __init__(self, get_client, limiter):
+        self.get_client = get_client
+        self.limiter = limiter
+
+    def __getattr__(self, method):
+        return lambda **kwargs: self.limiter.call(self.get_client(), method, **kwargs)
+
+
+# Async counterpart of RateLimitedClient
+class AsyncRateLimitedClient(RateLimitedClient):
+    def __getattr__(self, method):
+        return lambda **kwargs: self.limiter.call_async(self.get_client(), method, **kwargs)
+
+
+# Make a value safe and small to log: redact base64 data, cap strings and collections
+def redact(value, max_field=None, max_items=None, depth=0):
+    max_field = LOG_MAX_FIELD if max_field is None else max_field
+    max_items = LOG_MAX_ITEMS if max_items is None else max_items
+
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+
+    if isinstance(value, str):
+        if value.startswith("data:") and ";base64," in value[:100]:
+            return "<{} {} chars>".format(value[:value.index(",")], len(value))
+        if len(value) > max_field:
+            return "{}...(+{} chars)".format(value[:max_field], len(value) - max_field)
+        return value
+
+    if isinstance(value, (bytes, bytearray)):
+        return "<{} bytes>".format(len(value))
+
+    if depth >= 6:
+        return "<...>"
+
+    if isinstance(value, dict):
+        items = list(value.items())
+        result = {
+            str(k): redact(v, max_field, max_items, depth + 1) for k, v in items[:max_items]
+        }
+        if len(items) > max_items:
+            result["..."] = "+{} keys".format(len(items) - max_items)
+        return result
+
+    if isinstance(value, (list, tuple)):
+        result = [redact(v, max_field, max_items, depth + 1) for v in value[:max_items]]
+        if len(value) > max_items:
+            result.append("...(+{} items)".format(len(value) - max_items))
+        return result
+
+    # Slack responses and similar wrappers
+    if isinstance(getattr(value, "data", None), dict):
+        return redact(value.data, max_field, max_items, depth + 1)
+
+    return redact(str(value), max_field, max_items, depth + 1)
+
+
+# Leveled JSON-lines logger; records below the level are never formatted
+class Logger:
+    LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+    def __init__(self, level="INFO", sample_rate=0.0, rand=random.random):
+        self.level = self.LEVELS.get(level, 20)
+        self.sample_rate = sample_rate
+        self.rand = rand
+        self.sampled = False
+
+    # Pick whether this invocation logs at DEBUG
+    def sample(self):
+        self.sampled = self.sample_rate > 0 and self.rand() < self.sample_rate
+
+    def enabled(self, level):
+        return self.sampled or self.LEVELS[level] >= self.level
+
+    def log(self, level, event, message="", *args, **fields):
+        if not self.enabled(level):
+            return
+
+        if args:
+            message = message.format(*args)
+
+        record = {"level": level, "event": event}
+        if message:
+            record["message"] = redact(message)
+        for name, value in fields.items():
+            record[name] = redact(value)
+
+        print(json.dumps(record, ensure_ascii=False, default=str))
+
+    def debug(self, event, message="", *args, **fields):
+        self.log("DEBUG", event, message, *args, **fields)
+
+    def info(self, event, message="", *args, **fields):
+        self.log("INFO", event, message, *args, **fields)
+
+    def warning(self, event, message="", *args, **fields):
+        self.log("WARNING", event, message, *args, **fields)
+
+    def error(self, event, message="", *args, **fields):
+        self.log("ERROR", event, message, *args, **fields)
+
+
+log = Logger(LOG_LEVEL, LOG_SAMPLE_RATE)
+
+
+# Times one phase of an invocation into Metrics
+class Span:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.add(self.name, (time.perf_counter() - self.started) * 1000, "Milliseconds")
+        return False
+
+
+# Per-invocation phase durations and counters, emitted as one EMF record
+class Metrics:
+    NO_SPAN = contextlib.nullcontext()
+
+    def __init__(self, enabled=False, namespace="ChatGPTBot"):
+        self.enabled = enabled
+        self.namespace = namespace
+        self.cold_start = True
+        self.lock = threading.Lock()
+        self.start()
+
+    def start(self, context=None):
+        with self.lock:
+            self.values = {}
+            self.units = {}
+            self.function_name = getattr(context, "function_name", None) or os.environ.get(
+                "AWS_LAMBDA_FUNCTION_NAME", "local"
+            )
+            self.started = time.perf_counter()
+
+    # Add to a metric; repeated phases (e.g. flushes) accumulate
+    def add(self, name, value, unit="Count"):
+        if not self.enabled:
+            return
+
+        with self.lock:
+            self.values[name] = self.values.get(name, 0) + value
+            self.units[name] = unit
+
+    def span(self, name):
+        if not self.enabled:
+            return self.NO_SPAN
+        return Span(self, name)
+
+    def record(self):
+        with self.lock:
+            values = dict(self.values)
+            units = dict(self.units)
+
+        values["total"] = (time.perf_counter() - self.started) * 1000
+        units["total"] = "Milliseconds"
+        values["cold_start"] = 1 if self.cold_start else 0
+        units["cold_start"] = "Count"
+
+        record = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": self.namespace,
+                        "Dimensions": [["FunctionName"]],
+                        "Metrics": [{"Name": name, "Unit": units[name]} for name in sorted(values)],
+                    }
+                ],
+            },
+            "FunctionName": self.function_name,
+        }
+        for name, value in values.items():
+            record[name] = round(value, 1) if units[name] == "Milliseconds" else value
+
+        return record
+
+    # Print the record; the Lambda log agent turns it into CloudWatch metrics
+    def emit(self):
+        if not self.enabled:
+            return
+
+        print(json.dumps(self.record()))
+
+        self.cold_start = False
+        self.start()
+
+
+metrics = Metrics(METRICS_ENABLED, METRICS_NAMESPACE)
+
+users_cache = LRUCache(USERS_CACHE_SIZE, USERS_CACHE_TTL)
+threads_cache = LRUCache(THREAD_CACHE_SIZE, THREAD_CACHE_TTL)
+descriptions_cache = LRUCache(DESCRIBE_CACHE_SIZE, DESCRIBE_CACHE_TTL)
+responses_cache = LRUCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+summaries_cache = LRUCache(THREAD_CACHE_SIZE, THREAD_CACHE_TTL)
+seen_events = LRUCache(DEDUPE_CACHE_SIZE, DEDUPE_CACHE_TTL)  # client_msg_id -> "in_flight" | "done"
+
+slack_limiter = SlackRateLimiter(SLACK_RATE_LIMIT, SLACK_MAX_RETRIES)
+slack_api = RateLimitedClient(lambda: app.client, slack_limiter)
+async_slack_api = AsyncRateLimitedClient(lambda: get_async_slack(), slack_limiter)
+
+
+# In-process event queue (local testing only)
+class MemoryEventQueue:
+    def __init__(self):
+        self.items = collections.deque()
+        self.counter = 0
+
+    def put(self, body):
+        self.counter += 1
+        self.items.append((str(self.counter), body))
+
+    def get(self, max_count=10):
+        items = []
+        while self.items and len(items) < max_count:
+            items.append(self.items.popleft())
+        return items
+
+    def delete(self, receipt):
+        pass
+
+
+# SQLite event queue, shared by processes on the same host
+class SQLiteEventQueue:
+    def __init__(self, path, visibility_timeout=120):
+        self.visibility_timeout = visibility_timeout
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, body TEXT NOT NULL, visible_at REAL NOT NULL)"
+        )
+
+    def put(self, body):
+        self.conn.execute(
+            "INSERT INTO events (body, visible_at) VALUES (?, ?)", (body, time.time())
+        )
+
+    def get(self, max_count=10):
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.conn.execute(
+                "SELECT id, body FROM events WHERE visible_at <= ? ORDER BY id LIMIT ?",
+                (now, max_count),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE events SET visible_at = ? WHERE id = ?",
+                [(now + self.visibility_timeout, row[0]) for row in rows],
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return [(str(row[0]), row[1]) for row in rows]
+
+    def delete(self, receipt):
+        self.conn.execute("DELETE FROM events WHERE id = ?", (int(receipt),))
+
+
+# Amazon SQS event queue, consumed by the worker function
+class SQSEventQueue:
+    def __init__(self, queue_url):
+        self.queue_url = queue_url
+        import boto3
+
+        self.client = boto3.client("sqs")
+
+    def put(self, body):
+        self.client.send_message(QueueUrl=self.queue_url, MessageBody=body)
+
+    def get(self, max_count=10):
+        response = self.client.receive_message(
+            QueueUrl=self.queue_url, MaxNumberOfMessages=min(max_count, 10)
+        )
+        return [(m["ReceiptHandle"], m["Body"]) for m in response.get("Messages", [])]
+
+    def delete(self, receipt):
+        self.client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=receipt)
+
+
+event_queue = None
+
+
+# Get the configured event queue
+def get_event_queue():
+    global event_queue
+
+    if event_queue is None:
+        if EVENT_QUEUE == "memory":
+            event_queue = MemoryEventQueue()
+        elif EVENT_QUEUE == "sqlite":
+            event_queue = SQLiteEventQueue(EVENT_QUEUE_URL or "/tmp/events.db")
+        elif EVENT_QUEUE == "sqs":
+            event_queue = SQSEventQueue(EVENT_QUEUE_URL)
+        else:
+            raise ValueError("Unknown EVENT_QUEUE: {}".format(EVENT_QUEUE))
+
+    return event_queue
+
+
+# In-process state store (local testing and load tests only)
+class MemoryStateStore:
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.items = {}
+        self.lock = threading.Lock()
+
+    def live(self, key):
+        item = self.items.get(key)
+        if item is not None and item[1] is not None and item[1] <= self.clock():
+            del self.items[key]
+            item = None
+        return item
+
+    # Record key unless a live record exists; returns whether it was recorded
+    def claim(self, key, ttl):
+        with self.lock:
+            if self.live(key) is not None:
+                return False
+            self.items[key] = ({}, self.clock() + ttl)
+            return True
+
+    def get(self, key):
+        with self.lock:
+            item = self.live(key)
+            return dict(item[0]) if item is not None else None
+
+    def put(self, key, fields, ttl=None):
+        with self.lock:
+            self.items[key] = (dict(fields), self.clock() + ttl if ttl else None)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+
+# SQLite state store, shared by processes on the same host
+class SQLiteStateStore:
+    def __init__(self, path, clock=time.time):
+        self.clock = clock
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS state (id TEXT PRIMARY KEY, fields TEXT NOT NULL, expire_at REAL)"
+        )
+        self.lock = threading.Lock()
+
+    def claim(self, key, ttl):
+        now = self.clock()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute("DELETE FROM state WHERE id = ? AND expire_at <= ?", (key, now))
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO state (id, fields, expire_at) VALUES (?, '{}', ?)",
+                    (key, now + ttl),
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return cursor.rowcount == 1
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT fields, expire_at FROM state WHERE id = ?", (key,)
+            ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= self.clock()):
+            return None
+        return json.loads(row[0])
+
+    def put(self, key, fields, ttl=None):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO state (id, fields, expire_at) VALUES (?, ?, ?)",
+                (key, json.dumps(fields, ensure_ascii=False), self.clock() + ttl if ttl else None),
+            )
+
+    def delete(self, key):
+        with self.lock:
+            self.conn.execute("DELETE FROM state WHERE id = ?", (key,))
+
+
+# DynamoDB state store: one item per key, expired by the table's TTL on expire_at
+class DynamoDBStateStore:
+    THROTTLE_CODES = {"ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded"}
+
+    def __init__(self, max_retries=4, backoff=0.05, sleep=time.sleep):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.sleep = sleep
+
+    # Call a table method, backing off with jitter while DynamoDB throttles
+    def call(self, method, **kwargs):
+        from botocore.exceptions import ClientError
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                return getattr(get_table(), method)(**kwargs)
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in self.THROTTLE_CODES or attempt == self.max_retries:
+                    raise
+                delay = self.backoff * (2 ** attempt)
+                self.sleep(random.uniform(delay / 2, delay))
+
+    # Conditional write of a key-only record; throttled past the retries, the event is let through
+    def claim(self, key, ttl):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.call(
+                "put_item",
+                Item={"id": key, "expire_at": int(time.time()) + ttl},
+                ConditionExpression="attribute_not_exists(id)",
+            )
+            return True
+        except ClientError as e:
+            code = e.response["Error"]["Code"]
+            if code == "ConditionalCheckFailedException":
+                return False
+            if code in self.THROTTLE_CODES:
+                log.warning("state", "Throttled, handling without a dedupe record", key=key)
+                metrics.add("state_throttled", 1)
+                return True
+            raise
+
+    def get(self, key):
+        item = self.call("get_item", Key={"id": key}).get("Item")
+        if not item:
+            return None
+        if "expire_at" in item and int(item["expire_at"]) <= time.time():
+            return None
+        return {k: v for k, v in item.items() if k not in ("id", "expire_at")}
+
+    def put(self, key, fields, ttl=None):
+        item = dict(fields, id=key)
+        if ttl:
+            item["expire_at"] = int(time.time()) + ttl
+        self.call("put_item", Item=item)
+
+    def delete(self, key):
+        self.call("delete_item", Key={"id": key})
+
+
+state_store = None
+
+
+# Get the configured state store
+def get_state_store():
+    global state_store
+
+    if state_store is None:
+        if STATE_BACKEND == "dynamodb":
+            state_store = DynamoDBStateStore(STATE_MAX_RETRIES, STATE_BACKOFF)
+        elif STATE_BACKEND == "sqlite":
+            state_store = SQLiteStateStore(STATE_SQLITE_PATH)
+        elif STATE_BACKEND == "memory":
+            state_store = MemoryStateStore()
+        else:
+            raise ValueError("Unknown STATE_BACKEND: {}".format(STATE_BACKEND))
+
+    return state_store
 
 
 # Set assistant thread status (typing indicator)
 def set_thread_status(channel, thread_ts, status=""):
     try:
-        app.client.assistant_threads_setStatus(
+        slack_api.assistant_threads_setStatus(
             channel_id=channel,
             thread_ts=thread_ts,
             status=status,
         )
     except Exception as e:
-        print("set_thread_status: {}".format(e))
+        log.warning("set_thread_status", error=e)
+
+
+# Get the display name of a user, cached in memory and optionally in DynamoDB
+def get_user_name(user):
+    if user is None:
+        return "Unknown"
+
+    user_name = users_cache.get(user)
+    if user_name is not None:
+        return user_name
+
+    if USERS_CACHE_DYNAMODB:
+        try:
+            item = get_state_store().get("user#" + user)
+            if item:
+                users_cache.set(user, item["name"])
+                return item["name"]
+        except Exception as e:
+            log.warning("get_user_name", error=e)
+
+    try:
+        with metrics.span("user_lookup"):
+            user_info = slack_api.users_info(user=user)
+    except SlackApiError as e:
+        if e.response.get("error") != "user_not_found":
+            raise
+        # Remember missing users for a short time
+        users_cache.set(user, "Unknown", USERS_CACHE_NEGATIVE_TTL)
+        return "Unknown"
+
+    user_name = (
+        user_info.get("user", {})
+        .get("profile", {})
+        .get("display_name", "Unknown")
+    )
+
+    set_user_name(user, user_name)
+
+    return user_name
+
+
+# Store the display name of a user in the cache tiers
+def set_user_name(user, user_name):
+    users_cache.set(user, user_name)
+
+    if USERS_CACHE_DYNAMODB:
+        try:
+            get_state_store().put("user#" + user, {"name": user_name}, USERS_CACHE_TTL)
+        except Exception as e:
+            log.warning("set_user_name", error=e)
+
+
+# Refresh a display name only where it is already cached, so users the bot never looked up stay out
+def refresh_user_name(user, user_name):
+    users_cache.replace(user, user_name)
+
+    if USERS_CACHE_DYNAMODB:
+        try:
+            store = get_state_store()
+            if store.get("user#" + user):
+                store.put("user#" + user, {"name": user_name}, USERS_CACHE_TTL)
+        except Exception as e:
+            log.warning("refresh_user_name", error=e)
+
+
+token_encoding = None
+
+
+# Count the tokens of a text
+def count_text_tokens(text):
+    global token_encoding
+
+    if TOKEN_COUNTER == "tiktoken" and tiktoken is not None:
+        if token_encoding is None:
+            token_encoding = tiktoken.get_encoding("o200k_base")
+        return len(token_encoding.encode(text))
+
+    # ~4 ASCII characters per token, ~1 token per CJK/Hangul character (3 UTF-8 bytes)
+    size = len(text)
+    wide = (len(text.encode("utf-8")) - size) // 2
+    return (size - wide + 3) // 4 + wide
+
+
+# Count the tokens of a chat message (text or multi-part content)
+def count_message_tokens(message):
+    content = message.get("content") or ""
+
+    tokens = 4  # role and framing overhead
+    if isinstance(content, str):
+        return tokens + count_text_tokens(content)
+
+    for part in content:
+        if part.get("type") == "text":
+            tokens += count_text_tokens(part.get("text", ""))
+        elif part.get("type") == "image_url":
+            detail = part.get("image_url", {}).get("detail", "auto")
+            tokens += IMAGE_TOKENS.get(detail, IMAGE_TOKENS["auto"])
+
+    return tokens
+
+
+# Get the prompt token budget of a model
+def context_budget(model=None):
+    model = model or OPENAI_MODEL
+
+    window = 128000
+    prefixes = [p for p in MODEL_CONTEXT_WINDOWS if model.startswith(p)]
+    if prefixes:
+        window = MODEL_CONTEXT_WINDOWS[max(prefixes, key=len)]
+
+    budget = window - MAX_TOKENS_REPLY
+    if MAX_TOKENS_OPENAI > 0:
+        budget = min(budget, MAX_TOKENS_OPENAI)
+
+    return budget
+
+
+# Drop the oldest messages (oldest first) until the rest fit in the token budget. The cut moves
+# in steps of HISTORY_TRIM_STEP messages, so the kept history starts at the same message for
+# several turns and the provider's prompt cache keeps matching its prefix.
+def trim_history(messages, budget, step=None):
+    step = max(1, step or HISTORY_TRIM_STEP)
+
+    used = sum(count_message_tokens(m) for m in messages)
+    start = 0
+    while used > budget and start < len(messages):
+        used -= count_message_tokens(messages[start])
+        start += 1
+
+    if start:
+        start = min(len(messages), -(-start // step) * step)
+
+    return messages[start:]
+
+
+# Without MODEL_ROUTES the image prompt rewrite and thread summaries go to the small model
+DEFAULT_MODEL_ROUTES = [
+    {"site": "rewrite", "models": ["small", "default"]},
+    {"site": "summary", "models": ["small", "default"]},
+]
+
+# OpenAI errors another model may not hit: unknown model, timeouts, rate limits, server errors
+MODEL_FALLBACK_STATUS = {404, 408, 409, 429}
+
+
+# Pick a model chain per call site and request features, fall back along it, and keep latency per route
+class ModelRouter:
+    def __init__(self, rules=None, clock=time.perf_counter):
+        self.rules = DEFAULT_MODEL_ROUTES if rules is None else rules
+        self.clock = clock
+        self.counters = collections.defaultdict(collections.Counter)
+        self.lock = threading.Lock()
+
+    # Request features: prompt tokens, attached images and prior messages
+    @staticmethod
+    def features(messages):
+        tokens = 0
+        images = 0
+        for message in messages:
+            tokens += count_message_tokens(message)
+            if not isinstance(message.get("content"), str):
+                images += sum(1 for part in message["content"] if part.get("type") == "image_url")
+
+        thread = sum(1 for m in messages if m["role"] != "system") - 1
+        return {"prompt_tokens": tokens, "images": images, "thread": max(0, thread)}
+
+    @staticmethod
+    def matches(rule, site, features):
+        if rule.get("site", site) != site:
+            return False
+        if "images" in rule and rule["images"] != (features["images"] > 0):
+            return False
+
+        for name in ("prompt_tokens", "thread"):
+            if features[name] < rule.get("min_" + name, 0):
+                return False
+            if "max_" + name in rule and features[name] > rule["max_" + name]:
+                return False
+
+        return True
+
+    # Model names to try in order; the default model always ends the chain
+    def route(self, site, messages):
+        features = self.features(messages)
+
+        models = []
+        for rule in self.rules:
+            if self.matches(rule, site, features):
+                models = rule.get("models") or []
+                models = [models] if isinstance(models, str) else models
+                break
+
+        aliases = {"default": OPENAI_MODEL, "small": OPENAI_MODEL_SMALL or OPENAI_MODEL}
+
+        chain = []
+        for model in list(models) + ["default"]:
+            model = aliases.get(model, model)
+            if model not in chain:
+                chain.append(model)
+
+        return chain
+
+    @staticmethod
+    def fallback(error):
+        import openai
+
+        if isinstance(error, openai.APIConnectionError):
+            return True
+
+        status = getattr(error, "status_code", None)
+        return isinstance(status, int) and (status in MODEL_FALLBACK_STATUS or status >= 500)
+
+    def record(self, site, model, started, error=None):
+        ms = (self.clock() - started) * 1000
+
+        with self.lock:
+            counter = self.counters["{}:{}".format(site, model)]
+            counter["calls"] += 1
+            counter["errors"] += 1 if error is not None else 0
+            counter["ms"] += ms
+            counter["max_ms"] = max(counter["max_ms"], ms)
+
+        metrics.add("model_" + site, ms, "Milliseconds")
+        log.debug("model_route", site=site, model=model, ms=round(ms), error=error)
+
+    def next_model(self, site, chain, index, error):
+        if index + 1 >= len(chain) or not self.fallback(error):
+            return False
+
+        log.warning("model_route", "{} failed, falling back to {}", chain[index], chain[index + 1], site=site, error=error)
+        metrics.add("model_fallbacks", 1)
+        return True
+
+    # Call create(model) along the chain until one succeeds
+    def call(self, site, messages, create):
+        chain = self.route(site, messages)
+
+        for index, model in enumerate(chain):
+            started = self.clock()
+            try:
+                result = create(model)
+            except Exception as e:
+                self.record(site, model, started, e)
+                if not self.next_model(site, chain, index, e):
+                    e.models = chain[:index + 1]
+                    raise
+                continue
+
+            self.record(site, model, started)
+            return result
+
+    async def call_async(self, site, messages, create):
+        chain = self.route(site, messages)
+
+        for index, model in enumerate(chain):
+            started = self.clock()
+            try:
+                result = await create(model)
+            except Exception as e:
+                self.record(site, model, started, e)
+                if not self.next_model(site, chain, index, e):
+                    e.models = chain[:index + 1]
+                    raise
+                continue
+
+            self.record(site, model, started)
+            return result
+
+    # Models tried before a call raised error, None if it did not come from the router
+    @staticmethod
+    def tried(error):
+        return getattr(error, "models", None)
+
+    # Calls, errors and latency (average, max ms) per site:model
+    def stats(self):
+        with self.lock:
+            return {
+                route: {
+                    "calls": counter["calls"],
+                    "errors": counter["errors"],
+                    "avg_ms": round(counter["ms"] / counter["calls"]),
+                    "max_ms": round(counter["max_ms"]),
+                }
+                for route, counter in self.counters.items()
+            }
+
+
+# Parse MODEL_ROUTES; a setting that is not a JSON list of rules falls back to the default rules
+def load_model_routes(value):
+    if not value:
+        return None
+
+    try:
+        rules = json.loads(value)
+    except ValueError as e:
+        log.warning("model_route", "Ignoring invalid MODEL_ROUTES", error=e)
+        return None
+
+    if not isinstance(rules, list) or not all(isinstance(rule, dict) for rule in rules):
+        log.warning("model_route", "Ignoring MODEL_ROUTES, expected a JSON list of rules")
+        return None
+
+    return rules
+
+
+model_router = ModelRouter(load_model_routes(MODEL_ROUTES))
 
 
 # Replace text
@@ -91,43 +1411,43 @@ def replace_text(text):
     return text
 
 
-# Update the message in Slack
-def chat_update(say, channel, thread_ts, latest_ts, message="", continue_thread=False):
-    # print("chat_update: {}".format(message))
+# Split a message that is too long for Slack into the text to post and the rest
+def split_message(message):
+    split_key = "\n\n"
+    if "```" in message:
+        split_key = "```"
 
-    if len(message) > MAX_LEN_SLACK:
-        split_key = "\n\n"
-        if "```" in message:
-            split_key = "```"
+    parts = message.split(split_key)
 
-        parts = message.split(split_key)
+    # Fallback: force split at MAX_LEN_SLACK if no split point found
+    if len(parts) <= 1:
+        return message[:MAX_LEN_SLACK], message[MAX_LEN_SLACK:]
 
-        # Fallback: force split at MAX_LEN_SLACK if no split point found
-        if len(parts) <= 1:
-            text = message[:MAX_LEN_SLACK]
-            message = message[MAX_LEN_SLACK:]
-        else:
-            last_one = parts.pop()
+    last_one = parts.pop()
 
-            if len(parts) % 2 == 0:
-                text = split_key.join(parts) + split_key
-                message = last_one
-            else:
-                text = split_key.join(parts)
-                message = split_key + last_one
+    if len(parts) % 2 == 0:
+        return split_key.join(parts) + split_key, last_one
+
+    return split_key.join(parts), split_key + last_one
+
+
+# Update the message in Slack
+def chat_update(say, channel, thread_ts, latest_ts, message="", continue_thread=False):
+    if len(message) > MAX_LEN_SLACK:
+        text, message = split_message(message)
 
         text = replace_text(text)
 
         # Update the message
-        app.client.chat_update(channel=channel, ts=latest_ts, text=text)
+        slack_api.chat_update(channel=channel, ts=latest_ts, text=text)
 
         if continue_thread:
             text = replace_text(message) + " " + BOT_CURSOR
         else:
             text = replace_text(message)
 
-        # New message
-        result = say(text=text, thread_ts=thread_ts)
+        # New message, through the limiter like the update
+        result = slack_api.chat_postMessage(channel=channel, text=text, thread_ts=thread_ts)
         latest_ts = result["ts"]
     else:
         if continue_thread:
@@ -136,76 +1456,564 @@ def chat_update(say, channel, thread_ts, latest_ts, message="", continue_thread=
             text = replace_text(message)
 
         # Update the message
-        app.client.chat_update(channel=channel, ts=latest_ts, text=text)
+        slack_api.chat_update(channel=channel, ts=latest_ts, text=text)
 
     return message, latest_ts
 
 
-# Reply to the message
-def reply_text(messages, say, channel, thread_ts, latest_ts, user):
-    stream = openai.chat.completions.create(
-        model=OPENAI_MODEL,
-        messages=messages,
-        stream=True,
-        user=user,
-    )
+# Decide when a streamed reply should be flushed to Slack
+class FlushScheduler:
+    def __init__(self, interval=None, size=None, clock=time.monotonic):
+        self.interval = STREAM_FLUSH_INTERVAL if interval is None else interval
+        self.size = STREAM_FLUSH_SIZE if size is None else size
+        self.clock = clock
+        self.rtt = 0.0
+        self.pending = 0
+        self.flushes = 0
+        self.last_flush = clock()
+
+    def add(self, text):
+        self.pending += len(text)
+
+    def due(self):
+        if self.pending == 0:
+            return False
+
+        # Show the first words as soon as they arrive
+        if self.flushes == 0:
+            return True
+
+        # Never update faster than Slack can answer
+        interval = max(self.interval, self.rtt * 2)
+        elapsed = self.clock() - self.last_flush
+
+        if elapsed >= interval:
+            return True
+
+        return self.pending >= self.size and elapsed >= interval / 2
+
+    def flush(self, update):
+        self.pending = 0
+        started = self.clock()
+        result = update()
+        self.record(started)
+        return result
+
+    # Text added while the update is in flight stays pending
+    async def flush_async(self, update):
+        self.pending = 0
+        started = self.clock()
+        result = await update()
+        self.record(started)
+        return result
+
+    def record(self, started):
+        finished = self.clock()
+
+        sample = finished - started
+        self.rtt = sample if self.flushes == 0 else self.rtt * 0.8 + sample * 0.2
+
+        metrics.add("slack_flush", sample * 1000, "Milliseconds")
+        metrics.add("flushes", 1)
+
+        self.flushes += 1
+        self.last_flush = finished
+
+
+# Render a streamed reply into Slack messages, converting each finished block once
+class StreamRenderer:
+    def __init__(self, limit=None):
+        self.limit = MAX_LEN_SLACK if limit is None else limit
+        self.pages = []  # filled messages not posted yet
+        self.head = ""  # converted blocks of the current message
+        self.tail = ""  # raw text of the block being streamed
+        self.scanned = 0
+        self.fence = False
+        self.chunks = []
+
+    def feed(self, text):
+        self.chunks.append(text)
+
+        # Long text goes in slices so finished blocks stay close to the limit
+        step = max(1, self.limit // 4)
+        for start in range(0, len(text), step):
+            piece = text[start:start + step]
+            self.tail += piece
+
+            # Only a backtick or a newline can finish a block
+            if "`" in piece or "\n" in piece:
+                self.scan()
+            if len(self.head) + len(self.tail) > self.limit:
+                self.overflow()
+
+    # Find finished blocks: paragraphs outside code, and whole code blocks
+    def scan(self):
+        while True:
+            fence = self.tail.find("```", self.scanned)
+            paragraph = -1 if self.fence else self.tail.find("\n\n", self.scanned)
+
+            if fence < 0 and paragraph < 0:
+                # A marker may be cut between chunks
+                self.scanned = max(self.scanned, len(self.tail) - 2)
+                return
+
+            marker = paragraph < 0 or 0 <= fence < paragraph
+            if marker:
+                end = fence + 3 if self.fence else fence
+            else:
+                end = paragraph + 2
+
+            # A finished block longer than a message is cut first, then scanned again
+            if end > self.limit:
+                if self.head:
+                    self.pages.append(self.head)
+                    self.head = ""
+                self.cut()
+                continue
 
-    counter = 0
-    message = ""
-    for part in stream:
-        reply = part.choices[0].delta.content or ""
+            self.close(end)
+            if marker:
+                # The opening fence stays at the start of the code block
+                self.fence = not self.fence
+                self.scanned = 3 if self.fence else 0
+
+    def close(self, end):
+        block = replace_text(self.tail[:end])
+        self.tail = self.tail[end:]
+        self.scanned = 0
+
+        if self.head and len(self.head) + len(block) > self.limit:
+            self.pages.append(self.head)
+            self.head = ""
+        self.head += block
+
+    # Move on to a new message once the current one is full
+    def overflow(self):
+        while len(self.head) + len(self.tail) > self.limit:
+            if self.head:
+                self.pages.append(self.head)
+                self.head = ""
+                continue
 
-        if reply:
-            message += reply
+            self.cut()
 
-        if counter % 16 == 1:
-            message, latest_ts = chat_update(
-                say, channel, thread_ts, latest_ts, message, True
-            )
+    # A single block is too long: cut a message off it at a line break, keeping code fenced
+    def cut(self):
+        room = self.limit - 4 if self.fence else self.limit
+        cut = self.tail.rfind("\n", room // 2, room) + 1 or room
+        piece = replace_text(self.tail[:cut])
+        self.tail = self.tail[cut:]
 
-        counter = counter + 1
+        if self.fence:
+            self.pages.append(piece + ("```" if piece.endswith("\n") else "\n```"))
+            self.tail = "```\n" + self.tail
+            self.scanned = max(3, self.scanned - cut + 4)
+        else:
+            self.pages.append(piece)
+            self.scanned = max(0, self.scanned - cut)
 
-    chat_update(say, channel, thread_ts, latest_ts, message)
+    # Take the texts to post: filled messages first, then the current one
+    def take(self, continue_thread=False):
+        text = self.head + replace_text(self.tail)
+        if continue_thread:
+            text += " " + BOT_CURSOR
 
-    return message
+        texts = self.pages + [text]
+        self.pages = []
 
+        # Don't post an empty message after a filled one
+        if len(texts) > 1 and not texts[-1].strip():
+            texts.pop()
 
-# Reply to the image
-def reply_image(prompt, say, channel, thread_ts, latest_ts):
-    response = openai.images.generate(
-        model=IMAGE_MODEL,
-        prompt=prompt,
-        size=IMAGE_SIZE,
-        n=1,
-    )
+        return texts
 
-    print("reply_image: model={}, has_url={}, has_b64={}".format(
-        IMAGE_MODEL,
-        response.data[0].url is not None,
-        response.data[0].b64_json is not None,
-    ))
+    def text(self):
+        return "".join(self.chunks)
 
-    revised_prompt = response.data[0].revised_prompt or prompt
 
-    # Some models (e.g., gpt-image-1.5) return b64_json instead of url
-    image_url = response.data[0].url
-    b64_json = response.data[0].b64_json
+# Post rendered texts: update the current message, then continue in new ones
+def post_rendered(say, channel, thread_ts, latest_ts, texts):
+    slack_api.chat_update(channel=channel, ts=latest_ts, text=texts[0])
 
-    if b64_json:
-        file = base64.b64decode(b64_json)
-        filename = "{}.png".format(IMAGE_MODEL)
-    elif image_url:
-        file_ext = image_url.split(".")[-1].split("?")[0]
-        filename = "{}.{}".format(IMAGE_MODEL, file_ext)
-        file = get_image_from_url(image_url)
-    else:
-        raise ValueError("No image data returned from OpenAI")
+    for text in texts[1:]:
+        result = slack_api.chat_postMessage(channel=channel, text=text, thread_ts=thread_ts)
+        latest_ts = result["ts"]
 
-    response = app.client.files_upload_v2(
-        channel=channel, filename=filename, file=file, thread_ts=thread_ts
+    return latest_ts
+
+
+# Stream a reply into one Slack message, sending only the text added since the last flush. Any error,
+# from Slack or the transport, drops the streamed message and hands the reply back to chat.update.
+class SlackStream:
+    def __init__(self, channel, thread_ts, placeholder_ts, user=None, team=None):
+        self.channel = channel
+        self.thread_ts = thread_ts
+        self.placeholder_ts = placeholder_ts
+        self.user = user
+        self.team = team
+        self.ts = None
+        self.sent = 0
+        self.active = True
+
+    # Calls for the text not sent yet, each within SLACK_STREAM_MAX_CHARS
+    def calls(self, text, final):
+        delta = text[self.sent:]
+        pieces = [delta[i:i + SLACK_STREAM_MAX_CHARS] for i in range(0, len(delta), SLACK_STREAM_MAX_CHARS)]
+
+        calls = []
+        if self.ts is None:
+            kwargs = {"channel": self.channel, "thread_ts": self.thread_ts}
+            # Required when streaming into a channel
+            if self.user:
+                kwargs["recipient_user_id"] = self.user
+            if self.team:
+                kwargs["recipient_team_id"] = self.team
+            if pieces:
+                kwargs["markdown_text"] = pieces.pop(0)
+            calls.append(("chat_startStream", kwargs))
+
+        if final:
+            last = pieces.pop() if pieces else None
+        for piece in pieces:
+            calls.append(("chat_appendStream", {"channel": self.channel, "markdown_text": piece}))
+        if final:
+            kwargs = {"channel": self.channel}
+            if last:
+                kwargs["markdown_text"] = last
+            calls.append(("chat_stopStream", kwargs))
+
+        return calls
+
+    def sent_call(self, method, kwargs, result):
+        if method == "chat_startStream":
+            self.ts = result["ts"]
+        self.sent += len(kwargs.get("markdown_text", ""))
+
+    def failed(self, error):
+        log.warning("slack_stream", "Falling back to chat.update", error=error)
+        metrics.add("slack_stream_fallbacks", 1)
+        self.active = False
+
+    # Send the new text (and stop the stream when final); False once the caller must use chat.update
+    def flush(self, text, final=False):
+        # An empty reply stays on the placeholder
+        if not self.active or (self.ts is None and not text):
+            return False
+
+        try:
+            for method, kwargs in self.calls(text, final):
+                if method != "chat_startStream":
+                    kwargs["ts"] = self.ts
+                self.sent_call(method, kwargs, getattr(slack_api, method)(**kwargs))
+        except Exception as e:
+            self.failed(e)
+            self.delete(self.ts)
+            return False
+
+        if final:
+            self.delete(self.placeholder_ts)
+        return True
+
+    def delete(self, ts):
+        if ts is None:
+            return
+        try:
+            slack_api.chat_delete(channel=self.channel, ts=ts)
+        except Exception as e:
+            log.warning("slack_stream", error=e)
+
+    # Drop the partial message, leaving the error message to the placeholder
+    def abort(self):
+        if self.active:
+            self.active = False
+            self.delete(self.ts)
+
+    async def flush_async(self, text, final=False):
+        if not self.active or (self.ts is None and not text):
+            return False
+
+        try:
+            for method, kwargs in self.calls(text, final):
+                if method != "chat_startStream":
+                    kwargs["ts"] = self.ts
+                self.sent_call(method, kwargs, await getattr(async_slack_api, method)(**kwargs))
+        except Exception as e:
+            self.failed(e)
+            await self.delete_async(self.ts)
+            return False
+
+        if final:
+            await self.delete_async(self.placeholder_ts)
+        return True
+
+    async def delete_async(self, ts):
+        if ts is None:
+            return
+        try:
+            await async_slack_api.chat_delete(channel=self.channel, ts=ts)
+        except Exception as e:
+            log.warning("slack_stream", error=e)
+
+    async def abort_async(self):
+        if self.active:
+            self.active = False
+            await self.delete_async(self.ts)
+
+
+# Start a native Slack stream for a thread reply when STREAM_RENDERER is "native"
+def slack_stream_for(channel, thread_ts, latest_ts, user, team=None):
+    if STREAM_RENDERER != "native" or thread_ts is None:
+        return None
+    return SlackStream(channel, thread_ts, latest_ts, user, team)
+
+
+# Flush a streamed reply: natively when streaming, else rewrite the messages with chat.update
+def flush_reply(slack_stream, renderer, say, channel, thread_ts, latest_ts, continue_thread=False):
+    if slack_stream is not None and slack_stream.flush(renderer.text(), not continue_thread):
+        return latest_ts
+    return post_rendered(say, channel, thread_ts, latest_ts, renderer.take(continue_thread))
+
+
+# Response cache key: model and normalized messages, or None unless a standalone text prompt
+def response_cache_key(messages):
+    normalized = []
+    for message in messages:
+        if message["role"] not in ("system", "user"):
+            return None
+
+        content = message["content"]
+        parts = [content] if isinstance(content, str) else []
+        if not isinstance(content, str):
+            for part in content:
+                if part.get("type") != "text":
+                    return None
+                parts.append(part["text"])
+
+        normalized.append(
+            [message["role"]] + [" ".join(unicodedata.normalize("NFC", p).split()) for p in parts]
+        )
+
+    if sum(1 for m in normalized if m[0] == "user") != 1:
+        return None
+
+    data = json.dumps([model_router.route("chat", messages)[0], normalized], ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+# Get a cached reply, from memory or the compressed shared tier
+def get_cached_response(key):
+    text = responses_cache.get(key)
+    if text is not None:
+        return text
+
+    if RESPONSE_CACHE_DYNAMODB:
+        try:
+            item = get_state_store().get("response#" + key)
+            if item:
+                text = zlib.decompress(base64.b64decode(item["reply"])).decode("utf-8")
+                responses_cache.set(key, text)
+                return text
+        except Exception as e:
+            log.warning("get_cached_response", error=e)
+
+    return None
+
+
+# Store a finished reply in the cache tiers
+def set_cached_response(key, text):
+    if not text or len(text) > RESPONSE_CACHE_MAX_CHARS:
+        return
+
+    responses_cache.set(key, text)
+
+    if RESPONSE_CACHE_DYNAMODB:
+        try:
+            reply = base64.b64encode(zlib.compress(text.encode("utf-8"))).decode("ascii")
+            get_state_store().put("response#" + key, {"reply": reply}, RESPONSE_CACHE_TTL)
+        except Exception as e:
+            log.warning("set_cached_response", error=e)
+
+
+# Post a cached reply through the renderer, like a stream that finished at once
+def replay_text(text, say, channel, thread_ts, latest_ts):
+    renderer = StreamRenderer()
+    renderer.feed(text)
+    post_rendered(say, channel, thread_ts, latest_ts, renderer.take())
+
+    metrics.add("response_cache_hits", 1)
+
+    return text
+
+
+# Reply to the message
+def reply_text(messages, say, channel, thread_ts, latest_ts, user, team=None):
+    started = time.perf_counter()
+
+    cache_key = response_cache_key(messages) if RESPONSE_CACHE else None
+    if cache_key:
+        text = get_cached_response(cache_key)
+        if text is not None:
+            return replay_text(text, say, channel, thread_ts, latest_ts)
+
+    stream = model_router.call("chat", messages, lambda model: get_openai().chat.completions.create(
+        model=model,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True},
+        user=user,
+    ))
+
+    scheduler = FlushScheduler()
+    renderer = StreamRenderer()
+    slack_stream = slack_stream_for(channel, thread_ts, latest_ts, user, team)
+    finish_reason = None
+    usage = None
+
+    try:
+        for part in stream:
+            # The usage chunk comes last, with no choices
+            if not part.choices:
+                usage = part.usage
+                continue
+
+            reply = part.choices[0].delta.content or ""
+            finish_reason = part.choices[0].finish_reason or finish_reason
+
+            if reply:
+                if not renderer.chunks:
+                    metrics.add("openai_first_token", (time.perf_counter() - started) * 1000, "Milliseconds")
+                renderer.feed(reply)
+                scheduler.add(reply)
+
+            if scheduler.due():
+                latest_ts = scheduler.flush(
+                    lambda: flush_reply(slack_stream, renderer, say, channel, thread_ts, latest_ts, True)
+                )
+
+        # Always flush the final text without the cursor
+        scheduler.flush(lambda: flush_reply(slack_stream, renderer, say, channel, thread_ts, latest_ts))
+    except Exception:
+        # Never leave a half-streamed message behind, whatever broke off the reply
+        if slack_stream is not None:
+            slack_stream.abort()
+        raise
+
+    log.info("reply_text", flushes=scheduler.flushes, rtt=round(scheduler.rtt, 3))
+
+    add_reply_metrics(messages, renderer.text(), started, usage)
+
+    # Only complete answers are worth replaying
+    if cache_key and finish_reason == "stop":
+        set_cached_response(cache_key, renderer.text())
+
+    return renderer.text()
+
+
+# Record the reply's duration and token counts (from the stream's usage, else estimated)
+def add_reply_metrics(messages, text, started, usage=None):
+    cached_tokens = None
+    if usage is not None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
+        log.info("openai_usage", prompt_tokens=usage.prompt_tokens, cached_tokens=cached_tokens)
+
+    if not metrics.enabled:
+        return
+
+    metrics.add("openai_reply", (time.perf_counter() - started) * 1000, "Milliseconds")
+
+    if usage is not None:
+        metrics.add("prompt_tokens", usage.prompt_tokens)
+        metrics.add("completion_tokens", usage.completion_tokens)
+        metrics.add("cached_tokens", cached_tokens)
+    else:
+        metrics.add("prompt_tokens", sum(count_message_tokens(m) for m in messages))
+        metrics.add("completion_tokens", count_text_tokens(text))
+
+
+# Decode base64 image data into a file in chunks
+def spool_base64(b64_json, file, chunk_size=1024 * 1024):
+    # Chunk boundaries must fall on 4-character base64 groups
+    chunk_size -= chunk_size % 4
+    for start in range(0, len(b64_json), chunk_size):
+        file.write(base64.b64decode(b64_json[start:start + chunk_size]))
+
+
+# Download an image URL into a file in chunks
+def spool_url(image_url, file):
+    with get_http_session().get(image_url, timeout=IMAGE_FETCH_TIMEOUT, stream=True) as response:
+        if response.status_code != 200:
+            log.warning("spool_url", "Failed to fetch image", url=image_url)
+            return False
+
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            file.write(chunk)
+
+    return True
+
+
+# Upload a file to Slack, streaming it from disk (files.getUploadURLExternal flow)
+def upload_file(channel, thread_ts, filename, file, length):
+    url_response = slack_api.files_getUploadURLExternal(filename=filename, length=length)
+
+    upload = get_http_session().post(url_response["upload_url"], data=file, timeout=60)
+    if upload.status_code != 200:
+        raise ValueError("Failed to upload file: {}".format(upload.status_code))
+
+    return slack_api.files_completeUploadExternal(
+        files=[{"id": url_response["file_id"], "title": filename}],
+        channel_id=channel,
+        thread_ts=thread_ts,
+    )
+
+
+# Spool a generated image to disk and upload it to the thread
+def upload_image(channel, thread_ts, image_url, b64_json):
+    with tempfile.TemporaryFile() as file:
+        if b64_json:
+            spool_base64(b64_json, file)
+            filename = "{}.png".format(IMAGE_MODEL)
+        elif image_url:
+            file_ext = image_url.split(".")[-1].split("?")[0]
+            filename = "{}.{}".format(IMAGE_MODEL, file_ext)
+            if not spool_url(image_url, file):
+                raise ValueError("Failed to fetch image from OpenAI")
+        else:
+            raise ValueError("No image data returned from OpenAI")
+
+        length = file.tell()
+        file.seek(0)
+
+        with metrics.span("image_upload"):
+            return upload_file(channel, thread_ts, filename, file, length)
+
+
+# Reply to the image
+def reply_image(prompt, say, channel, thread_ts, latest_ts):
+    with metrics.span("image_generate"):
+        response = get_openai().images.generate(
+            model=IMAGE_MODEL,
+            prompt=prompt,
+            size=IMAGE_SIZE,
+            n=1,
+        )
+
+    log.info(
+        "reply_image",
+        model=IMAGE_MODEL,
+        has_url=response.data[0].url is not None,
+        has_b64=response.data[0].b64_json is not None,
     )
 
-    print("reply_image: {}".format(response))
+    revised_prompt = response.data[0].revised_prompt or prompt
+
+    # Some models (e.g., gpt-image-1.5) return b64_json instead of url
+    image_url = response.data[0].url
+    b64_json = response.data[0].b64_json
+
+    response = upload_image(channel, thread_ts, image_url, b64_json)
+
+    log.debug("reply_image", response=response)
 
     chat_update(say, channel, thread_ts, latest_ts, revised_prompt)
 
@@ -216,21 +2024,13 @@ def reply_image(prompt, say, channel, thread_ts, latest_ts):
 def get_reactions(reactions):
     try:
         reaction_map = {}
-        reaction_users_cache = {}
         for reaction in reactions:
             reaction_name = ":" + reaction.get("name").split(":")[0] + ":"
             if reaction_name not in reaction_map:
                 reaction_map[reaction_name] = []
             reaction_users = reaction.get("users", [])
             for reaction_user in reaction_users:
-                if reaction_user not in reaction_users_cache:
-                    reaction_user_info = app.client.users_info(user=reaction_user)
-                    reaction_users_cache[reaction_user] = (
-                        reaction_user_info.get("user", {})
-                        .get("profile", {})
-                        .get("display_name", "Unknown")
-                    )
-                reaction_map[reaction_name].append(reaction_users_cache[reaction_user])
+                reaction_map[reaction_name].append(get_user_name(reaction_user))
         reaction_text = ""
         for reaction_name, reaction_users in reaction_map.items():
             reaction_text += "[{} '{}' reaction users: {}] ".format(
@@ -238,332 +2038,1166 @@ def get_reactions(reactions):
             )
         return reaction_text
     except Exception as e:
-        print("get_reactions: {}".format(e))
+        log.warning("get_reactions", error=e)
         return ""
 
 
-# Get thread messages using conversations.replies API method
-def conversations_replies(channel, ts, client_msg_id, messages=None, message_type=""):
-    if messages is None:
-        messages = []
-    try:
-        response = app.client.conversations_replies(channel=channel, ts=ts)
+# Get the processed history of a thread (cursor + entries, oldest first)
+def get_thread_history(key):
+    history = threads_cache.get(key)
+    if history is not None:
+        return history
+
+    if THREAD_CACHE_DYNAMODB:
+        try:
+            item = get_state_store().get("thread#" + key)
+            if item:
+                history = {"cursor": item["cursor"], "entries": json.loads(item["entries"])}
+                threads_cache.set(key, history)
+                return history
+        except Exception as e:
+            log.warning("get_thread_history", error=e)
+
+    return None
+
+
+# Store the processed history of a thread
+def set_thread_history(key, cursor, entries):
+    entries = entries[-THREAD_CACHE_MAX_MESSAGES:]
+    threads_cache.set(key, {"cursor": cursor, "entries": entries})
+
+    if THREAD_CACHE_DYNAMODB:
+        try:
+            get_state_store().put(
+                "thread#" + key,
+                {"cursor": cursor, "entries": json.dumps(entries, ensure_ascii=False)},
+                THREAD_CACHE_TTL,
+            )
+        except Exception as e:
+            log.warning("set_thread_history", error=e)
+
+
+# Get the rolling summary of a thread ({"summary", "cursor"}), from memory or the state store
+def get_thread_summary(key):
+    summary = summaries_cache.get(key)
+    if summary is not None:
+        return summary
+
+    try:
+        item = get_state_store().get("summary#" + key)
+        if item:
+            summary = {"summary": item["summary"], "cursor": item["cursor"]}
+            summaries_cache.set(key, summary)
+            return summary
+    except Exception as e:
+        log.warning("get_thread_summary", error=e)
+
+    return None
+
+
+# Store the rolling summary of a thread, covering messages up to cursor
+def set_thread_summary(key, summary, cursor):
+    summaries_cache.set(key, {"summary": summary, "cursor": cursor})
+
+    try:
+        get_state_store().put("summary#" + key, {"summary": summary, "cursor": cursor}, THREAD_CACHE_TTL)
+    except Exception as e:
+        log.warning("set_thread_summary", error=e)
+
+
+# Fold thread entries (oldest first) into the previous summary
+def update_thread_summary(key, previous, entries):
+    prompts = []
+    if previous:
+        prompts.append("Summary so far:\n" + previous["summary"])
+    prompts.append("\n".join("{}: {}".format(e["role"], e["content"]) for e in entries))
+    prompts.append(COMMAND_SUMMARIZE.format(THREAD_SUMMARY_WORDS))
+
+    messages = [{"role": "user", "content": "\n\n\n".join(prompts)}]
+
+    with metrics.span("thread_summary"):
+        response = model_router.call("summary", messages, lambda model: get_openai().chat.completions.create(
+            model=model,
+            messages=messages,
+        ))
+
+    set_thread_summary(key, response.choices[0].message.content, entries[-1]["ts"])
+
+
+# Queue a summary update once the settled history older than the kept messages grows past the threshold,
+# so a fresh summary waits for that much new history instead of being redone every turn
+def schedule_thread_summary(key, summary, entries, committed):
+    older = entries[:min(committed, len(entries) - THREAD_SUMMARY_KEEP)]
+    if sum(count_message_tokens(e) for e in older) <= THREAD_SUMMARY_TOKENS:
+        return
+
+    defer(lambda: update_thread_summary(key, summary, older))
+
+
+# Fetch thread replies newer than oldest (all pages, oldest first)
+def fetch_thread_replies(channel, ts, oldest=None):
+    res_messages = []
+    cursor = None
+
+    while True:
+        kwargs = {"channel": channel, "ts": ts, "limit": 200}
+        if oldest:
+            kwargs["oldest"] = oldest
+        if cursor:
+            kwargs["cursor"] = cursor
+
+        with metrics.span("thread_history"):
+            response = slack_api.conversations_replies(**kwargs)
+
+        log.debug("conversations_replies", response=response)
+
+        if not response.get("ok"):
+            log.warning("conversations_replies", "Failed to retrieve thread messages.")
+
+        res_messages.extend(response.get("messages", []))
+
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            break
+
+    # The parent message is always returned, even with oldest
+    if oldest:
+        res_messages = [m for m in res_messages if float(m.get("ts", 0)) > float(oldest)]
+
+    return res_messages
+
+
+# Get thread messages using conversations.replies API method
+def conversations_replies(channel, ts, client_msg_id, messages=None, message_type=""):
+    if messages is None:
+        messages = []
+    try:
+        key = "{}:{}".format(channel, ts)
+
+        # Reactions change over time, so emoji prompts always read the whole thread
+        history = None
+        if message_type != "emoji":
+            history = get_thread_history(key)
+
+        cursor = history["cursor"] if history else None
+        entries = list(history["entries"]) if history else []
+
+        res_messages = fetch_thread_replies(channel, ts, cursor)
+
+        if not res_messages and not entries:
+            return messages
+
+        first_ts = str(res_messages[0].get("ts")) if res_messages else None
+
+        if res_messages:
+            res_messages.pop()  # remove the latest message
+
+        # Only messages before the first skipped one are final enough to cache
+        committed = len(entries)
+        settled = True
+
+        for message in res_messages:
+            if message.get("client_msg_id", "") == client_msg_id:
+                settled = False
+                continue
+
+            role = "user"
+            if message.get("bot_id", "") != "":
+                role = "assistant"
+
+            # 메세지에 유저 이름을 추가 (cached)
+            user_name = get_user_name(message.get("user"))
+            text = message.get("text", "")
+            content = "{}: {}".format(user_name, text)
+
+            entries.append(
+                {
+                    "ts": str(message.get("ts")),
+                    "role": role,
+                    "content": content,
+                }
+            )
+
+            # prompt 에 이모지 키워드가 있고, 첫번째 메시지에 리액션이 있으면 리액션을 추가
+            if message_type == "emoji" and first_ts == str(message.get("ts")):
+                reactions = get_reactions(message.get("reactions", []))
+                if reactions != "":
+                    entries.append(
+                        {
+                            "ts": first_ts,
+                            "role": role,
+                            "content": "reactions {}".format(reactions),
+                        }
+                    )
+
+            # A reply that is still streaming will change
+            if role == "assistant" and text.endswith(BOT_CURSOR):
+                settled = False
+
+            if settled:
+                committed = len(entries)
+
+        if message_type != "emoji" and committed > 0 and (history is None or committed > len(history["entries"])):
+            set_thread_history(key, entries[committed - 1]["ts"], entries[:committed])
+
+        # Earlier messages are covered by the thread's summary
+        if THREAD_SUMMARY:
+            summary = get_thread_summary(key)
+            if summary:
+                cursor = float(summary["cursor"])
+                kept = [e for e in entries[:committed] if float(e["ts"]) > cursor]
+                entries = kept + entries[committed:]
+                committed = len(kept)
+                messages.append(
+                    {
+                        "role": "system",
+                        "content": "Summary of the earlier messages in this thread:\n" + summary["summary"],
+                    }
+                )
+            schedule_thread_summary(key, summary, entries, committed)
+
+        # Oldest first, trimmed at the old end so the prompt prefix stays stable
+        budget = context_budget() - sum(count_message_tokens(m) for m in messages)
+        history = [{"role": entry["role"], "content": entry["content"]} for entry in entries]
+
+        messages.extend(trim_history(history, budget))
+
+    except Exception as e:
+        log.warning("conversations_replies", error=e)
+
+    log.debug("conversations_replies", messages=messages)
+
+    return messages
+
+
+# Build the chat messages: system message, thread history (oldest first) and the prompt
+def conversation_messages(content, thread_messages=None):
+    messages = []
+
+    # Add system message for all conversations
+    if SYSTEM_MESSAGE is not None:
+        messages.append(
+            {
+                "role": "system",
+                "content": SYSTEM_MESSAGE,
+            }
+        )
+
+    if thread_messages is not None:
+        # A thread summary stays pinned ahead of the history
+        pinned = []
+        if thread_messages and thread_messages[0]["role"] == "system":
+            pinned, thread_messages = thread_messages[:1], thread_messages[1:]
+        messages.extend(pinned)
+
+        # Reserve the system messages and the current prompt
+        budget = context_budget() - count_message_tokens({"content": content})
+        budget -= sum(count_message_tokens(m) for m in messages)
+        messages.extend(trim_history(thread_messages, budget))
+
+    messages.append(
+        {
+            "role": "user",
+            "content": content,
+        },
+    )
+
+    return messages
+
+
+# Handle the chatgpt conversation
+def conversation(say: Say, thread_ts, content, channel, user, client_msg_id, message_type=None, team=None):
+    # Kick off the independent Slack calls together
+    steps = {
+        # Build the content (a loader runs alongside the Slack calls)
+        "content": (content_step(content), []),
+        # Set typing indicator
+        "status": (lambda: set_thread_status(channel, thread_ts, "응답 생성 중..."), []),
+        # Keep track of the latest message timestamp
+        "cursor": (lambda: say(text=BOT_CURSOR, thread_ts=thread_ts), []),
+    }
+
+    # Get the thread messages
+    if thread_ts is not None:
+        steps["previous"] = (
+            lambda result: chat_update(say, channel, thread_ts, result["ts"], MSG_PREVIOUS),
+            ["cursor"],
+        )
+        steps["replies"] = (
+            lambda: conversations_replies(channel, thread_ts, client_msg_id, [], message_type),
+            [],
+        )
+
+    results = run_steps("conversation", steps)
+
+    latest_ts = results["cursor"]["ts"]
+    content = results["content"]
+
+    log.debug("conversation", content=content)
+
+    messages = conversation_messages(content, results.get("replies"))
+
+    # Send the prompt to ChatGPT
+    try:
+        log.debug("conversation", messages=messages)
+
+        # Send the prompt to ChatGPT
+        message = reply_text(messages, say, channel, thread_ts, latest_ts, user, team)
+
+    except Exception as e:
+        log.error("conversation", "Error handling message", error=e, models=model_router.tried(e))
+
+        message = "죄송합니다. 요청을 처리하는 중 오류가 발생했습니다. 다시 시도해 주세요."
+
+        chat_update(say, channel, thread_ts, latest_ts, message)
+
+
+# Describe attached images, cached by image content and model
+def describe_images(images):
+    # Build describe request without mutating original content
+    describe_content = [{"type": "text", "text": COMMAND_DESCRIBE}] + images
+
+    messages = []
+    messages.append(
+        {
+            "role": "user",
+            "content": describe_content,
+        },
+    )
+
+    digest = hashlib.sha256(model_router.route("describe", messages)[0].encode("utf-8"))
+    for image in images:
+        digest.update(image.get("image_url", {}).get("url", "").encode("utf-8"))
+    key = digest.hexdigest()
+
+    description = descriptions_cache.get(key)
+    if description is not None:
+        return description
+
+    if DESCRIBE_CACHE_DYNAMODB:
+        try:
+            item = get_state_store().get("describe#" + key)
+            if item:
+                descriptions_cache.set(key, item["description"])
+                return item["description"]
+        except Exception as e:
+            log.warning("describe_images", error=e)
+
+    log.debug("describe_images", messages=messages)
+
+    with metrics.span("describe_images"):
+        response = model_router.call("describe", messages, lambda model: get_openai().chat.completions.create(
+            model=model,
+            messages=messages,
+        ))
+
+    description = response.choices[0].message.content
+
+    descriptions_cache.set(key, description)
+
+    if DESCRIBE_CACHE_DYNAMODB:
+        try:
+            get_state_store().put("describe#" + key, {"description": description}, DESCRIBE_CACHE_TTL)
+        except Exception as e:
+            log.warning("describe_images", error=e)
+
+    return description
+
+
+# Describe attached images, logging errors instead of raising
+def describe_images_safely(images):
+    try:
+        return describe_images(images)
+    except Exception as e:
+        log.error("image_generate", "Error handling message", error=e, models=model_router.tried(e))
+    return None
+
+
+# Build the request that turns the thread and image descriptions into an image prompt
+def image_prompt_messages(content, replies=None, description=None):
+    prompts = []
+
+    if replies is not None:
+        prompts = [
+            f"{reply['role']}: {reply['content']}"
+            for reply in replies
+            if reply["content"].strip()
+        ]
+
+    if description:
+        prompts.append(description)
+
+    # Send the prompt to ChatGPT
+    prompts.append(content[0]["text"])
+
+    prompts.append(COMMAND_GENERATE)
+
+    messages = []
+    messages.append(
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": "\n\n\n".join(prompts),
+                }
+            ],
+        },
+    )
+
+    return messages
+
+
+# Handle the image generation
+def image_generate(say: Say, thread_ts, content, channel, client_msg_id, message_type=None):
+    # Kick off the independent Slack (and vision) calls together
+    steps = {
+        # Build the content (a loader runs alongside the Slack calls)
+        "content": (content_step(content), []),
+        # Set typing indicator
+        "status": (lambda: set_thread_status(channel, thread_ts, "이미지 생성 중..."), []),
+        # Keep track of the latest message timestamp
+        "cursor": (lambda: say(text=BOT_CURSOR, thread_ts=thread_ts), []),
+    }
+
+    # Get the thread messages
+    if thread_ts is not None:
+        steps["previous"] = (
+            lambda result: chat_update(say, channel, thread_ts, result["ts"], MSG_PREVIOUS),
+            ["cursor"],
+        )
+        steps["replies"] = (
+            lambda: conversations_replies(channel, thread_ts, client_msg_id, [], message_type),
+            [],
+        )
+
+    # Describe the attached images once they are fetched
+    def describing(content, result, *_):
+        if len(content) > 1:
+            chat_update(say, channel, thread_ts, result["ts"], MSG_IMAGE_DESCRIBE)
+
+    steps["describing"] = (
+        describing,
+        ["content", "cursor", "previous"] if thread_ts is not None else ["content", "cursor"],
+    )
+    steps["describe"] = (
+        lambda content: describe_images_safely(content[1:]) if len(content) > 1 else None,
+        ["content"],
+    )
+
+    results = run_steps("image_generate", steps)
+
+    latest_ts = results["cursor"]["ts"]
+    content = results["content"]
+
+    log.debug("image_generate", content=content)
+
+    # Prepare the prompt for image generation
+    try:
+        chat_update(say, channel, thread_ts, latest_ts, MSG_IMAGE_GENERATE)
+
+        messages = image_prompt_messages(content, results.get("replies"), results.get("describe"))
+
+        log.debug("image_generate", messages=messages)
+
+        response = model_router.call("rewrite", messages, lambda model: get_openai().chat.completions.create(
+            model=model,
+            messages=messages,
+        ))
+
+        prompt = response.choices[0].message.content
+
+        chat_update(say, channel, thread_ts, latest_ts, prompt + " " + BOT_CURSOR)
+
+    except Exception as e:
+        log.error("image_generate", "Error handling message", error=e, models=model_router.tried(e))
+
+        message = "죄송합니다. 이미지 프롬프트 준비 중 오류가 발생했습니다. 다시 시도해 주세요."
+        chat_update(say, channel, thread_ts, latest_ts, message)
+        return
+
+    # Generate the image
+    try:
+        log.debug("image_generate", prompt=prompt)
+
+        # Send the prompt to ChatGPT
+        message = reply_image(prompt, say, channel, thread_ts, latest_ts)
+
+        log.debug("image_generate", result=message)
+
+    except Exception as e:
+        log.error("image_generate", "Error handling message", error=e, model=IMAGE_MODEL)
+
+        message = "죄송합니다. 이미지 생성 중 오류가 발생했습니다. 다시 시도해 주세요."
+
+        chat_update(say, channel, thread_ts, latest_ts, message)
+
+
+http_session = None
+executors = {}
+executors_lock = threading.Lock()
+
+
+# Get the keep-alive HTTP session, reused across warm invocations
+def get_http_session():
+    global http_session
+
+    if http_session is None:
+        http_session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(IMAGE_FETCH_WORKERS, 10))
+        http_session.mount("https://", adapter)
+        http_session.mount("http://", adapter)
+
+    return http_session
+
+
+# Get a named thread pool, reused across warm invocations
+def get_executor(name, max_workers):
+    with executors_lock:
+        if name not in executors:
+            executors[name] = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix=name
+            )
+
+        return executors[name]
+
+
+# Run steps concurrently; each step starts once the steps it depends on are done
+def run_steps(label, steps):
+    executor = get_executor("steps", max(len(steps), 8))
+    futures = {}
+    timings = {}
+
+    def run(name, fn, deps):
+        args = [futures[dep].result() for dep in deps]
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            timings[name] = round((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+
+    # Steps are submitted in order, so dependencies always exist
+    for name, (fn, deps) in steps.items():
+        futures[name] = executor.submit(run, name, fn, deps)
+
+    results = {name: future.result() for name, future in futures.items()}
+
+    log.info(label, steps=timings, total=round((time.perf_counter() - started) * 1000))
+
+    return results
+
+
+# Get image from URL
+def get_image_from_url(image_url, token=None, max_bytes=None):
+    headers = {}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+
+    max_bytes = max_bytes or IMAGE_MAX_BYTES
+
+    try:
+        with get_http_session().get(
+            image_url, headers=headers, timeout=IMAGE_FETCH_TIMEOUT, stream=True
+        ) as response:
+            if response.status_code != 200:
+                log.warning("get_image_from_url", "Failed to fetch image", url=image_url)
+                return None
+
+            if int(response.headers.get("Content-Length") or 0) > max_bytes:
+                log.warning("get_image_from_url", "Image too large", url=image_url)
+                return None
+
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                size += len(chunk)
+                if size > max_bytes:
+                    log.warning("get_image_from_url", "Image too large", url=image_url)
+                    return None
+                chunks.append(chunk)
+
+            return b"".join(chunks)
+
+    except requests.RequestException as e:
+        log.warning("get_image_from_url", "Failed to fetch image", url=image_url, error=e)
+
+    return None
+
+
+# Get image from Slack
+def get_image_from_slack(image_url):
+    return get_image_from_url(image_url, SLACK_BOT_TOKEN)
+
+
+# Get encoded image from Slack
+def get_encoded_image_from_slack(image_url):
+    image = get_image_from_slack(image_url)
+
+    if image:
+        return base64.b64encode(image).decode("utf-8")
+
+    return None
+
+
+# Downscale and re-encode an image for vision requests
+def prepare_image(image, mimetype):
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return image, mimetype, IMAGE_DETAIL
+
+    try:
+        with Image.open(io.BytesIO(image)) as source:
+            width, height = source.size
+
+            # The model sees at most IMAGE_MAX_SIDE on the long side and IMAGE_MIN_SIDE on the short side
+            scale = min(1.0, IMAGE_MAX_SIDE / max(width, height), IMAGE_MIN_SIDE / min(width, height))
+            width, height = max(1, round(width * scale)), max(1, round(height * scale))
+
+            # Let the JPEG decoder skip detail we are going to throw away
+            if scale < 1.0 and source.format == "JPEG":
+                source.draft("RGB", (width, height))
+
+            picture = ImageOps.exif_transpose(source)
+
+            # EXIF rotation may have swapped the sides
+            if (picture.width > picture.height) != (width > height):
+                width, height = height, width
+
+            if picture.size != (width, height):
+                picture = picture.resize((width, height), Image.LANCZOS)
+
+            buffer = io.BytesIO()
+            if picture.mode in ("RGBA", "LA") or "transparency" in picture.info:
+                picture.save(buffer, format="PNG")
+                prepared, prepared_type = buffer.getvalue(), "image/png"
+            else:
+                picture.convert("RGB").save(buffer, format="JPEG", quality=IMAGE_QUALITY, optimize=True)
+                prepared, prepared_type = buffer.getvalue(), "image/jpeg"
+    except Exception as e:
+        log.warning("prepare_image", error=e)
+        return image, mimetype, IMAGE_DETAIL
+
+    detail = IMAGE_DETAIL
+    if detail == "auto":
+        detail = "low" if max(width, height) <= IMAGE_LOW_DETAIL_SIDE else "high"
+
+    # Keep the original when re-encoding does not help
+    if scale >= 1.0 and len(prepared) >= len(image):
+        return image, mimetype, detail
+
+    return prepared, prepared_type, detail
+
+
+# Get an image content part from a Slack file
+def get_image_content_from_slack(file):
+    image = get_image_from_slack(file.get("url_private"))
+
+    return image_content(image, file["mimetype"])
+
+
+# Build an image content part from downloaded image bytes
+def image_content(image, mimetype):
+    if not image:
+        return None
+
+    image, mimetype, detail = prepare_image(image, mimetype)
+    base64_image = base64.b64encode(image).decode("utf-8")
+
+    return {
+        "type": "image_url",
+        "image_url": {
+            "url": f"data:{mimetype};base64,{base64_image}",
+            "detail": detail,
+        },
+    }
+
+
+# Replace the emoji pattern
+def replace_emoji_pattern(text):
+    # 패턴: :로 시작하고, 문자 그룹이 있고, :가 오고, 문자 그룹이 있고, :로 끝나는 패턴
+    pattern = r":([^:]+):([^:]+):"
+
+    # 첫 번째 그룹만 유지하고 두 번째 그룹은 제거
+    replacement = r":\1:"
+
+    # 치환 실행
+    result = re.sub(pattern, replacement, text)
+    return result
+
+
+# Detect the message type from the prompt keywords
+def message_type_from_prompt(prompt):
+    message_type = "text"
+
+    if prompt.endswith(KEYWORD_IMAGE):
+        message_type = "image"
+    elif prompt.endswith(KEYWORD_EMOJI) or prompt.startswith(KEYWORD_EMOJI):
+        message_type = "emoji"
+        prompt = replace_emoji_pattern(prompt)
+
+    return prompt, message_type
+
+
+# Get the image attachments of an event that are small enough to download
+def image_files(event):
+    return [
+        file
+        for file in event.get("files", [])
+        if file["mimetype"].startswith("image")
+        and int(file.get("size") or 0) <= IMAGE_MAX_BYTES
+    ]
+
+
+# Extract content from the message
+def content_from_message(prompt, event, user=None):
+    prompt, message_type = message_type_from_prompt(prompt)
+
+    if user is not None:
+        user_name = get_user_name(user)
+
+        text = "{}: {}".format(user_name, prompt)
+    else:
+        text = prompt
+
+    content = []
+    content.append({"type": "text", "text": text})
+
+    if "files" in event:
+        files = image_files(event)
+
+        # Download attachments concurrently; skip any that fail or miss the deadline
+        futures = [
+            get_executor("image", IMAGE_FETCH_WORKERS).submit(get_image_content_from_slack, file)
+            for file in files
+        ]
+        with metrics.span("image_fetch"):
+            concurrent.futures.wait(futures, timeout=IMAGE_FETCH_DEADLINE)
+
+        for file, future in zip(files, futures):
+            part = None
+            if future.done() and future.exception() is None:
+                part = future.result()
+            else:
+                future.cancel()
+                log.warning("content_from_message", "Skipped image", url=file.get("url_private"))
+
+            if part:
+                content.append(part)
+
+    return content, message_type
+
+
+# Defer building the content, so the author lookup and attachment downloads run as a step
+# alongside the first Slack calls; the message type comes from the prompt alone
+def content_loader(prompt, event, user=None):
+    return lambda: content_from_message(prompt, event, user)[0]
+
+
+# Step that returns the content, running its loader if it is one
+def content_step(content):
+    return content if callable(content) else lambda: content
+
+
+async_loop = None
+async_http_session = None
+async_slack_client = None
+async_openai_client = None
+
+
+# Get the event loop of the async engine, reused across warm invocations
+def get_async_loop():
+    global async_loop
+
+    if async_loop is None or async_loop.is_closed():
+        async_loop = asyncio.new_event_loop()
+
+    return async_loop
+
+
+# Run a coroutine to completion on the async engine's loop
+def run_async(coro):
+    return get_async_loop().run_until_complete(coro)
+
+
+# Get the shared aiohttp session (created on first use, inside the loop)
+def get_async_http_session():
+    global async_http_session
+
+    if async_http_session is None or async_http_session.closed:
+        import aiohttp
+
+        async_http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=max(IMAGE_FETCH_WORKERS, 10)),
+        )
+
+    return async_http_session
+
+
+# Get the async Slack client (created on first use)
+def get_async_slack():
+    global async_slack_client
+
+    if async_slack_client is None:
+        from slack_sdk.web.async_client import AsyncWebClient
+
+        async_slack_client = AsyncWebClient(
+            token=SLACK_BOT_TOKEN, base_url=SLACK_API_URL, session=get_async_http_session()
+        )
+
+    return async_slack_client
+
+
+# Get the async OpenAI client (created on first use)
+def get_async_openai():
+    global async_openai_client
+
+    if async_openai_client is None:
+        from openai import AsyncOpenAI
+
+        async_openai_client = AsyncOpenAI(
+            organization=OPENAI_ORG_ID if OPENAI_ORG_ID and OPENAI_ORG_ID != "None" else None,
+            api_key=OPENAI_API_KEY,
+        )
+
+    return async_openai_client
+
+
+# Post messages to a channel (async counterpart of bolt's say)
+def async_say(channel):
+    async def say(text, thread_ts=None):
+        return await async_slack_api.chat_postMessage(channel=channel, text=text, thread_ts=thread_ts)
+
+    return say
+
+
+# Set assistant thread status (typing indicator)
+async def set_thread_status_async(channel, thread_ts, status=""):
+    try:
+        await async_slack_api.assistant_threads_setStatus(
+            channel_id=channel,
+            thread_ts=thread_ts,
+            status=status,
+        )
+    except Exception as e:
+        log.warning("set_thread_status", error=e)
+
+
+# Update the message in Slack
+async def chat_update_async(say, channel, thread_ts, latest_ts, message="", continue_thread=False):
+    if len(message) > MAX_LEN_SLACK:
+        text, message = split_message(message)
 
-        print("conversations_replies: {}".format(response))
+        # Update the message
+        await async_slack_api.chat_update(channel=channel, ts=latest_ts, text=replace_text(text))
 
-        if not response.get("ok"):
-            print(
-                "conversations_replies: {}".format(
-                    "Failed to retrieve thread messages."
-                )
-            )
+        text = replace_text(message)
+        if continue_thread:
+            text += " " + BOT_CURSOR
 
-        res_messages = response.get("messages", [])
+        # New message
+        result = await say(text=text, thread_ts=thread_ts)
+        latest_ts = result["ts"]
+    else:
+        text = replace_text(message)
+        if continue_thread:
+            text += " " + BOT_CURSOR
 
-        if not res_messages:
-            return messages
+        # Update the message
+        await async_slack_api.chat_update(channel=channel, ts=latest_ts, text=text)
 
-        first_ts = str(res_messages[0].get("ts"))
+    return message, latest_ts
 
-        res_messages.reverse()
-        res_messages.pop(0)  # remove the first message
 
-        users_cache = {}
+# Post rendered texts: update the current message, then continue in new ones
+async def post_rendered_async(say, channel, thread_ts, latest_ts, texts):
+    await async_slack_api.chat_update(channel=channel, ts=latest_ts, text=texts[0])
 
-        for message in res_messages:
-            if message.get("client_msg_id", "") == client_msg_id:
-                continue
+    for text in texts[1:]:
+        result = await say(text=text, thread_ts=thread_ts)
+        latest_ts = result["ts"]
 
-            role = "user"
-            if message.get("bot_id", "") != "":
-                role = "assistant"
+    return latest_ts
 
-            # prompt 에 이모지 키워드가 있고, 첫번째 메시지에 리액션이 있으면 리액션을 추가
-            if message_type == "emoji" and first_ts == str(message.get("ts")):
-                reactions = get_reactions(message.get("reactions", []))
-                if reactions != "":
-                    messages.append(
-                        {
-                            "role": role,
-                            "content": "reactions {}".format(reactions),
-                        }
-                    )
 
-            # 메세지에 유저 이름을 추가 (cached)
-            msg_user = message.get("user")
-            if msg_user not in users_cache:
-                user_info = app.client.users_info(user=msg_user)
-                users_cache[msg_user] = (
-                    user_info.get("user", {})
-                    .get("profile", {})
-                    .get("display_name", "Unknown")
-                )
-            user_name = users_cache[msg_user]
-            content = "{}: {}".format(user_name, message.get("text", ""))
+async def flush_reply_async(slack_stream, renderer, say, channel, thread_ts, latest_ts, continue_thread=False):
+    if slack_stream is not None and await slack_stream.flush_async(renderer.text(), not continue_thread):
+        return latest_ts
+    return await post_rendered_async(say, channel, thread_ts, latest_ts, renderer.take(continue_thread))
 
-            messages.append(
-                {
-                    "role": role,
-                    "content": content,
-                }
-            )
 
-            # print("conversations_replies: messages size: {}".format(len(str(messages))))
+# Reply to the message, reading the stream while Slack updates are in flight
+async def reply_text_async(messages, say, channel, thread_ts, latest_ts, user, team=None):
+    started = time.perf_counter()
 
-            if len(str(messages)) > MAX_LEN_OPENAI:
-                messages.pop(0)  # remove the oldest message
-                break
+    cache_key = response_cache_key(messages) if RESPONSE_CACHE else None
+    if cache_key:
+        text = await asyncio.to_thread(get_cached_response, cache_key)
+        if text is not None:
+            renderer = StreamRenderer()
+            renderer.feed(text)
+            await post_rendered_async(say, channel, thread_ts, latest_ts, renderer.take())
+            metrics.add("response_cache_hits", 1)
+            return text
 
-    except Exception as e:
-        print("conversations_replies: {}".format(e))
+    stream = await model_router.call_async("chat", messages, lambda model: get_async_openai().chat.completions.create(
+        model=model,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True},
+        user=user,
+    ))
 
-    print("conversations_replies: {}".format(messages))
+    scheduler = FlushScheduler()
+    renderer = StreamRenderer()
+    slack_stream = slack_stream_for(channel, thread_ts, latest_ts, user, team)
 
-    return messages
+    update = None
+    finish_reason = None
+    usage = None
 
+    try:
+        async for part in stream:
+            if not part.choices:
+                usage = part.usage
+                continue
 
-# Handle the chatgpt conversation
-def conversation(say: Say, thread_ts, content, channel, user, client_msg_id, message_type=None):
-    print("conversation: {}".format(json.dumps(content)))
+            reply = part.choices[0].delta.content or ""
+            finish_reason = part.choices[0].finish_reason or finish_reason
 
-    # Set typing indicator
-    set_thread_status(channel, thread_ts, "응답 생성 중...")
+            if reply:
+                if not renderer.chunks:
+                    metrics.add("openai_first_token", (time.perf_counter() - started) * 1000, "Milliseconds")
+                renderer.feed(reply)
+                scheduler.add(reply)
 
-    # Keep track of the latest message timestamp
-    result = say(text=BOT_CURSOR, thread_ts=thread_ts)
-    latest_ts = result["ts"]
+            if update is not None and update.done():
+                latest_ts = update.result()
+                update = None
 
-    messages = []
+            # At most one update in flight at a time; text streamed meanwhile waits in the renderer
+            if update is None and scheduler.due():
+                update = asyncio.ensure_future(scheduler.flush_async(
+                    lambda: flush_reply_async(slack_stream, renderer, say, channel, thread_ts, latest_ts, True)
+                ))
 
-    # Add system message for all conversations
-    if SYSTEM_MESSAGE is not None:
-        messages.append(
-            {
-                "role": "system",
-                "content": SYSTEM_MESSAGE,
-            }
+        if update is not None:
+            latest_ts = await update
+
+        # Always flush the final text without the cursor
+        await scheduler.flush_async(
+            lambda: flush_reply_async(slack_stream, renderer, say, channel, thread_ts, latest_ts)
         )
+    except Exception:
+        # Never leave a half-streamed message behind, whatever broke off the reply
+        if slack_stream is not None:
+            if update is not None:
+                await asyncio.gather(update, return_exceptions=True)
+            await slack_stream.abort_async()
+        raise
 
-    # Get the thread messages
-    if thread_ts is not None:
-        chat_update(say, channel, thread_ts, latest_ts, MSG_PREVIOUS)
+    log.info("reply_text", flushes=scheduler.flushes, rtt=round(scheduler.rtt, 3))
 
-        thread_messages = conversations_replies(
-            channel, thread_ts, client_msg_id, [], message_type
+    add_reply_metrics(messages, renderer.text(), started, usage)
+
+    if cache_key and finish_reason == "stop":
+        await asyncio.to_thread(set_cached_response, cache_key, renderer.text())
+
+    return renderer.text()
+
+
+# Reply to the image
+async def reply_image_async(prompt, say, channel, thread_ts, latest_ts):
+    with metrics.span("image_generate"):
+        response = await get_async_openai().images.generate(
+            model=IMAGE_MODEL,
+            prompt=prompt,
+            size=IMAGE_SIZE,
+            n=1,
         )
 
-        thread_messages = thread_messages[::-1]  # reversed
-        messages.extend(thread_messages)
+    revised_prompt = response.data[0].revised_prompt or prompt
 
-    messages.append(
-        {
-            "role": "user",
-            "content": content,
-        },
-    )
+    image_url = response.data[0].url
+    b64_json = response.data[0].b64_json
 
-    # Send the prompt to ChatGPT
-    try:
-        print("conversation: {}".format(messages))
+    # Spooling to disk and uploading block; keep them off the loop
+    response = await asyncio.to_thread(upload_image, channel, thread_ts, image_url, b64_json)
 
-        # Send the prompt to ChatGPT
-        message = reply_text(messages, say, channel, thread_ts, latest_ts, user)
+    log.debug("reply_image", response=response)
 
-        # print("conversation: {}".format(message))
+    await chat_update_async(say, channel, thread_ts, latest_ts, revised_prompt)
 
-    except Exception as e:
-        print("conversation: Error handling message: {}".format(e))
-        print("conversation: OpenAI Model: {}".format(OPENAI_MODEL))
+    return image_url or "b64_image"
 
-        message = "죄송합니다. 요청을 처리하는 중 오류가 발생했습니다. 다시 시도해 주세요."
 
-        chat_update(say, channel, thread_ts, latest_ts, message)
+# Start the cursor, status and thread history calls together
+async def kickoff_async(say, thread_ts, channel, client_msg_id, message_type, status):
+    cursor = asyncio.ensure_future(say(text=BOT_CURSOR, thread_ts=thread_ts))
+    tasks = [set_thread_status_async(channel, thread_ts, status), cursor]
 
+    if thread_ts is not None:
+        async def previous():
+            result = await cursor
+            await chat_update_async(say, channel, thread_ts, result["ts"], MSG_PREVIOUS)
 
-# Handle the image generation
-def image_generate(say: Say, thread_ts, content, channel, client_msg_id, message_type=None):
-    print("image_generate: {}".format(content))
+        tasks.append(previous())
 
-    # Set typing indicator
-    set_thread_status(channel, thread_ts, "이미지 생성 중...")
+        # The history helpers share caches with the sync engine, so they run in a thread
+        tasks.append(asyncio.to_thread(
+            conversations_replies, channel, thread_ts, client_msg_id, [], message_type
+        ))
 
-    # Keep track of the latest message timestamp
-    result = say(text=BOT_CURSOR, thread_ts=thread_ts)
-    latest_ts = result["ts"]
+    results = await asyncio.gather(*tasks)
 
-    prompt = content[0]["text"]
+    return cursor.result()["ts"], results[3] if thread_ts is not None else None
 
-    prompts = []
 
-    # Get the thread messages
-    if thread_ts is not None:
-        chat_update(say, channel, thread_ts, latest_ts, MSG_PREVIOUS)
+# Content may still be loading (a task from respond_async); wait for it alongside the Slack calls
+async def content_ready(content):
+    return await content if asyncio.isfuture(content) else content
 
-        replies = conversations_replies(channel, thread_ts, client_msg_id, [], message_type)
 
-        replies = replies[::-1]  # reversed
+# Handle the chatgpt conversation
+async def conversation_async(say, thread_ts, content, channel, user, client_msg_id, message_type=None, team=None):
+    (latest_ts, replies), content = await asyncio.gather(
+        kickoff_async(say, thread_ts, channel, client_msg_id, message_type, "응답 생성 중..."),
+        content_ready(content),
+    )
 
-        prompts = [
-            f"{reply['role']}: {reply['content']}"
-            for reply in replies
-            if reply["content"].strip()
-        ]
+    log.debug("conversation", content=content)
 
-    # Get the image content
-    if len(content) > 1:
-        chat_update(say, channel, thread_ts, latest_ts, MSG_IMAGE_DESCRIBE)
+    messages = conversation_messages(content, replies)
 
-        # Build describe request without mutating original content
-        describe_content = [{"type": "text", "text": COMMAND_DESCRIBE}] + content[1:]
+    try:
+        log.debug("conversation", messages=messages)
 
-        messages = []
-        messages.append(
-            {
-                "role": "user",
-                "content": describe_content,
-            },
-        )
+        await reply_text_async(messages, say, channel, thread_ts, latest_ts, user, team)
 
-        try:
-            print("image_generate: {}".format(messages))
+    except Exception as e:
+        log.error("conversation", "Error handling message", error=e, models=model_router.tried(e))
 
-            response = openai.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=messages,
-            )
+        message = "죄송합니다. 요청을 처리하는 중 오류가 발생했습니다. 다시 시도해 주세요."
 
-            # print("image_generate: {}".format(response))
+        await chat_update_async(say, channel, thread_ts, latest_ts, message)
 
-            prompts.append(response.choices[0].message.content)
 
-        except Exception as e:
-            print("image_generate: OpenAI Model: {}".format(OPENAI_MODEL))
-            print("image_generate: Error handling message: {}".format(e))
+# Handle the image generation
+async def image_generate_async(say, thread_ts, content, channel, client_msg_id, message_type=None):
+    content = asyncio.ensure_future(content_ready(content))
+
+    # Describe the attached images as soon as they are fetched
+    async def describe():
+        images = (await content)[1:]
+        return await asyncio.to_thread(describe_images_safely, images) if images else None
+
+    (latest_ts, replies), content, description = await asyncio.gather(
+        kickoff_async(say, thread_ts, channel, client_msg_id, message_type, "이미지 생성 중..."),
+        content,
+        describe(),
+    )
 
-    # Send the prompt to ChatGPT
-    prompts.append(prompt)
+    log.debug("image_generate", content=content)
 
     # Prepare the prompt for image generation
     try:
-        chat_update(say, channel, thread_ts, latest_ts, MSG_IMAGE_GENERATE)
-
-        prompts.append(COMMAND_GENERATE)
+        await chat_update_async(say, channel, thread_ts, latest_ts, MSG_IMAGE_GENERATE)
 
-        messages = []
-        messages.append(
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "\n\n\n".join(prompts),
-                    }
-                ],
-            },
-        )
+        messages = image_prompt_messages(content, replies, description)
 
-        print("image_generate: {}".format(messages))
+        log.debug("image_generate", messages=messages)
 
-        response = openai.chat.completions.create(
-            model=OPENAI_MODEL,
+        response = await model_router.call_async("rewrite", messages, lambda model: get_async_openai().chat.completions.create(
+            model=model,
             messages=messages,
-        )
-
-        # print("image_generate: {}".format(response))
+        ))
 
         prompt = response.choices[0].message.content
 
-        chat_update(say, channel, thread_ts, latest_ts, prompt + " " + BOT_CURSOR)
+        await chat_update_async(say, channel, thread_ts, latest_ts, prompt + " " + BOT_CURSOR)
 
     except Exception as e:
-        print("image_generate: OpenAI Model: {}".format(OPENAI_MODEL))
-        print("image_generate: Error handling message: {}".format(e))
+        log.error("image_generate", "Error handling message", error=e, models=model_router.tried(e))
 
         message = "죄송합니다. 이미지 프롬프트 준비 중 오류가 발생했습니다. 다시 시도해 주세요."
-        chat_update(say, channel, thread_ts, latest_ts, message)
+        await chat_update_async(say, channel, thread_ts, latest_ts, message)
         return
 
     # Generate the image
     try:
-        print("image_generate: {}".format(prompt))
+        log.debug("image_generate", prompt=prompt)
 
-        # Send the prompt to ChatGPT
-        message = reply_image(prompt, say, channel, thread_ts, latest_ts)
+        message = await reply_image_async(prompt, say, channel, thread_ts, latest_ts)
 
-        print("image_generate: {}".format(message))
+        log.debug("image_generate", result=message)
 
     except Exception as e:
-        print("image_generate: OpenAI Model: {}".format(IMAGE_MODEL))
-        print("image_generate: Error handling message: {}".format(e))
+        log.error("image_generate", "Error handling message", error=e, model=IMAGE_MODEL)
 
         message = "죄송합니다. 이미지 생성 중 오류가 발생했습니다. 다시 시도해 주세요."
 
-        chat_update(say, channel, thread_ts, latest_ts, message)
+        await chat_update_async(say, channel, thread_ts, latest_ts, message)
 
 
 # Get image from URL
-def get_image_from_url(image_url, token=None):
+async def get_image_from_url_async(image_url, token=None, max_bytes=None):
+    import aiohttp
+
     headers = {}
     if token:
         headers["Authorization"] = f"Bearer {token}"
 
-    response = requests.get(image_url, headers=headers, timeout=10)
-
-    if response.status_code == 200:
-        return response.content
-    else:
-        print("Failed to fetch image: {}".format(image_url))
-
-    return None
-
-
-# Get image from Slack
-def get_image_from_slack(image_url):
-    return get_image_from_url(image_url, SLACK_BOT_TOKEN)
-
-
-# Get encoded image from Slack
-def get_encoded_image_from_slack(image_url):
-    image = get_image_from_slack(image_url)
+    max_bytes = max_bytes or IMAGE_MAX_BYTES
 
-    if image:
-        return base64.b64encode(image).decode("utf-8")
+    try:
+        async with get_async_http_session().get(
+            image_url, headers=headers, timeout=aiohttp.ClientTimeout(total=IMAGE_FETCH_TIMEOUT)
+        ) as response:
+            if response.status != 200:
+                log.warning("get_image_from_url", "Failed to fetch image", url=image_url)
+                return None
+
+            if int(response.headers.get("Content-Length") or 0) > max_bytes:
+                log.warning("get_image_from_url", "Image too large", url=image_url)
+                return None
+
+            chunks = []
+            size = 0
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                size += len(chunk)
+                if size > max_bytes:
+                    log.warning("get_image_from_url", "Image too large", url=image_url)
+                    return None
+                chunks.append(chunk)
+
+            return b"".join(chunks)
+
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        log.warning("get_image_from_url", "Failed to fetch image", url=image_url, error=e)
 
     return None
 
 
-# Replace the emoji pattern
-def replace_emoji_pattern(text):
-    # 패턴: :로 시작하고, 문자 그룹이 있고, :가 오고, 문자 그룹이 있고, :로 끝나는 패턴
-    pattern = r":([^:]+):([^:]+):"
-
-    # 첫 번째 그룹만 유지하고 두 번째 그룹은 제거
-    replacement = r":\1:"
+# Get an image content part from a Slack file
+async def get_image_content_async(file):
+    image = await get_image_from_url_async(file.get("url_private"), SLACK_BOT_TOKEN)
 
-    # 치환 실행
-    result = re.sub(pattern, replacement, text)
-    return result
+    # Resizing is CPU work; keep it off the loop
+    return await asyncio.to_thread(image_content, image, file["mimetype"])
 
 
 # Extract content from the message
-def content_from_message(prompt, event, user=None):
-    message_type = "text"
+async def content_from_message_async(prompt, event, user=None):
+    prompt, message_type = message_type_from_prompt(prompt)
 
-    if prompt.endswith(KEYWORD_IMAGE):
-        message_type = "image"
-    elif prompt.endswith(KEYWORD_EMOJI) or prompt.startswith(KEYWORD_EMOJI):
-        message_type = "emoji"
-        prompt = replace_emoji_pattern(prompt)
+    files = image_files(event)
+    tasks = [asyncio.ensure_future(get_image_content_async(file)) for file in files]
 
+    # Look up the user while the attachments download
     if user is not None:
-        user_info = app.client.users_info(user=user)
-        print("user_info: {}".format(user_info))
-
-        user_name = (
-            user_info.get("user", {})
-            .get("profile", {})
-            .get("display_name", "Unknown")
-        )
+        user_name = await asyncio.to_thread(get_user_name, user)
 
         text = "{}: {}".format(user_name, prompt)
     else:
@@ -572,53 +3206,85 @@ def content_from_message(prompt, event, user=None):
     content = []
     content.append({"type": "text", "text": text})
 
-    if "files" in event:
-        files = event.get("files", [])
-        for file in files:
-            mimetype = file["mimetype"]
-            if mimetype.startswith("image"):
-                image_url = file.get("url_private")
-                base64_image = get_encoded_image_from_slack(image_url)
-                if base64_image:
-                    content.append(
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                # "url": image_url,
-                                "url": f"data:{mimetype};base64,{base64_image}"
-                            },
-                        }
-                    )
+    done = set()
+    if tasks:
+        with metrics.span("image_fetch"):
+            done, _ = await asyncio.wait(tasks, timeout=IMAGE_FETCH_DEADLINE)
+
+    # Skip any attachment that failed or missed the deadline
+    for file, task in zip(files, tasks):
+        part = None
+        if task in done and task.exception() is None:
+            part = task.result()
+        else:
+            task.cancel()
+            log.warning("content_from_message", "Skipped image", url=file.get("url_private"))
+
+        if part:
+            content.append(part)
 
     return content, message_type
 
 
+# Handle a mention or DM on the async engine
+async def respond_async(event, thread_ts, prompt, mention, team=None):
+    channel = event["channel"]
+    user = event["user"]
+    client_msg_id = event["client_msg_id"]
+
+    say = async_say(channel)
+
+    _, message_type = message_type_from_prompt(prompt)
+
+    # The author lookup and attachment downloads run alongside the first Slack calls
+    async def load_content():
+        content, _ = await content_from_message_async(prompt, event, user if mention else None)
+        return content
+
+    content = asyncio.ensure_future(load_content())
+
+    # DMs don't pass the message type on, like the sync handlers
+    passed_type = message_type if mention else None
+
+    if message_type == "image":
+        await image_generate_async(say, thread_ts, content, channel, client_msg_id, passed_type)
+    else:
+        await conversation_async(say, thread_ts, content, channel, user, client_msg_id, passed_type, team)
+
+
+# Team of the user who sent the event; differs from the bot's team in shared and Grid channels
+def event_team(body):
+    event = body.get("event", {})
+    return event.get("user_team") or event.get("team") or body.get("team_id")
+
+
 # Handle the app_mention event
 @app.event("app_mention")
 def handle_mention(body: dict, say: Say):
-    # print("handle_mention: {}".format(body))
-
     event = body["event"]
 
     thread_ts = event["thread_ts"] if "thread_ts" in event else event["ts"]
-    prompt = re.sub(f"<@{bot_id}>", "", event["text"]).strip()
+    prompt = re.sub(f"<@{get_bot_id()}>", "", event["text"]).strip()
     channel = event["channel"]
     user = event["user"]
     client_msg_id = event["client_msg_id"]
 
-    content, message_type = content_from_message(prompt, event, user)
+    if ENGINE == "async":
+        run_async(respond_async(event, thread_ts, prompt, True, event_team(body)))
+        return
+
+    _, message_type = message_type_from_prompt(prompt)
+    content = content_loader(prompt, event, user)
 
     if message_type == "image":
         image_generate(say, thread_ts, content, channel, client_msg_id, message_type)
     else:
-        conversation(say, thread_ts, content, channel, user, client_msg_id, message_type)
+        conversation(say, thread_ts, content, channel, user, client_msg_id, message_type, event_team(body))
 
 
 # Handle the DM (direct message) event
 @app.event("message")
 def handle_message(body: dict, say: Say):
-    # print("handle_message: {}".format(body))
-
     event = body["event"]
 
     if "bot_id" in event:
@@ -631,17 +3297,112 @@ def handle_message(body: dict, say: Say):
     user = event["user"]
     client_msg_id = event["client_msg_id"]
 
-    content, message_type = content_from_message(prompt, event, None)
+    if ENGINE == "async":
+        run_async(respond_async(event, thread_ts, prompt, False, event_team(body)))
+        return
+
+    _, message_type = message_type_from_prompt(prompt)
+    content = content_loader(prompt, event)
 
     # Use thread_ts=None for regular messages, and user ID for DMs
     if message_type == "image":
         image_generate(say, thread_ts, content, channel, client_msg_id)
     else:
-        conversation(say, thread_ts, content, channel, user, client_msg_id)
+        conversation(say, thread_ts, content, channel, user, client_msg_id, team=event_team(body))
+
+
+# Handle the user_change event (keep the cached display names fresh)
+@app.event("user_change")
+def handle_user_change(body: dict):
+    user = body["event"].get("user", {})
+
+    if "id" in user:
+        refresh_user_name(user["id"], user.get("profile", {}).get("display_name", "Unknown"))
 
 
 # Handle the Lambda function
 def lambda_handler(event, context):
+    metrics.start(context)
+    log.sample()
+
+    try:
+        return handle_request(event, context)
+    finally:
+        metrics.emit()
+
+
+deferred = []
+deferred_lock = threading.Lock()
+
+
+# Run fn at the end of the invocation, after the reply has been posted
+def defer(fn):
+    with deferred_lock:
+        deferred.append(fn)
+
+
+# Run the work deferred during this invocation
+def run_deferred():
+    with deferred_lock:
+        jobs = deferred[:]
+        deferred.clear()
+
+    for fn in jobs:
+        try:
+            fn()
+        except Exception as e:
+            log.warning("run_deferred", error=e)
+
+
+# Event subtypes that still carry a user's message (file_share: attached images)
+ANSWERED_SUBTYPES = {None, "file_share", "thread_broadcast"}
+
+
+# Why an event will not be answered, judged from the payload alone (None if it may be)
+def reject_reason(event):
+    event_type = event.get("type")
+
+    if event_type is not None and event_type not in ("app_mention", "message"):
+        return "type"
+    if "bot_id" in event or "bot_profile" in event:
+        return "bot"
+    if event.get("subtype") not in ANSWERED_SUBTYPES:
+        return "subtype"
+    # Channel messages that mention the bot also arrive as app_mention
+    if event_type == "message" and event.get("channel_type") not in (None, "im"):
+        return "channel_type"
+    if event_type == "app_mention" and "<@" not in (event.get("text") or ""):
+        return "mention"
+    return None
+
+
+# Slack retry attempt from the request headers (0 for the first delivery)
+def slack_retry_num(event):
+    try:
+        return int(slack_header(event, "x-slack-retry-num") or 0)
+    except ValueError:
+        return 0
+
+
+# Get a request header, whatever its case
+def slack_header(event, name):
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+# Acknowledge a delivery we have already seen, and ask Slack not to retry it again
+def duplicate_response():
+    return {
+        "statusCode": 200,
+        "headers": {"Content-type": "application/json", "X-Slack-No-Retry": "1"},
+        "body": json.dumps({"status": "Success"}),
+    }
+
+
+# Handle a Slack request: challenge, dedupe, then enqueue or answer
+def handle_request(event, context):
     body = json.loads(event["body"])
 
     if "challenge" in body:
@@ -652,7 +3413,23 @@ def lambda_handler(event, context):
             "body": json.dumps({"challenge": body["challenge"]}),
         }
 
-    print("lambda_handler: {}".format(body))
+    # Profile updates carry no client_msg_id
+    if body.get("event", {}).get("type") == "user_change":
+        handler.reuse_body(event["body"], body)
+        return handler.handle(event, context)
+
+    # Drop events we never answer before any I/O (dedupe write, bolt dispatch)
+    reason = reject_reason(body["event"]) if isinstance(body.get("event"), dict) else None
+    if reason:
+        log.debug("lambda_handler", "Rejected event: {}", reason, type=body["event"].get("type"))
+        metrics.add("rejected_events", 1)
+        return {
+            "statusCode": 200,
+            "headers": {"Content-type": "application/json"},
+            "body": json.dumps({"status": "Success"}),
+        }
+
+    log.debug("lambda_handler", body=body)
 
     # Duplicate execution prevention
     if "event" not in body or "client_msg_id" not in body["event"]:
@@ -662,28 +3439,122 @@ def lambda_handler(event, context):
             "body": json.dumps({"status": "Success"}),
         }
 
-    # Atomic duplicate execution prevention using conditional write
-    token = body["event"]["client_msg_id"]
-    expire_at = int(time.time()) + 3600  # 1h
+    # Verify the signature before any dedupe state, so an unsigned request can't claim an event id
+    if not signature_verifier.is_valid_request(event["body"], event.get("headers") or {}):
+        return {
+            "statusCode": 401,
+            "headers": {"Content-type": "application/json"},
+            "body": json.dumps({"status": "Unauthorized"}),
+        }
 
+    token = body["event"]["client_msg_id"]
+    retry_num = slack_retry_num(event)
+
+    # Slack gave up waiting for our ack; the first delivery is still being answered, most likely
+    # by another container, so don't pay for a state store round-trip to find that out
+    if retry_num and slack_header(event, "x-slack-retry-reason") == "http_timeout":
+        log.info("dedupe", state="retry", retry_num=retry_num)
+        metrics.add("duplicate_events", 1)
+        return duplicate_response()
+
+    # Seen by this container (in flight or done): no DynamoDB round-trip needed
+    if not seen_events.add(token, "in_flight"):
+        log.info("dedupe", state=seen_events.get(token), retry_num=retry_num)
+        metrics.add("duplicate_events", 1)
+        return duplicate_response()
+
+    # Atomic duplicate execution prevention using a conditional write
     try:
-        table.put_item(
-            Item={
-                "id": token,
-                "conversation": body["event"]["text"],
-                "expire_at": expire_at,
-            },
-            ConditionExpression="attribute_not_exists(id)",
-        )
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
-            # Already processed by another Lambda instance
-            return {
-                "statusCode": 200,
-                "headers": {"Content-type": "application/json"},
-                "body": json.dumps({"status": "Success"}),
-            }
+        with metrics.span("dedupe"):
+            claimed = get_state_store().claim(token, DEDUPE_TTL)
+    except Exception:
+        seen_events.delete(token)
         raise
 
+    if not claimed:
+        # Already processed by another Lambda instance
+        seen_events.set(token, "done")
+        log.info("dedupe", state="remote", retry_num=retry_num)
+        metrics.add("duplicate_events", 1)
+        return duplicate_response()
+
+    # Hand the event to the worker and acknowledge Slack immediately
+    if EVENT_QUEUE:
+        get_event_queue().put(event["body"])
+        seen_events.set(token, "done")
+
+        return {
+            "statusCode": 200,
+            "headers": {"Content-type": "application/json"},
+            "body": json.dumps({"status": "Success"}),
+        }
+
     # Handle the event
-    return handler.handle(event, context)
+    handler.reuse_body(event["body"], body)
+    response = handler.handle(event, context)
+    seen_events.set(token, "done")
+
+    run_deferred()
+
+    log.info(
+        "lambda_handler",
+        users_cache=users_cache.stats(),
+        seen_events=seen_events.stats(),
+        slack=slack_limiter.stats(),
+        models=model_router.stats(),
+    )
+
+    return response
+
+
+# Process a queued Slack event
+def process_event(body, context=None):
+    event = body.get("event", {})
+    say = Say(client=app.client, channel=event.get("channel"))
+
+    metrics.start(context)
+    log.sample()
+
+    try:
+        if event.get("type") == "app_mention":
+            handle_mention(body, say)
+        elif event.get("type") == "message":
+            handle_message(body, say)
+        else:
+            log.warning("process_event", "Unsupported event type: {}", event.get("type"))
+
+        run_deferred()
+
+        log.info("process_event", models=model_router.stats())
+    finally:
+        metrics.emit()
+
+
+# Handle the worker function (SQS trigger, or drain the local queue)
+def worker_handler(event, context):
+    # A failed event is logged, not redelivered: each retry would post another placeholder
+    if event and "Records" in event:
+        for record in event["Records"]:
+            try:
+                process_event(json.loads(record["body"]), context)
+            except Exception as e:
+                log.error("worker_handler", "Error processing event", error=e)
+        return {"processed": len(event["Records"])}
+
+    queue = get_event_queue()
+
+    processed = 0
+    while True:
+        items = queue.get()
+        if not items:
+            break
+
+        for receipt, body in items:
+            try:
+                process_event(json.loads(body), context)
+            except Exception as e:
+                log.error("worker_handler", "Error processing event", error=e)
+            queue.delete(receipt)
+            processed += 1
+
+    return {"processed": processed}
@@ -0,0 +1,240 @@
+"""Tests for the asyncio engine — async Slack/OpenAI clients and the ENGINE switch."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+import handler
+from tests.conftest import make_slack_event, mock_slack_app
+
+# The @app.event decorator on a MagicMock app captures the original function.
+_real_handle_mention = next(
+    c[0][0] for c in mock_slack_app.event.return_value.call_args_list
+    if c[0][0].__name__ == "handle_mention"
+)
+
+
+async def make_stream(chunks):
+    """Build a fake async OpenAI stream yielding the given text chunks."""
+    for chunk in chunks:
+        part = MagicMock()
+        part.choices = [MagicMock()]
+        part.choices[0].delta.content = chunk
+        yield part
+
+
+@pytest.fixture
+def async_slack():
+    """Replace the async Slack client."""
+    client = MagicMock()
+    client.chat_postMessage = AsyncMock(return_value={"ts": "2.0"})
+    client.chat_update = AsyncMock(return_value={"ok": True})
+    client.assistant_threads_setStatus = AsyncMock(return_value={"ok": True})
+    with patch.object(handler, "async_slack_client", client):
+        yield client
+
+
+@pytest.fixture
+def async_openai():
+    """Replace the async OpenAI client."""
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock()
+    client.images.generate = AsyncMock()
+    with patch.object(handler, "async_openai_client", client):
+        yield client
+
+
+class TestChatUpdateAsync:
+    """Tests for handler.chat_update_async."""
+
+    def test_short_message_updates_in_place(self, async_slack):
+        say = handler.async_say("C_CHAN")
+
+        message, latest_ts = handler.run_async(
+            handler.chat_update_async(say, "C_CHAN", "1.0", "1.1", "hello", True)
+        )
+
+        assert (message, latest_ts) == ("hello", "1.1")
+        async_slack.chat_update.assert_awaited_once_with(
+            channel="C_CHAN", ts="1.1", text="hello " + handler.BOT_CURSOR
+        )
+
+    def test_long_message_continues_in_new_message(self, async_slack):
+        say = handler.async_say("C_CHAN")
+        text = "a" * 2000 + "\n\n" + "b" * 2000
+
+        message, latest_ts = handler.run_async(
+            handler.chat_update_async(say, "C_CHAN", "1.0", "1.1", text)
+        )
+
+        assert message == "\n\n" + "b" * 2000
+        assert latest_ts == "2.0"
+        assert async_slack.chat_update.await_args.kwargs["text"] == "a" * 2000
+        async_slack.chat_postMessage.assert_awaited_once_with(
+            channel="C_CHAN", text="\n\n" + "b" * 2000, thread_ts="1.0"
+        )
+
+
+class TestReplyTextAsync:
+    """Tests for handler.reply_text_async — overlaps stream reads with updates."""
+
+    def test_final_flush_has_full_text(self, async_slack, async_openai):
+        async_openai.chat.completions.create.return_value = make_stream(["Hello", " ", "world"])
+        say = handler.async_say("C_CHAN")
+
+        result = handler.run_async(
+            handler.reply_text_async([], say, "C_CHAN", "1.0", "1.1", "U_USER")
+        )
+
+        assert result == "Hello world"
+        assert async_slack.chat_update.await_args.kwargs["text"] == "Hello world"
+
+    def test_text_streamed_during_update_is_kept(self, async_slack, async_openai):
+        async_openai.chat.completions.create.return_value = make_stream(["a"] * 50)
+        say = handler.async_say("C_CHAN")
+
+        result = handler.run_async(
+            handler.reply_text_async([], say, "C_CHAN", "1.0", "1.1", "U_USER")
+        )
+
+        assert result == "a" * 50
+        assert async_slack.chat_update.await_count == 2
+
+    def test_cached_reply_is_replayed(self, async_slack, async_openai):
+        messages = [{"role": "user", "content": "What is the VPN address?"}]
+        handler.responses_cache.set(handler.response_cache_key(messages), "vpn.example")
+        say = handler.async_say("C_CHAN")
+
+        try:
+            with patch.object(handler, "RESPONSE_CACHE", True):
+                result = handler.run_async(
+                    handler.reply_text_async(messages, say, "C_CHAN", "1.0", "1.1", "U_USER")
+                )
+        finally:
+            handler.responses_cache.clear()
+
+        assert result == "vpn.example"
+        async_openai.chat.completions.create.assert_not_awaited()
+        assert async_slack.chat_update.await_args.kwargs["text"] == "vpn.example"
+
+
+class TestConversationAsync:
+    """Tests for handler.conversation_async."""
+
+    @patch("handler.conversations_replies", return_value=[])
+    def test_posts_cursor_and_streams_reply(self, mock_replies, async_slack, async_openai):
+        async_openai.chat.completions.create.return_value = make_stream(["Hi"])
+        say = handler.async_say("C_CHAN")
+
+        handler.run_async(
+            handler.conversation_async(say, "1.0", "hello", "C_CHAN", "U_USER", "msg-001")
+        )
+
+        assert async_slack.chat_postMessage.await_args_list[0].kwargs["text"] == handler.BOT_CURSOR
+        mock_replies.assert_called_once_with("C_CHAN", "1.0", "msg-001", [], None)
+        messages = async_openai.chat.completions.create.await_args.kwargs["messages"]
+        assert messages[-1] == {"role": "user", "content": "hello"}
+        assert async_slack.chat_update.await_args.kwargs["text"] == "Hi"
+
+    @patch("handler.conversations_replies", return_value=[])
+    def test_openai_error_posts_apology(self, mock_replies, async_slack, async_openai):
+        async_openai.chat.completions.create.side_effect = Exception("boom")
+        say = handler.async_say("C_CHAN")
+
+        handler.run_async(
+            handler.conversation_async(say, None, "hello", "C_CHAN", "U_USER", "msg-001")
+        )
+
+        mock_replies.assert_not_called()
+        assert "오류" in async_slack.chat_update.await_args.kwargs["text"]
+
+
+class TestRespondAsync:
+    """Tests for handler.respond_async."""
+
+    @patch("handler.conversations_replies", return_value=[])
+    def test_cursor_does_not_wait_for_content(self, mock_replies, async_slack, async_openai):
+        async_openai.chat.completions.create.return_value = make_stream(["Hi"])
+        event = make_slack_event(text="hello")["event"]
+
+        async def slow_content(prompt, event, user=None):
+            # The author lookup and attachment downloads run while the cursor is posted
+            while not async_slack.chat_postMessage.await_count:
+                await asyncio.sleep(0)
+            return [{"type": "text", "text": "TestUser: hello"}], "text"
+
+        with patch("handler.content_from_message_async", slow_content):
+            handler.run_async(asyncio.wait_for(handler.respond_async(event, "1.0", "hello", True), 1))
+
+        messages = async_openai.chat.completions.create.await_args.kwargs["messages"]
+        assert messages[-1] == {"role": "user", "content": [{"type": "text", "text": "TestUser: hello"}]}
+
+
+class TestImageGenerateAsync:
+    """Tests for handler.image_generate_async."""
+
+    @patch("handler.upload_image", return_value={"ok": True})
+    @patch("handler.conversations_replies", return_value=[])
+    def test_generates_and_uploads(self, mock_replies, mock_upload, async_slack, async_openai):
+        response = MagicMock()
+        response.choices[0].message.content = "a cat"
+        async_openai.chat.completions.create.return_value = response
+        image = MagicMock()
+        image.data = [MagicMock(url=None, b64_json="aGk=", revised_prompt="a cute cat")]
+        async_openai.images.generate.return_value = image
+        say = handler.async_say("C_CHAN")
+
+        handler.run_async(handler.image_generate_async(
+            say, "1.0", [{"type": "text", "text": "cat 그려줘"}], "C_CHAN", "msg-001"
+        ))
+
+        mock_upload.assert_called_once_with("C_CHAN", "1.0", None, "aGk=")
+        assert async_slack.chat_update.await_args.kwargs["text"] == "a cute cat"
+
+
+class TestContentFromMessageAsync:
+    """Tests for handler.content_from_message_async."""
+
+    def test_downloads_images_and_looks_up_user(self, mock_app_client):
+        files = [{"mimetype": "image/png", "url_private": "https://files.slack.com/a.png"}]
+        part = {"type": "image_url", "image_url": {"url": "data:image/png;base64,eA=="}}
+
+        with (
+            patch("handler.get_image_from_url_async", AsyncMock(return_value=b"x")) as mock_fetch,
+            patch("handler.image_content", return_value=part),
+        ):
+            content, message_type = handler.run_async(
+                handler.content_from_message_async("hello", {"files": files}, "U_USER")
+            )
+
+        mock_fetch.assert_awaited_once_with("https://files.slack.com/a.png", handler.SLACK_BOT_TOKEN)
+        assert content == [{"type": "text", "text": "TestUser: hello"}, part]
+        assert message_type == "text"
+
+    def test_failed_download_is_skipped(self):
+        files = [{"mimetype": "image/png", "url_private": "https://files.slack.com/a.png"}]
+
+        with patch("handler.get_image_from_url_async", AsyncMock(side_effect=Exception("boom"))):
+            content, _ = handler.run_async(
+                handler.content_from_message_async("hello", {"files": files})
+            )
+
+        assert content == [{"type": "text", "text": "hello"}]
+
+
+class TestEngineSwitch:
+    """ENGINE=async routes events to the async engine."""
+
+    def test_mention_runs_async_engine(self):
+        body = make_slack_event(text="<@U_TEST_BOT> hello")
+
+        with (
+            patch.object(handler, "ENGINE", "async"),
+            patch("handler.respond_async", AsyncMock()) as mock_respond,
+            patch("handler.conversation") as mock_conversation,
+        ):
+            _real_handle_mention(body, MagicMock())
+
+        mock_respond.assert_awaited_once_with(body["event"], "1234567890.000000", "hello", True, "T_TEST")
+        mock_conversation.assert_not_called()
@@ -0,0 +1,92 @@
+"""Tests for lazy client construction and the persisted bot identity."""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+import handler
+
+
+@pytest.fixture
+def no_identity(tmp_path, mock_app_client, mock_dynamo_table):
+    """Start without a cached identity, env override or /tmp file."""
+    with (
+        patch.object(handler, "bot_identity", None),
+        patch.object(handler, "SLACK_BOT_ID", ""),
+        patch.object(handler, "BOT_IDENTITY_PATH", str(tmp_path / "bot.json")),
+    ):
+        mock_dynamo_table.get_item.return_value = {}
+        yield tmp_path / "bot.json"
+
+
+class TestGetBotIdentity:
+    """Tests for handler.get_bot_identity — env, /tmp, DynamoDB, then auth.test."""
+
+    def test_env_skips_all_lookups(self, mock_app_client):
+        with (
+            patch.object(handler, "bot_identity", None),
+            patch.object(handler, "SLACK_BOT_ID", "U_ENV"),
+        ):
+            assert handler.get_bot_id() == "U_ENV"
+
+        mock_app_client.auth_test.assert_not_called()
+
+    def test_auth_test_result_is_persisted(self, no_identity, mock_app_client, mock_dynamo_table):
+        assert handler.get_bot_id() == "U_TEST_BOT"
+
+        mock_app_client.auth_test.assert_called_once()
+        assert json.loads(no_identity.read_text())["user_id"] == "U_TEST_BOT"
+        item = mock_dynamo_table.put_item.call_args.kwargs["Item"]
+        assert item["id"] == "bot#" + handler.BOT_IDENTITY_KEY
+
+    def test_tmp_file_is_used_before_network(self, no_identity, mock_app_client, mock_dynamo_table):
+        no_identity.write_text(json.dumps({"user_id": "U_FILE"}))
+
+        assert handler.get_bot_id() == "U_FILE"
+
+        mock_dynamo_table.get_item.assert_not_called()
+        mock_app_client.auth_test.assert_not_called()
+
+    def test_dynamodb_is_used_before_auth_test(self, no_identity, mock_app_client, mock_dynamo_table):
+        mock_dynamo_table.get_item.return_value = {
+            "Item": {"id": "bot#x", "identity": json.dumps({"user_id": "U_DB"})}
+        }
+
+        assert handler.get_bot_id() == "U_DB"
+
+        mock_app_client.auth_test.assert_not_called()
+        assert json.loads(no_identity.read_text())["user_id"] == "U_DB"
+
+    def test_identity_is_cached_in_memory(self, no_identity, mock_app_client):
+        handler.get_bot_id()
+        handler.get_bot_id()
+
+        mock_app_client.auth_test.assert_called_once()
+
+
+class TestAuthorize:
+    """Tests for handler.authorize — bolt authorization without auth.test."""
+
+    def test_returns_bot_token_and_user_id(self):
+        result = handler.authorize(enterprise_id=None, team_id="T1")
+
+        assert result.bot_token == handler.SLACK_BOT_TOKEN
+        assert result.bot_user_id == handler.get_bot_id()
+        assert result.team_id == "T1"
+
+
+class TestLazyClients:
+    """Clients are built on first use and reused."""
+
+    def test_openai_client_is_reused(self):
+        assert handler.get_openai() is handler.get_openai()
+        assert handler.openai is handler.get_openai()
+
+    def test_table_is_reused(self):
+        assert handler.get_table() is handler.get_table()
+        assert handler.table is handler.get_table()
+
+    def test_unknown_attribute_raises(self):
+        with pytest.raises(AttributeError):
+            handler.not_an_attribute
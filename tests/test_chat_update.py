@@ -16,7 +16,7 @@ class TestChatUpdateShortMessage:
         mock_app_client.chat_update.assert_called_once_with(
             channel="C_CHAN", ts="ts-1", text="Hello world",
         )
-        mock_say.assert_not_called()
+        mock_app_client.chat_postMessage.assert_not_called()
         assert msg == "Hello world"
         assert ts == "ts-1"
 
@@ -31,7 +31,7 @@ class TestChatUpdateShortMessage:
             channel="C_CHAN", ts="ts-1",
             text="Hello " + handler.BOT_CURSOR,
         )
-        mock_say.assert_not_called()
+        mock_app_client.chat_postMessage.assert_not_called()
         assert msg == "Hello"
         assert ts == "ts-1"
 
@@ -45,7 +45,7 @@ class TestChatUpdateShortMessage:
         mock_app_client.chat_update.assert_called_once_with(
             channel="C_CHAN", ts="ts-1", text="",
         )
-        mock_say.assert_not_called()
+        mock_app_client.chat_postMessage.assert_not_called()
         assert msg == ""
         assert ts == "ts-1"
 
@@ -93,7 +93,7 @@ class TestChatUpdateLongMessageNewlineDelimiter:
         parts = message.split("\n\n")
         assert len(parts) == 3  # after pop -> 2 (even)
 
-        mock_say.return_value = {"ts": "new-ts"}
+        mock_app_client.chat_postMessage.return_value = {"ok": True, "ts": "new-ts"}
         msg, ts = handler.chat_update(
             mock_say, "C_CHAN", "thread-1", "ts-1",
             message=message, continue_thread=False,
@@ -101,8 +101,8 @@ class TestChatUpdateLongMessageNewlineDelimiter:
 
         # chat_update called for the first chunk
         mock_app_client.chat_update.assert_called_once()
-        # say called for the continuation
-        mock_say.assert_called_once()
+        # The continuation is posted as a new message
+        mock_app_client.chat_postMessage.assert_called_once()
         assert ts == "new-ts"
 
     def test_odd_parts_split(self, mock_say, mock_app_client):
@@ -111,42 +111,44 @@ class TestChatUpdateLongMessageNewlineDelimiter:
         parts = message.split("\n\n")
         assert len(parts) == 4  # after pop -> 3 (odd)
 
-        mock_say.return_value = {"ts": "new-ts-2"}
+        mock_app_client.chat_postMessage.return_value = {"ok": True, "ts": "new-ts-2"}
         msg, ts = handler.chat_update(
             mock_say, "C_CHAN", "thread-1", "ts-1",
             message=message, continue_thread=False,
         )
 
         mock_app_client.chat_update.assert_called_once()
-        mock_say.assert_called_once()
+        mock_app_client.chat_postMessage.assert_called_once()
         assert ts == "new-ts-2"
 
     def test_continue_thread_appends_cursor(self, mock_say, mock_app_client):
         """When continue_thread=True, the continuation gets BOT_CURSOR."""
         message = self._make_long_message_even_parts()
-        mock_say.return_value = {"ts": "new-ts"}
+        mock_app_client.chat_postMessage.return_value = {"ok": True, "ts": "new-ts"}
 
         handler.chat_update(
             mock_say, "C_CHAN", "thread-1", "ts-1",
             message=message, continue_thread=True,
         )
 
-        # The say() call should include BOT_CURSOR
-        say_call = mock_say.call_args
-        assert handler.BOT_CURSOR in say_call.kwargs["text"]
+        # The continuation should include BOT_CURSOR
+        post_call = mock_app_client.chat_postMessage.call_args
+        assert handler.BOT_CURSOR in post_call.kwargs["text"]
 
-    def test_say_called_with_thread_ts(self, mock_say, mock_app_client):
-        """say() should be called with the original thread_ts."""
+    def test_continuation_posted_in_thread(self, mock_say, mock_app_client):
+        """The continuation is posted to the same channel and thread_ts."""
         message = self._make_long_message_even_parts()
-        mock_say.return_value = {"ts": "new-ts"}
+        mock_app_client.chat_postMessage.return_value = {"ok": True, "ts": "new-ts"}
 
         handler.chat_update(
             mock_say, "C_CHAN", "thread-1", "ts-1",
             message=message, continue_thread=False,
         )
 
-        say_call = mock_say.call_args
-        assert say_call.kwargs["thread_ts"] == "thread-1"
+        post_call = mock_app_client.chat_postMessage.call_args
+        assert post_call.kwargs["channel"] == "C_CHAN"
+        assert post_call.kwargs["thread_ts"] == "thread-1"
+        mock_say.assert_not_called()
 
 
 class TestChatUpdateLongMessageCodeBlockDelimiter:
@@ -159,14 +161,14 @@ class TestChatUpdateLongMessageCodeBlockDelimiter:
         message = f"Here is code:```{code_block}```And the end."
         assert len(message) > handler.MAX_LEN_SLACK
 
-        mock_say.return_value = {"ts": "code-ts"}
+        mock_app_client.chat_postMessage.return_value = {"ok": True, "ts": "code-ts"}
         msg, ts = handler.chat_update(
             mock_say, "C_CHAN", "thread-1", "ts-1",
             message=message, continue_thread=False,
         )
 
         mock_app_client.chat_update.assert_called_once()
-        mock_say.assert_called_once()
+        mock_app_client.chat_postMessage.assert_called_once()
         assert ts == "code-ts"
 
 
@@ -176,7 +178,7 @@ class TestChatUpdateLongMessageNoDelimiter:
     def test_forced_split(self, mock_say, mock_app_client):
         """No delimiter produces 1 part -> fallback: slice at MAX_LEN_SLACK."""
         message = "A" * 4000  # > 3000, no \n\n or ```
-        mock_say.return_value = {"ts": "forced-ts"}
+        mock_app_client.chat_postMessage.return_value = {"ok": True, "ts": "forced-ts"}
 
         msg, ts = handler.chat_update(
             mock_say, "C_CHAN", "thread-1", "ts-1",
@@ -188,25 +190,25 @@ class TestChatUpdateLongMessageNoDelimiter:
         first_text = update_call.kwargs["text"]
         assert len(first_text) == handler.MAX_LEN_SLACK
 
-        # Remainder sent via say()
-        mock_say.assert_called_once()
-        say_text = mock_say.call_args.kwargs["text"]
-        assert len(say_text) == 1000  # 4000 - 3000
+        # Remainder posted as a new message
+        mock_app_client.chat_postMessage.assert_called_once()
+        post_text = mock_app_client.chat_postMessage.call_args.kwargs["text"]
+        assert len(post_text) == 1000  # 4000 - 3000
 
         assert ts == "forced-ts"
 
     def test_forced_split_with_continue(self, mock_say, mock_app_client):
         """Forced split + continue_thread appends cursor to remainder."""
         message = "B" * 4000
-        mock_say.return_value = {"ts": "forced-ts-2"}
+        mock_app_client.chat_postMessage.return_value = {"ok": True, "ts": "forced-ts-2"}
 
         handler.chat_update(
             mock_say, "C_CHAN", "thread-1", "ts-1",
             message=message, continue_thread=True,
         )
 
-        say_text = mock_say.call_args.kwargs["text"]
-        assert say_text.endswith(handler.BOT_CURSOR)
+        post_text = mock_app_client.chat_postMessage.call_args.kwargs["text"]
+        assert post_text.endswith(handler.BOT_CURSOR)
 
 
 class TestChatUpdateReplaceText:
@@ -220,7 +222,7 @@ class TestChatUpdateReplaceText:
         message = f"{first_part}\n\n{second_part}"
         assert len(message) > handler.MAX_LEN_SLACK
 
-        mock_say.return_value = {"ts": "rep-ts"}
+        mock_app_client.chat_postMessage.return_value = {"ok": True, "ts": "rep-ts"}
         handler.chat_update(
             mock_say, "C_CHAN", "thread-1", "ts-1",
             message=message, continue_thread=False,
@@ -1,5 +1,6 @@
 """Tests for handler.content_from_message()."""
 
+import base64
 from unittest.mock import patch, MagicMock
 
 import handler
@@ -91,10 +92,10 @@ class TestUserInfo:
 class TestImageAttachments:
     """Image file attachments in event produce image_url content blocks."""
 
-    @patch("handler.get_encoded_image_from_slack")
+    @patch("handler.get_image_from_slack")
     def test_single_image_file(self, mock_get_img, mock_app_client):
         """Event with one image file should add an image_url element."""
-        mock_get_img.return_value = "base64data"
+        mock_get_img.return_value = b"imagedata"
 
         event = {
             "files": [
@@ -109,11 +110,11 @@ class TestImageAttachments:
 
         assert len(content) == 2
         assert content[1]["type"] == "image_url"
-        assert "base64,base64data" in content[1]["image_url"]["url"]
+        assert "base64,aW1hZ2VkYXRh" in content[1]["image_url"]["url"]
         assert "image/png" in content[1]["image_url"]["url"]
         mock_get_img.assert_called_once_with("https://files.slack.com/img.png")
 
-    @patch("handler.get_encoded_image_from_slack")
+    @patch("handler.get_image_from_slack")
     def test_non_image_file_ignored(self, mock_get_img, mock_app_client):
         """Non-image files should not produce image_url elements."""
         event = {
@@ -130,10 +131,10 @@ class TestImageAttachments:
         assert len(content) == 1  # only the text element
         mock_get_img.assert_not_called()
 
-    @patch("handler.get_encoded_image_from_slack")
+    @patch("handler.get_image_from_slack")
     def test_multiple_image_files(self, mock_get_img, mock_app_client):
         """Multiple image files should each produce an image_url element."""
-        mock_get_img.return_value = "b64"
+        mock_get_img.return_value = b"b64"
 
         event = {
             "files": [
@@ -149,7 +150,7 @@ class TestImageAttachments:
         assert content[2]["type"] == "image_url"
         assert mock_get_img.call_count == 2
 
-    @patch("handler.get_encoded_image_from_slack")
+    @patch("handler.get_image_from_slack")
     def test_image_fetch_failure_no_image_url(self, mock_get_img, mock_app_client):
         """If image fetch returns None, no image_url should be appended."""
         mock_get_img.return_value = None
@@ -165,10 +166,10 @@ class TestImageAttachments:
         assert len(content) == 1  # only text
         mock_get_img.assert_called_once()
 
-    @patch("handler.get_encoded_image_from_slack")
+    @patch("handler.get_image_from_slack")
     def test_mixed_files(self, mock_get_img, mock_app_client):
         """Mix of image and non-image files: only images processed."""
-        mock_get_img.return_value = "b64"
+        mock_get_img.return_value = b"b64"
 
         event = {
             "files": [
@@ -188,3 +189,62 @@ class TestImageAttachments:
 
         assert len(content) == 1
         assert content[0]["type"] == "text"
+
+
+class TestImageAttachmentsConcurrent:
+    """Attachments are fetched on the shared pool with per-file failure handling."""
+
+    @patch("handler.get_image_from_slack")
+    def test_order_is_preserved(self, mock_get_img, mock_app_client):
+        mock_get_img.side_effect = lambda url: url.split("/")[-1].encode("utf-8")
+
+        event = {
+            "files": [
+                {"mimetype": "image/png", "url_private": "https://x/first"},
+                {"mimetype": "image/png", "url_private": "https://x/second"},
+                {"mimetype": "image/png", "url_private": "https://x/third"},
+            ]
+        }
+
+        content, _ = handler.content_from_message("Pics", event, None)
+
+        urls = [part["image_url"]["url"] for part in content[1:]]
+        assert [base64.b64decode(u.split(",")[-1]) for u in urls] == [b"first", b"second", b"third"]
+
+    @patch("handler.get_image_from_slack")
+    def test_oversized_file_is_not_downloaded(self, mock_get_img, mock_app_client):
+        event = {
+            "files": [
+                {
+                    "mimetype": "image/png",
+                    "url_private": "https://x/huge",
+                    "size": handler.IMAGE_MAX_BYTES + 1,
+                },
+            ]
+        }
+
+        content, _ = handler.content_from_message("Huge", event, None)
+
+        assert len(content) == 1
+        mock_get_img.assert_not_called()
+
+    @patch("handler.get_image_from_slack")
+    def test_failed_file_does_not_drop_others(self, mock_get_img, mock_app_client):
+        def fetch(url):
+            if url.endswith("bad"):
+                raise RuntimeError("boom")
+            return b"ok"
+
+        mock_get_img.side_effect = fetch
+
+        event = {
+            "files": [
+                {"mimetype": "image/png", "url_private": "https://x/bad"},
+                {"mimetype": "image/png", "url_private": "https://x/good"},
+            ]
+        }
+
+        content, _ = handler.content_from_message("Mixed", event, None)
+
+        assert len(content) == 2
+        assert content[1]["image_url"]["url"].endswith("base64,b2s=")
@@ -1,5 +1,6 @@
 """Tests for handler.conversation — orchestrates chat with OpenAI."""
 
+import threading
 from unittest.mock import patch, MagicMock
 
 import handler
@@ -120,3 +121,26 @@ class TestConversation:
         mock_say.assert_called_once()
         call_kwargs = mock_say.call_args
         assert call_kwargs[1]["text"] == handler.BOT_CURSOR or call_kwargs[0][0] == handler.BOT_CURSOR
+
+    @patch("handler.reply_text")
+    @patch("handler.conversations_replies", return_value=[])
+    def test_cursor_does_not_wait_for_content(
+        self, mock_conv_replies, mock_reply_text, mock_say, mock_app_client, mock_openai
+    ):
+        posted = threading.Event()
+
+        def say(**kwargs):
+            posted.set()
+            return {"ts": "1.1"}
+
+        def load_content():
+            # The author lookup and attachment downloads run while the cursor is posted
+            assert posted.wait(1)
+            return [{"type": "text", "text": "TestUser: hello"}]
+
+        mock_say.side_effect = say
+
+        handler.conversation(mock_say, "thread-1", load_content, "C_CHAN", "U_USER", "msg-001")
+
+        messages = mock_reply_text.call_args[0][0]
+        assert messages[-1]["content"] == [{"type": "text", "text": "TestUser: hello"}]
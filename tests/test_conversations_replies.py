@@ -1,5 +1,9 @@
 """Tests for handler.get_reactions and handler.conversations_replies."""
 
+from unittest.mock import MagicMock, patch
+
+import pytest
+
 import handler
 
 
@@ -159,3 +163,185 @@ class TestConversationsReplies:
         result = handler.conversations_replies("C_CHAN", "1234.0000", "msg-001", messages=existing)
 
         assert result == existing
+
+
+class TestConversationsRepliesIncremental:
+    """Tests for the per-thread history cursor in handler.conversations_replies."""
+
+    def _thread(self, *messages):
+        return {"ok": True, "messages": [dict(m) for m in messages]}
+
+    def test_second_turn_fetches_only_newer_replies(self, mock_app_client):
+        parent = {"ts": "1234.0000", "text": "parent", "user": "U1"}
+        reply = {"ts": "1234.0001", "text": "reply", "user": "U2"}
+        placeholder = {"ts": "1234.0002", "text": ":robot_face:", "user": "U_BOT", "bot_id": "B_BOT"}
+        mock_app_client.conversations_replies.return_value = self._thread(parent, reply, placeholder)
+
+        handler.conversations_replies("C_CHAN", "1234.0000", "msg-999")
+
+        answer = {"ts": "1234.0002", "text": "answer", "user": "U_BOT", "bot_id": "B_BOT"}
+        placeholder2 = {"ts": "1234.0004", "text": ":robot_face:", "user": "U_BOT", "bot_id": "B_BOT"}
+        mock_app_client.conversations_replies.return_value = self._thread(parent, answer, placeholder2)
+
+        result = handler.conversations_replies("C_CHAN", "1234.0000", "msg-999")
+
+        kwargs = mock_app_client.conversations_replies.call_args.kwargs
+        assert kwargs["oldest"] == "1234.0001"
+        assert [m["content"] for m in result] == [
+            "TestUser: parent",
+            "TestUser: reply",
+            "TestUser: answer",
+        ]
+
+    def test_current_prompt_is_not_committed(self, mock_app_client):
+        parent = {"ts": "1234.0000", "text": "parent", "user": "U1"}
+        prompt = {"ts": "1234.0001", "text": "question", "user": "U2", "client_msg_id": "msg-001"}
+        placeholder = {"ts": "1234.0002", "text": ":robot_face:", "user": "U_BOT", "bot_id": "B_BOT"}
+        mock_app_client.conversations_replies.return_value = self._thread(parent, prompt, placeholder)
+
+        handler.conversations_replies("C_CHAN", "1234.0000", "msg-001")
+
+        history = handler.threads_cache.get("C_CHAN:1234.0000")
+        assert history["cursor"] == "1234.0000"
+        assert [e["content"] for e in history["entries"]] == ["TestUser: parent"]
+
+    def test_streaming_bot_reply_is_not_committed(self, mock_app_client):
+        parent = {"ts": "1234.0000", "text": "parent", "user": "U1"}
+        partial = {"ts": "1234.0001", "text": "half " + handler.BOT_CURSOR, "user": "U_BOT", "bot_id": "B_BOT"}
+        placeholder = {"ts": "1234.0002", "text": ":robot_face:", "user": "U_BOT", "bot_id": "B_BOT"}
+        mock_app_client.conversations_replies.return_value = self._thread(parent, partial, placeholder)
+
+        result = handler.conversations_replies("C_CHAN", "1234.0000", "msg-999")
+
+        assert len(result) == 2
+        assert handler.threads_cache.get("C_CHAN:1234.0000")["cursor"] == "1234.0000"
+
+    def test_emoji_prompt_reads_whole_thread(self, mock_app_client):
+        parent = {"ts": "1234.0000", "text": "parent", "user": "U1"}
+        placeholder = {"ts": "1234.0001", "text": ":robot_face:", "user": "U_BOT", "bot_id": "B_BOT"}
+        mock_app_client.conversations_replies.return_value = self._thread(parent, placeholder)
+        handler.conversations_replies("C_CHAN", "1234.0000", "msg-999")
+
+        handler.conversations_replies("C_CHAN", "1234.0000", "msg-999", [], "emoji")
+
+        assert "oldest" not in mock_app_client.conversations_replies.call_args.kwargs
+
+    def test_follows_pagination_cursor(self, mock_app_client):
+        mock_app_client.conversations_replies.side_effect = [
+            {
+                "ok": True,
+                "messages": [{"ts": "1234.0000", "text": "parent", "user": "U1"}],
+                "response_metadata": {"next_cursor": "page-2"},
+            },
+            {
+                "ok": True,
+                "messages": [
+                    {"ts": "1234.0001", "text": "reply", "user": "U2"},
+                    {"ts": "1234.0002", "text": ":robot_face:", "user": "U_BOT", "bot_id": "B_BOT"},
+                ],
+            },
+        ]
+
+        result = handler.conversations_replies("C_CHAN", "1234.0000", "msg-999")
+
+        mock_app_client.conversations_replies.side_effect = None
+        assert mock_app_client.conversations_replies.call_args.kwargs["cursor"] == "page-2"
+        assert len(result) == 2
+
+
+class TestThreadSummary:
+    """Rolling per-thread summary replacing the oldest messages."""
+
+    @pytest.fixture(autouse=True)
+    def summary_enabled(self):
+        handler.summaries_cache.clear()
+        with (
+            patch.object(handler, "THREAD_SUMMARY", True),
+            patch.object(handler, "THREAD_SUMMARY_TOKENS", 10),
+            patch.object(handler, "THREAD_SUMMARY_KEEP", 1),
+        ):
+            yield
+        handler.summaries_cache.clear()
+        handler.deferred.clear()
+
+    def _thread(self, count):
+        messages = [
+            {"ts": "1234.{:04d}".format(i), "text": "message {} ".format(i) * 5, "user": "U1"}
+            for i in range(count)
+        ]
+        messages.append({"ts": "1234.9999", "text": ":robot_face:", "user": "U_BOT", "bot_id": "B_BOT"})
+        return {"ok": True, "messages": messages}
+
+    def test_summary_is_updated_after_the_reply(self, mock_app_client, mock_openai, mock_dynamo_table):
+        mock_app_client.conversations_replies.return_value = self._thread(4)
+        mock_openai.chat.completions.create.return_value.choices[0].message.content = "Earlier: 0-2"
+
+        handler.conversations_replies("C_CHAN", "1234.0000", "msg-999")
+
+        mock_openai.chat.completions.create.assert_not_called()
+        handler.run_deferred()
+
+        prompt = mock_openai.chat.completions.create.call_args.kwargs["messages"][0]["content"]
+        assert "message 2" in prompt and "message 3" not in prompt
+        assert handler.summaries_cache.get("C_CHAN:1234.0000") == {"summary": "Earlier: 0-2", "cursor": "1234.0002"}
+        item = mock_dynamo_table.put_item.call_args.kwargs["Item"]
+        assert item["id"] == "summary#C_CHAN:1234.0000"
+
+    def test_prompt_is_summary_plus_recent_messages(self, mock_app_client):
+        handler.set_thread_summary("C_CHAN:1234.0000", "Earlier: 0-2", "1234.0002")
+        mock_app_client.conversations_replies.return_value = self._thread(4)
+
+        result = handler.conversations_replies("C_CHAN", "1234.0000", "msg-999")
+
+        assert result[0]["role"] == "system"
+        assert "Earlier: 0-2" in result[0]["content"]
+        assert [m["content"] for m in result[1:]] == ["TestUser: " + "message 3 " * 5]
+
+    def test_short_thread_is_not_summarized(self, mock_app_client, mock_openai):
+        mock_app_client.conversations_replies.return_value = self._thread(1)
+
+        with patch.object(handler, "THREAD_SUMMARY_TOKENS", 10000):
+            handler.conversations_replies("C_CHAN", "1234.0000", "msg-999")
+
+        assert handler.deferred == []
+
+    def test_next_turn_does_not_summarize_again(self, mock_app_client, mock_openai):
+        mock_openai.chat.completions.create.return_value.choices[0].message.content = "Earlier: 0-4"
+        thread = self._thread(6)
+        mock_app_client.conversations_replies.return_value = thread
+
+        with patch.object(handler, "THREAD_SUMMARY_TOKENS", 40):
+            handler.conversations_replies("C_CHAN", "1234.0000", "msg-999")
+            handler.run_deferred()
+
+            # Slack returns the parent plus the replies after the cached history
+            answer = {"ts": "1234.0006", "text": "answer " * 20, "user": "U_BOT", "bot_id": "B_BOT"}
+            placeholder = {"ts": "1234.9999", "text": ":robot_face:", "user": "U_BOT", "bot_id": "B_BOT"}
+            mock_app_client.conversations_replies.return_value = {
+                "ok": True,
+                "messages": [thread["messages"][0], answer, placeholder],
+            }
+            handler.conversations_replies("C_CHAN", "1234.0000", "msg-999")
+
+        assert handler.deferred == []
+        mock_openai.chat.completions.create.assert_called_once()
+
+    def test_summary_stays_pinned_when_history_is_trimmed(self):
+        summary = {"role": "system", "content": "Summary of the earlier messages in this thread:\nS"}
+        history = [summary] + [{"role": "user", "content": "a" * 400} for _ in range(10)]
+
+        with patch.object(handler, "MAX_TOKENS_OPENAI", 500):
+            messages = handler.conversation_messages("question", history)
+
+        assert summary in messages
+        assert messages[-1]["content"] == "question"
+
+    def test_failed_deferred_work_is_logged(self):
+        handler.defer(MagicMock(side_effect=Exception("boom")))
+        done = MagicMock()
+        handler.defer(done)
+
+        handler.run_deferred()
+
+        done.assert_called_once()
+        assert handler.deferred == []
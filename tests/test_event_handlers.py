@@ -25,7 +25,7 @@ class TestHandleMention:
 
             # Assert — bot mention stripped, prompt is "hello world"
             call_args = mock_conv.call_args
-            content_arg = call_args[0][2]  # 3rd positional: content
+            content_arg = call_args[0][2]()  # 3rd positional: content loader
             assert "hello world" in content_arg[0]["text"]
             # Should NOT contain bot mention
             assert f"<@{handler.bot_id}>" not in content_arg[0]["text"]
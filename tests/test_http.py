@@ -2,6 +2,7 @@
 
 import base64
 
+import requests
 import responses
 
 import handler
@@ -126,3 +127,49 @@ class TestGetEncodedImageFromSlack:
         result = handler.get_encoded_image_from_slack("https://files.slack.com/broken.png")
 
         assert result is None
+
+
+class TestGetImageFromUrlLimits:
+    """Size caps, network errors and session reuse in handler.get_image_from_url."""
+
+    @responses.activate
+    def test_body_over_max_bytes_returns_none(self):
+        responses.add(
+            responses.GET,
+            "https://example.com/huge.png",
+            body=b"x" * 200,
+            status=200,
+        )
+
+        result = handler.get_image_from_url("https://example.com/huge.png", max_bytes=100)
+
+        assert result is None
+
+    @responses.activate
+    def test_content_length_over_max_bytes_returns_none(self):
+        responses.add(
+            responses.GET,
+            "https://example.com/huge.png",
+            body=b"x" * 200,
+            status=200,
+            headers={"Content-Length": "200"},
+        )
+
+        result = handler.get_image_from_url("https://example.com/huge.png", max_bytes=100)
+
+        assert result is None
+
+    @responses.activate
+    def test_connection_error_returns_none(self):
+        responses.add(
+            responses.GET,
+            "https://example.com/down.png",
+            body=requests.ConnectionError("refused"),
+        )
+
+        result = handler.get_image_from_url("https://example.com/down.png")
+
+        assert result is None
+
+    def test_session_is_reused(self):
+        assert handler.get_http_session() is handler.get_http_session()
@@ -168,3 +168,58 @@ class TestImageGenerateWithThread:
             mock_conv_replies.assert_called_once_with(
                 "C_CHAN", thread_ts, "msg-001", [], "image"
             )
+
+
+class TestDescribeImages:
+    """Tests for handler.describe_images — cached vision descriptions."""
+
+    def _response(self, text):
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = text
+        return response
+
+    def test_same_image_is_described_once(self, mock_openai, mock_dynamo_table):
+        images = [{"type": "image_url", "image_url": {"url": "data:image/png;base64,abc"}}]
+        mock_openai.chat.completions.create.side_effect = None
+        mock_openai.chat.completions.create.return_value = self._response("A cat")
+
+        first = handler.describe_images(images)
+        second = handler.describe_images(images)
+
+        assert first == second == "A cat"
+        mock_openai.chat.completions.create.assert_called_once()
+        mock_dynamo_table.get_item.assert_not_called()
+
+    def test_different_images_are_described_separately(self, mock_openai):
+        mock_openai.chat.completions.create.side_effect = None
+        mock_openai.chat.completions.create.return_value = self._response("A cat")
+
+        handler.describe_images([{"type": "image_url", "image_url": {"url": "data:a"}}])
+        handler.describe_images([{"type": "image_url", "image_url": {"url": "data:b"}}])
+
+        assert mock_openai.chat.completions.create.call_count == 2
+
+    def test_dynamodb_tier_serves_other_containers(self, mock_openai, mock_dynamo_table):
+        mock_dynamo_table.get_item.return_value = {
+            "Item": {"id": "describe#x", "description": "Stored", "expire_at": 9999999999}
+        }
+
+        with patch.object(handler, "DESCRIBE_CACHE_DYNAMODB", True):
+            result = handler.describe_images([{"type": "image_url", "image_url": {"url": "data:a"}}])
+
+        assert result == "Stored"
+        mock_openai.chat.completions.create.assert_not_called()
+
+    def test_dynamodb_tier_is_written_with_ttl(self, mock_openai, mock_dynamo_table):
+        mock_dynamo_table.get_item.return_value = {}
+        mock_openai.chat.completions.create.side_effect = None
+        mock_openai.chat.completions.create.return_value = self._response("A dog")
+
+        with patch.object(handler, "DESCRIBE_CACHE_DYNAMODB", True):
+            handler.describe_images([{"type": "image_url", "image_url": {"url": "data:a"}}])
+
+        item = mock_dynamo_table.put_item.call_args.kwargs["Item"]
+        assert item["id"].startswith("describe#")
+        assert item["description"] == "A dog"
+        assert "expire_at" in item
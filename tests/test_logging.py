@@ -0,0 +1,107 @@
+"""Tests for handler.redact and handler.Logger — leveled, size-bounded JSON logs."""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import handler
+
+
+class TestRedact:
+    """Tests for handler.redact."""
+
+    def test_plain_values_pass_through(self):
+        assert handler.redact({"a": 1, "b": [True, None, "x"]}) == {"a": 1, "b": [True, None, "x"]}
+
+    def test_base64_data_url_is_replaced(self):
+        url = "data:image/png;base64," + "A" * 5000
+
+        assert handler.redact(url) == "<data:image/png;base64 {} chars>".format(len(url))
+
+    def test_long_string_is_truncated(self):
+        assert handler.redact("x" * 15, max_field=10) == "x" * 10 + "...(+5 chars)"
+
+    def test_bytes_are_summarized(self):
+        assert handler.redact(b"\x89PNG" * 10) == "<40 bytes>"
+
+    def test_collections_are_capped(self):
+        assert handler.redact(list(range(5)), max_items=2) == [0, 1, "...(+3 items)"]
+        assert handler.redact({"a": 1, "b": 2, "c": 3}, max_items=2) == {"a": 1, "b": 2, "...": "+1 keys"}
+
+    def test_nested_image_content_is_redacted(self):
+        content = [
+            {"type": "text", "text": "what is this?"},
+            {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64," + "B" * 100}},
+        ]
+
+        result = handler.redact(content)
+
+        assert result[0]["text"] == "what is this?"
+        assert result[1]["image_url"]["url"].startswith("<data:image/jpeg;base64 ")
+
+    def test_deep_nesting_is_cut(self):
+        value = [[[[[[[["deep"]]]]]]]]
+
+        assert "deep" not in json.dumps(handler.redact(value))
+
+    def test_objects_use_data_or_str(self):
+        response = MagicMock()
+        response.data = {"ok": True}
+
+        assert handler.redact(response) == {"ok": True}
+        assert handler.redact(ValueError("boom")) == "boom"
+
+
+class TestLogger:
+    """Tests for handler.Logger."""
+
+    def test_record_is_one_json_line(self):
+        log = handler.Logger("INFO")
+
+        with patch("builtins.print") as mock_print:
+            log.warning("fetch", "Failed to fetch {}", "image", url="https://x", size=b"abc")
+
+        record = json.loads(mock_print.call_args[0][0])
+        assert record == {
+            "level": "WARNING",
+            "event": "fetch",
+            "message": "Failed to fetch image",
+            "url": "https://x",
+            "size": "<3 bytes>",
+        }
+
+    def test_below_level_is_not_formatted(self):
+        log = handler.Logger("INFO")
+        value = MagicMock()
+
+        with patch("builtins.print") as mock_print, patch.object(handler, "redact") as mock_redact:
+            log.debug("conversation", "{}", value, messages=value)
+
+        mock_print.assert_not_called()
+        mock_redact.assert_not_called()
+
+    def test_unicode_is_kept(self):
+        log = handler.Logger("DEBUG")
+
+        with patch("builtins.print") as mock_print:
+            log.debug("conversation", content="이전 대화")
+
+        assert "이전 대화" in mock_print.call_args[0][0]
+
+    def test_sampled_invocation_logs_debug(self):
+        log = handler.Logger("ERROR", sample_rate=0.5, rand=lambda: 0.1)
+        log.sample()
+
+        with patch("builtins.print") as mock_print:
+            log.debug("lambda_handler", body={})
+
+        mock_print.assert_called_once()
+
+    def test_unsampled_invocation_keeps_level(self):
+        log = handler.Logger("ERROR", sample_rate=0.5, rand=lambda: 0.9)
+        log.sample()
+
+        with patch("builtins.print") as mock_print:
+            log.info("lambda_handler")
+            log.error("lambda_handler")
+
+        assert mock_print.call_count == 1
@@ -0,0 +1,157 @@
+"""Tests for handler.Metrics — per-invocation timings emitted as CloudWatch EMF."""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import handler
+from tests.conftest import make_lambda_event, make_slack_event
+
+
+@pytest.fixture
+def enabled_metrics():
+    """Replace the module metrics with an enabled recorder."""
+    metrics = handler.Metrics(True, "Test")
+    with patch.object(handler, "metrics", metrics):
+        yield metrics
+
+
+def emitted(mock_print):
+    """Return the EMF records printed so far."""
+    records = []
+    for call in mock_print.call_args_list:
+        try:
+            record = json.loads(call[0][0])
+        except (ValueError, TypeError, IndexError):
+            continue
+        if isinstance(record, dict) and "_aws" in record:
+            records.append(record)
+    return records
+
+
+class TestMetrics:
+    """Tests for handler.Metrics."""
+
+    def test_disabled_is_a_no_op(self):
+        metrics = handler.Metrics(False)
+
+        with metrics.span("phase"):
+            pass
+        metrics.add("tokens", 10)
+
+        assert metrics.span("phase") is handler.Metrics.NO_SPAN
+        assert metrics.values == {}
+        with patch("builtins.print") as mock_print:
+            metrics.emit()
+        mock_print.assert_not_called()
+
+    def test_spans_accumulate(self):
+        metrics = handler.Metrics(True)
+
+        with patch("handler.time.perf_counter", side_effect=[0.0, 0.010, 1.0, 1.005]):
+            with metrics.span("slack"):
+                pass
+            with metrics.span("slack"):
+                pass
+
+        assert metrics.values["slack"] == pytest.approx(15.0)
+        assert metrics.units["slack"] == "Milliseconds"
+
+    def test_record_is_emf(self):
+        metrics = handler.Metrics(True, "Test")
+        metrics.start(MagicMock(function_name="bot-dev"))
+        metrics.add("completion_tokens", 42)
+
+        record = metrics.record()
+
+        directive = record["_aws"]["CloudWatchMetrics"][0]
+        assert directive["Namespace"] == "Test"
+        assert directive["Dimensions"] == [["FunctionName"]]
+        names = {m["Name"] for m in directive["Metrics"]}
+        assert {"completion_tokens", "total", "cold_start"} <= names
+        assert record["FunctionName"] == "bot-dev"
+        assert record["completion_tokens"] == 42
+
+    def test_cold_start_only_first_record(self):
+        metrics = handler.Metrics(True)
+
+        with patch("builtins.print") as mock_print:
+            metrics.emit()
+            metrics.emit()
+
+        records = emitted(mock_print)
+        assert [r["cold_start"] for r in records] == [1, 0]
+
+    def test_emit_resets_values(self):
+        metrics = handler.Metrics(True)
+        metrics.add("flushes", 3)
+
+        with patch("builtins.print"):
+            metrics.emit()
+
+        assert metrics.values == {}
+
+
+class TestInstrumentation:
+    """Phases recorded along the request path."""
+
+    def test_lambda_handler_emits_one_record(self, enabled_metrics, mock_dynamo_table):
+        event = make_lambda_event(make_slack_event(text="hello"))
+
+        with (
+            patch.object(handler.handler, "handle", return_value={"statusCode": 200}),
+            patch("builtins.print") as mock_print,
+        ):
+            handler.lambda_handler(event, MagicMock(function_name="bot-dev"))
+
+        records = emitted(mock_print)
+        assert len(records) == 1
+        assert "dedupe" in records[0]
+        assert records[0]["FunctionName"] == "bot-dev"
+
+    def test_reply_text_records_first_token_and_flushes(
+        self, enabled_metrics, mock_say, mock_app_client, mock_openai
+    ):
+        parts = []
+        for chunk in ["Hello", " world"]:
+            part = MagicMock()
+            part.choices = [MagicMock()]
+            part.choices[0].delta.content = chunk
+            parts.append(part)
+        mock_openai.chat.completions.create.return_value = iter(parts)
+
+        handler.reply_text(
+            [{"role": "user", "content": "hi"}], mock_say, "C_CHAN", "thread-1", "ts-1", "U_USER"
+        )
+
+        values = enabled_metrics.values
+        assert "openai_first_token" in values
+        assert "openai_reply" in values
+        assert values["flushes"] == 2
+        assert values["completion_tokens"] > 0
+        assert values["prompt_tokens"] > 0
+
+    def test_reply_text_records_usage_with_cached_tokens(
+        self, enabled_metrics, mock_say, mock_app_client, mock_openai
+    ):
+        part = MagicMock()
+        part.choices = [MagicMock()]
+        part.choices[0].delta.content = "Hello"
+        usage_part = MagicMock()
+        usage_part.choices = []
+        usage_part.usage.prompt_tokens = 2048
+        usage_part.usage.completion_tokens = 5
+        usage_part.usage.prompt_tokens_details.cached_tokens = 1920
+        mock_openai.chat.completions.create.return_value = iter([part, usage_part])
+
+        handler.reply_text(
+            [{"role": "user", "content": "hi"}], mock_say, "C_CHAN", "thread-1", "ts-1", "U_USER"
+        )
+
+        kwargs = mock_openai.chat.completions.create.call_args.kwargs
+        assert kwargs["stream_options"] == {"include_usage": True}
+        values = enabled_metrics.values
+        assert values["prompt_tokens"] == 2048
+        assert values["completion_tokens"] == 5
+        assert values["cached_tokens"] == 1920
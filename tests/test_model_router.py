@@ -0,0 +1,220 @@
+"""Tests for handler.ModelRouter — per call site model routing with fallback."""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import openai
+import pytest
+
+import handler
+from tests.conftest import FakeClock
+
+
+class StatusError(Exception):
+    """Stand-in for an OpenAI API status error."""
+
+    def __init__(self, status_code):
+        super().__init__("HTTP {}".format(status_code))
+        self.status_code = status_code
+
+
+def user(text="hi", images=0):
+    content = [{"type": "text", "text": text}]
+    content += [{"type": "image_url", "image_url": {"url": "data:image/png;base64,AA"}}] * images
+    return {"role": "user", "content": content}
+
+
+@pytest.fixture
+def models():
+    with (
+        patch.object(handler, "OPENAI_MODEL", "big"),
+        patch.object(handler, "OPENAI_MODEL_SMALL", "small-model"),
+    ):
+        yield
+
+
+class TestRoute:
+    """Tests for handler.ModelRouter.route."""
+
+    def test_default_rules_send_rewrite_and_summary_to_small_model(self, models):
+        router = handler.ModelRouter()
+
+        assert router.route("rewrite", [user()]) == ["small-model", "big"]
+        assert router.route("summary", [user()]) == ["small-model", "big"]
+        assert router.route("chat", [user()]) == ["big"]
+        assert router.route("describe", [user(images=1)]) == ["big"]
+
+    def test_small_model_defaults_to_main_model(self):
+        router = handler.ModelRouter()
+
+        with patch.object(handler, "OPENAI_MODEL_SMALL", ""):
+            assert router.route("rewrite", [user()]) == [handler.OPENAI_MODEL]
+
+    def test_first_matching_rule_wins(self, models):
+        router = handler.ModelRouter([
+            {"site": "chat", "max_prompt_tokens": 100, "images": False, "models": "small"},
+            {"site": "chat", "models": ["gpt-other", "default"]},
+        ])
+
+        assert router.route("chat", [user("short")]) == ["small-model", "big"]
+        assert router.route("chat", [user("long " * 500)]) == ["gpt-other", "big"]
+        assert router.route("chat", [user("short", images=1)]) == ["gpt-other", "big"]
+
+    def test_thread_size(self, models):
+        router = handler.ModelRouter([{"site": "chat", "min_thread": 3, "models": ["gpt-long"]}])
+        thread = [{"role": "system", "content": "be nice"}] + [user()] * 3
+
+        assert router.route("chat", thread) == ["big"]
+        assert router.route("chat", thread + [user()]) == ["gpt-long", "big"]
+
+    def test_rule_without_site_matches_every_site(self, models):
+        router = handler.ModelRouter([{"models": ["small"]}])
+
+        assert router.route("describe", [user(images=2)]) == ["small-model", "big"]
+
+    def test_features(self):
+        messages = [{"role": "system", "content": "x"}, user(images=2), {"role": "assistant", "content": "y"}, user()]
+
+        features = handler.ModelRouter.features(messages)
+
+        assert features["images"] == 2
+        assert features["thread"] == 2
+        assert features["prompt_tokens"] == sum(handler.count_message_tokens(m) for m in messages)
+
+
+class TestLoadModelRoutes:
+    """Tests for handler.load_model_routes — parsing the MODEL_ROUTES setting."""
+
+    def test_unset_uses_default_rules(self):
+        assert handler.load_model_routes("") is None
+
+    def test_json_list_of_rules(self):
+        assert handler.load_model_routes('[{"site": "chat", "models": "small"}]') == [{"site": "chat", "models": "small"}]
+
+    @pytest.mark.parametrize("value", ['[{"site": "chat"', '{"site": "chat"}', '["small"]'])
+    def test_invalid_setting_is_ignored_with_a_warning(self, value):
+        with patch("builtins.print") as mock_print:
+            assert handler.load_model_routes(value) is None
+
+        record = json.loads(mock_print.call_args[0][0])
+        assert (record["level"], record["event"]) == ("WARNING", "model_route")
+
+
+class TestCall:
+    """Tests for handler.ModelRouter.call and call_async."""
+
+    def test_returns_first_model_result(self, models):
+        router = handler.ModelRouter()
+        create = MagicMock(return_value="ok")
+
+        assert router.call("rewrite", [user()], create) == "ok"
+        create.assert_called_once_with("small-model")
+
+    def test_falls_back_on_retryable_error(self, models):
+        router = handler.ModelRouter()
+        create = MagicMock(side_effect=[StatusError(429), "ok"])
+
+        assert router.call("rewrite", [user()], create) == "ok"
+        assert [c.args[0] for c in create.call_args_list] == ["small-model", "big"]
+
+    def test_falls_back_on_connection_error(self, models):
+        router = handler.ModelRouter()
+        error = openai.APIConnectionError(request=MagicMock())
+        create = MagicMock(side_effect=[error, "ok"])
+
+        assert router.call("rewrite", [user()], create) == "ok"
+
+    def test_bad_request_is_not_retried(self, models):
+        router = handler.ModelRouter()
+        create = MagicMock(side_effect=StatusError(400))
+
+        with pytest.raises(StatusError):
+            router.call("rewrite", [user()], create)
+        create.assert_called_once()
+
+    def test_last_model_error_is_raised(self, models):
+        router = handler.ModelRouter()
+        create = MagicMock(side_effect=StatusError(503))
+
+        with pytest.raises(StatusError):
+            router.call("rewrite", [user()], create)
+        assert create.call_count == 2
+
+    def test_error_records_the_models_tried(self, models):
+        router = handler.ModelRouter()
+
+        with pytest.raises(StatusError) as failed:
+            router.call("rewrite", [user()], MagicMock(side_effect=StatusError(503)))
+
+        assert router.tried(failed.value) == ["small-model", "big"]
+        assert router.tried(RuntimeError("not a model call")) is None
+
+    def test_stats_per_route(self, models):
+        clock = FakeClock()
+        router = handler.ModelRouter(clock=clock)
+
+        def create(model):
+            clock.now += 0.5 if model == "small-model" else 0.1
+            if model == "small-model":
+                raise StatusError(500)
+            return "ok"
+
+        router.call("rewrite", [user()], create)
+        router.call("chat", [user()], create)
+
+        assert router.stats() == {
+            "rewrite:small-model": {"calls": 1, "errors": 1, "avg_ms": 500, "max_ms": 500},
+            "rewrite:big": {"calls": 1, "errors": 0, "avg_ms": 100, "max_ms": 100},
+            "chat:big": {"calls": 1, "errors": 0, "avg_ms": 100, "max_ms": 100},
+        }
+
+    def test_call_async_falls_back(self, models):
+        router = handler.ModelRouter()
+        create = AsyncMock(side_effect=[StatusError(404), "ok"])
+
+        assert asyncio.run(router.call_async("rewrite", [user()], create)) == "ok"
+        assert [c.args[0] for c in create.call_args_list] == ["small-model", "big"]
+
+
+class TestCallSites:
+    """The call sites pass the routed model to OpenAI."""
+
+    def test_image_prompt_rewrite_uses_small_model(self, models, mock_say, mock_app_client, mock_openai):
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = "a cat, watercolor"
+        mock_openai.chat.completions.create.return_value = response
+
+        with patch.object(handler, "reply_image", return_value="ok"):
+            handler.image_generate(mock_say, None, [{"type": "text", "text": "a cat"}], "C_CHAN", "msg-001")
+
+        assert mock_openai.chat.completions.create.call_args.kwargs["model"] == "small-model"
+
+    def test_describe_error_logs_the_models_tried(self, models, mock_openai):
+        mock_openai.chat.completions.create.side_effect = StatusError(503)
+        rules = [{"site": "describe", "models": ["gpt-vision"]}]
+
+        with (
+            patch.object(handler.model_router, "rules", rules),
+            patch("builtins.print") as mock_print,
+        ):
+            result = handler.describe_images_safely([{"type": "image_url", "image_url": {"url": "data:image/png;base64,AA"}}])
+
+        mock_openai.chat.completions.create.side_effect = None
+        assert result is None
+        record = json.loads(mock_print.call_args[0][0])
+        assert record["level"] == "ERROR"
+        assert record["models"] == ["gpt-vision", "big"]
+
+    def test_describe_uses_routed_model(self, models, mock_openai):
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = "a cat"
+        mock_openai.chat.completions.create.return_value = response
+        rules = [{"site": "describe", "models": ["gpt-vision"]}]
+
+        with patch.object(handler.model_router, "rules", rules):
+            handler.describe_images([{"type": "image_url", "image_url": {"url": "data:image/png;base64,AA"}}])
+
+        assert mock_openai.chat.completions.create.call_args.kwargs["model"] == "gpt-vision"
@@ -0,0 +1,86 @@
+"""Tests for handler.prepare_image — downscaling and re-encoding vision inputs."""
+
+import io
+from unittest.mock import patch
+
+import pytest
+
+import handler
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def make_image(size, mode="RGB", fmt="PNG"):
+    """Encode a photo-like (smooth noise) test image of the given size."""
+    picture = Image.effect_noise((64, 48), 64).resize(size).convert(mode)
+    buffer = io.BytesIO()
+    picture.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def image_size(data):
+    with Image.open(io.BytesIO(data)) as picture:
+        return picture.size
+
+
+class TestPrepareImage:
+    """Tests for handler.prepare_image."""
+
+    def test_large_photo_is_downscaled_to_model_limits(self):
+        data = make_image((4032, 3024), fmt="JPEG")
+
+        prepared, mimetype, detail = handler.prepare_image(data, "image/jpeg")
+
+        assert mimetype == "image/jpeg"
+        assert detail == "high"
+        width, height = image_size(prepared)
+        assert max(width, height) <= handler.IMAGE_MAX_SIDE
+        assert min(width, height) <= handler.IMAGE_MIN_SIDE
+        assert len(prepared) < len(data)
+
+    def test_png_screenshot_is_reencoded_as_jpeg(self):
+        data = make_image((1600, 1000))
+
+        prepared, mimetype, _ = handler.prepare_image(data, "image/png")
+
+        assert mimetype == "image/jpeg"
+        assert image_size(prepared) == (1229, 768)
+
+    def test_small_image_uses_low_detail(self):
+        data = make_image((300, 200))
+
+        _, _, detail = handler.prepare_image(data, "image/png")
+
+        assert detail == "low"
+
+    def test_alpha_is_kept_as_png(self):
+        data = make_image((1000, 1000), mode="RGBA")
+
+        prepared, mimetype, _ = handler.prepare_image(data, "image/png")
+
+        assert mimetype == "image/png"
+        assert image_size(prepared) == (768, 768)
+
+    def test_original_kept_when_reencoding_is_larger(self):
+        data = make_image((100, 100), fmt="JPEG")
+
+        with patch.object(handler, "IMAGE_QUALITY", 100):
+            prepared, mimetype, _ = handler.prepare_image(data, "image/jpeg")
+
+        assert prepared == data
+        assert mimetype == "image/jpeg"
+
+    def test_fixed_detail_setting_is_respected(self):
+        data = make_image((300, 200))
+
+        with patch.object(handler, "IMAGE_DETAIL", "high"):
+            _, _, detail = handler.prepare_image(data, "image/png")
+
+        assert detail == "high"
+
+    def test_undecodable_data_is_passed_through(self):
+        prepared, mimetype, detail = handler.prepare_image(b"not an image", "image/png")
+
+        assert prepared == b"not an image"
+        assert mimetype == "image/png"
+        assert detail == handler.IMAGE_DETAIL
@@ -0,0 +1,93 @@
+"""Tests for handler.reply_image — streamed decode and upload of generated images."""
+
+import base64
+import io
+from unittest.mock import MagicMock
+
+import pytest
+import responses
+
+import handler
+
+UPLOAD_URL = "https://files.slack.com/upload/v1/test"
+
+
+def make_image_response(b64_json=None, url=None, revised_prompt=None):
+    """Build a fake images.generate response."""
+    response = MagicMock()
+    response.data = [MagicMock()]
+    response.data[0].b64_json = b64_json
+    response.data[0].url = url
+    response.data[0].revised_prompt = revised_prompt
+    return response
+
+
+class TestSpoolBase64:
+    """Tests for handler.spool_base64 — chunked base64 decoding."""
+
+    def test_chunked_decode_matches_full_decode(self):
+        data = bytes(range(256)) * 100
+        file = io.BytesIO()
+
+        handler.spool_base64(base64.b64encode(data).decode("ascii"), file, chunk_size=1001)
+
+        assert file.getvalue() == data
+
+
+class TestReplyImage:
+    """Tests for handler.reply_image."""
+
+    @responses.activate
+    def test_b64_image_is_streamed_to_upload_url(self, mock_say, mock_app_client, mock_openai):
+        data = b"\x89PNG" + b"x" * 5000
+        mock_openai.images.generate.return_value = make_image_response(
+            b64_json=base64.b64encode(data).decode("ascii"), revised_prompt="revised"
+        )
+        responses.add(responses.POST, UPLOAD_URL, status=200)
+
+        result = handler.reply_image("prompt", mock_say, "C_CHAN", "thread-1", "ts-1")
+
+        assert result == "b64_image"
+        assert responses.calls[0].request.body == data
+        mock_app_client.files_getUploadURLExternal.assert_called_once_with(
+            filename=handler.IMAGE_MODEL + ".png", length=len(data)
+        )
+        mock_app_client.files_completeUploadExternal.assert_called_once_with(
+            files=[{"id": "F_TEST", "title": handler.IMAGE_MODEL + ".png"}],
+            channel_id="C_CHAN",
+            thread_ts="thread-1",
+        )
+        assert mock_app_client.chat_update.call_args.kwargs["text"] == "revised"
+
+    @responses.activate
+    def test_url_image_is_downloaded_to_disk_then_uploaded(self, mock_say, mock_app_client, mock_openai):
+        data = b"\xff\xd8" + b"y" * 3000
+        mock_openai.images.generate.return_value = make_image_response(
+            url="https://oaidalle.example.com/img.jpg?sig=1"
+        )
+        responses.add(responses.GET, "https://oaidalle.example.com/img.jpg", body=data, status=200)
+        responses.add(responses.POST, UPLOAD_URL, status=200)
+
+        result = handler.reply_image("prompt", mock_say, "C_CHAN", "thread-1", "ts-1")
+
+        assert result == "https://oaidalle.example.com/img.jpg?sig=1"
+        assert responses.calls[1].request.body == data
+        assert mock_app_client.files_getUploadURLExternal.call_args.kwargs["filename"].endswith(".jpg")
+
+    @responses.activate
+    def test_failed_upload_raises(self, mock_say, mock_app_client, mock_openai):
+        mock_openai.images.generate.return_value = make_image_response(
+            b64_json=base64.b64encode(b"img").decode("ascii")
+        )
+        responses.add(responses.POST, UPLOAD_URL, status=500)
+
+        with pytest.raises(ValueError):
+            handler.reply_image("prompt", mock_say, "C_CHAN", "thread-1", "ts-1")
+
+        mock_app_client.files_completeUploadExternal.assert_not_called()
+
+    def test_no_image_data_raises(self, mock_say, mock_app_client, mock_openai):
+        mock_openai.images.generate.return_value = make_image_response()
+
+        with pytest.raises(ValueError):
+            handler.reply_image("prompt", mock_say, "C_CHAN", "thread-1", "ts-1")
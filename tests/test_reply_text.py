@@ -0,0 +1,331 @@
+"""Tests for handler.FlushScheduler and handler.reply_text — streamed replies."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import handler
+from tests.conftest import FakeClock
+
+
+def make_stream(chunks, finish_reason=None):
+    """Build a fake OpenAI stream yielding the given text chunks."""
+    parts = []
+    for chunk in chunks:
+        part = MagicMock()
+        part.choices = [MagicMock()]
+        part.choices[0].delta.content = chunk
+        part.choices[0].finish_reason = None
+        parts.append(part)
+    if parts:
+        parts[-1].choices[0].finish_reason = finish_reason
+    return iter(parts)
+
+
+class TestFlushScheduler:
+    """Tests for handler.FlushScheduler — time and size based flushing."""
+
+    def test_nothing_pending_is_not_due(self):
+        scheduler = handler.FlushScheduler(interval=1.0, size=100, clock=FakeClock())
+
+        assert scheduler.due() is False
+
+    def test_first_text_is_due_immediately(self):
+        scheduler = handler.FlushScheduler(interval=1.0, size=100, clock=FakeClock())
+
+        scheduler.add("Hi")
+
+        assert scheduler.due() is True
+
+    def test_waits_for_interval_after_first_flush(self):
+        clock = FakeClock()
+        scheduler = handler.FlushScheduler(interval=1.0, size=100, clock=clock)
+        scheduler.add("Hi")
+        scheduler.flush(lambda: None)
+
+        scheduler.add("there")
+        clock.now = 0.5
+        assert scheduler.due() is False
+
+        clock.now = 1.0
+        assert scheduler.due() is True
+
+    def test_large_pending_text_flushes_early(self):
+        clock = FakeClock()
+        scheduler = handler.FlushScheduler(interval=1.0, size=10, clock=clock)
+        scheduler.add("Hi")
+        scheduler.flush(lambda: None)
+
+        scheduler.add("x" * 20)
+        clock.now = 0.5
+
+        assert scheduler.due() is True
+
+    def test_slow_round_trip_stretches_interval(self):
+        clock = FakeClock()
+        scheduler = handler.FlushScheduler(interval=1.0, size=100, clock=clock)
+        scheduler.add("Hi")
+
+        def slow_update():
+            clock.now += 2.0
+
+        scheduler.flush(slow_update)
+
+        assert scheduler.rtt == 2.0
+        scheduler.add("more")
+        clock.now += 3.0
+        assert scheduler.due() is False
+        clock.now += 1.0
+        assert scheduler.due() is True
+
+    def test_flush_counts_and_returns_result(self):
+        scheduler = handler.FlushScheduler(clock=FakeClock())
+        scheduler.add("abc")
+
+        result = scheduler.flush(lambda: "done")
+
+        assert result == "done"
+        assert scheduler.flushes == 1
+        assert scheduler.pending == 0
+
+
+class TestReplyText:
+    """Tests for handler.reply_text — streams OpenAI output into Slack."""
+
+    def test_final_flush_has_full_text_without_cursor(self, mock_say, mock_app_client, mock_openai):
+        mock_openai.chat.completions.create.return_value = make_stream(["Hello", " ", "world"])
+
+        result = handler.reply_text([], mock_say, "C_CHAN", "thread-1", "ts-1", "U_USER")
+
+        assert result == "Hello world"
+        last_call = mock_app_client.chat_update.call_args
+        assert last_call.kwargs["text"] == "Hello world"
+
+    def test_fast_stream_does_not_update_per_chunk(self, mock_say, mock_app_client, mock_openai):
+        mock_openai.chat.completions.create.return_value = make_stream(["a"] * 100)
+
+        handler.reply_text([], mock_say, "C_CHAN", "thread-1", "ts-1", "U_USER")
+
+        # One early flush for the first words, one final flush
+        assert mock_app_client.chat_update.call_count == 2
+
+    def test_empty_stream_still_flushes(self, mock_say, mock_app_client, mock_openai):
+        mock_openai.chat.completions.create.return_value = make_stream([])
+
+        result = handler.reply_text([], mock_say, "C_CHAN", "thread-1", "ts-1", "U_USER")
+
+        assert result == ""
+        mock_app_client.chat_update.assert_called_once()
+
+
+class TestStreamRenderer:
+    """Tests for handler.StreamRenderer — incremental message rendering."""
+
+    def test_short_text_is_one_message(self):
+        renderer = handler.StreamRenderer(limit=100)
+
+        renderer.feed("Hello ")
+        renderer.feed("**world**")
+
+        assert renderer.take() == ["Hello *world*"]
+
+    def test_cursor_is_appended_while_streaming(self):
+        renderer = handler.StreamRenderer(limit=100)
+        renderer.feed("Hi")
+
+        assert renderer.take(True) == ["Hi " + handler.BOT_CURSOR]
+
+    def test_full_message_continues_at_paragraph(self):
+        renderer = handler.StreamRenderer(limit=25)
+
+        renderer.feed("a" * 10 + "\n\n" + "b" * 10 + "\n\n" + "c" * 10)
+
+        assert renderer.take() == ["a" * 10 + "\n\n" + "b" * 10 + "\n\n", "c" * 10]
+
+    def test_pages_are_taken_once(self):
+        renderer = handler.StreamRenderer(limit=25)
+        renderer.feed("a" * 10 + "\n\n" + "b" * 10 + "\n\n" + "c" * 10)
+        renderer.take()
+
+        renderer.feed("d")
+
+        assert renderer.take() == ["c" * 10 + "d"]
+
+    def test_marker_split_across_chunks(self):
+        renderer = handler.StreamRenderer(limit=25)
+
+        for chunk in ["a" * 15, "\n", "\n", "b" * 15]:
+            renderer.feed(chunk)
+
+        assert renderer.take() == ["a" * 15 + "\n\n", "b" * 15]
+
+    def test_paragraphs_inside_code_are_kept_together(self):
+        renderer = handler.StreamRenderer(limit=40)
+
+        renderer.feed("intro\n\n```\nx = 1\n\ny = 2\n```\n\nend")
+
+        assert renderer.take() == ["intro\n\n```\nx = 1\n\ny = 2\n```\n\nend"]
+
+    def test_long_code_block_is_refenced(self):
+        renderer = handler.StreamRenderer(limit=30)
+        code = "".join("line{}\n".format(i) for i in range(10))
+
+        for char in "```\n" + code + "```":
+            renderer.feed(char)
+        texts = renderer.take()
+
+        assert len(texts) > 1
+        for text in texts:
+            # The closing fence may finish a block just past the limit
+            assert len(text) <= 30 + len("```")
+            assert text.count("```") == 2
+        lines = [line for text in texts for line in text.splitlines() if line != "```"]
+        assert lines == code.splitlines()
+
+    def test_long_line_without_breaks_is_cut(self):
+        renderer = handler.StreamRenderer(limit=10)
+
+        renderer.feed("x" * 25)
+
+        assert renderer.take() == ["x" * 10, "x" * 10, "x" * 5]
+
+    def test_chunking_does_not_change_output(self):
+        text = ("para **{}**\n\n```\ncode {}\n```\n\n".format("w" * 30, "c" * 50)) * 20
+
+        whole = handler.StreamRenderer(limit=120)
+        whole.feed(text)
+        chunked = handler.StreamRenderer(limit=120)
+        for start in range(0, len(text), 3):
+            chunked.feed(text[start:start + 3])
+
+        assert whole.take() == chunked.take()
+        assert chunked.text() == text
+
+    def test_empty_message_after_full_one_is_not_posted(self):
+        renderer = handler.StreamRenderer(limit=10)
+
+        renderer.feed("x" * 8 + "\n\n\n\n")
+
+        assert renderer.take() == ["x" * 8 + "\n\n"]
+
+    def test_finished_block_over_the_limit_is_cut(self):
+        renderer = handler.StreamRenderer(limit=20)
+
+        renderer.feed("a" * 18)
+        renderer.feed("aaa\n\nb")
+
+        assert renderer.take() == ["a" * 20, "a\n\nb"]
+
+    def test_finished_code_block_over_the_limit_is_cut(self):
+        renderer = handler.StreamRenderer(limit=20)
+
+        renderer.feed("```\n" + "c" * 10 + "\n")
+        renderer.feed("c" * 4 + "\n```")
+
+        assert renderer.take() == ["```\n" + "c" * 10 + "\n```", "```\n" + "c" * 4 + "\n```"]
+
+
+class TestReplyTextLongAnswer:
+    """reply_text continues long answers in new thread messages."""
+
+    def test_long_answer_continues_in_new_message(self, mock_say, mock_app_client, mock_openai):
+        paragraph = "p" * 1000 + "\n\n"
+        mock_openai.chat.completions.create.return_value = make_stream([paragraph] * 5)
+
+        result = handler.reply_text([], mock_say, "C_CHAN", "thread-1", "ts-1", "U_USER")
+
+        assert result == paragraph * 5
+        posted = [c.kwargs["text"] for c in mock_app_client.chat_postMessage.call_args_list]
+        updated = [c.kwargs["text"] for c in mock_app_client.chat_update.call_args_list]
+        assert all(len(text) <= handler.MAX_LEN_SLACK for text in posted + updated)
+        assert len(posted) >= 1
+        mock_say.assert_not_called()
+
+
+def standalone(text="What is the VPN address?"):
+    return [
+        {"role": "system", "content": "You are a test bot."},
+        {"role": "user", "content": [{"type": "text", "text": text}]},
+    ]
+
+
+@pytest.fixture
+def response_cache():
+    with patch.object(handler, "RESPONSE_CACHE", True):
+        yield handler.responses_cache
+
+
+class TestResponseCache:
+    """Exact-match cache of replies to standalone prompts."""
+
+    def test_key_ignores_whitespace_differences(self):
+        assert handler.response_cache_key(standalone("What is  the VPN\naddress? ")) == handler.response_cache_key(standalone())
+
+    def test_key_depends_on_system_message_and_model(self):
+        other = standalone()
+        other[0]["content"] = "Another system message"
+
+        key = handler.response_cache_key(standalone())
+
+        assert handler.response_cache_key(other) != key
+        with patch.object(handler, "OPENAI_MODEL", "other-model"):
+            assert handler.response_cache_key(standalone()) != key
+
+    def test_system_message_is_optional(self):
+        without_system = standalone()[1:]
+
+        assert handler.response_cache_key(without_system) is not None
+        assert handler.response_cache_key(without_system) != handler.response_cache_key(standalone())
+
+    def test_threads_and_images_are_not_cached(self):
+        thread = standalone()[:1] + [
+            {"role": "user", "content": "earlier"},
+            {"role": "assistant", "content": "answer"},
+        ] + standalone()[1:]
+        image = standalone()
+        image[1]["content"].append({"type": "image_url", "image_url": {"url": "data:x"}})
+
+        assert handler.response_cache_key(thread) is None
+        assert handler.response_cache_key(image) is None
+
+    def test_hit_is_replayed_without_openai(self, response_cache, mock_say, mock_app_client, mock_openai):
+        mock_openai.chat.completions.create.return_value = make_stream(["The address", " is vpn.example"], "stop")
+
+        first = handler.reply_text(standalone(), mock_say, "C_CHAN", "thread-1", "ts-1", "U_USER")
+        second = handler.reply_text(standalone(), mock_say, "C_CHAN", "thread-2", "ts-2", "U_USER")
+
+        assert first == second == "The address is vpn.example"
+        mock_openai.chat.completions.create.assert_called_once()
+        last_call = mock_app_client.chat_update.call_args
+        assert last_call.kwargs == {"channel": "C_CHAN", "ts": "ts-2", "text": "The address is vpn.example"}
+
+    def test_incomplete_answer_is_not_cached(self, response_cache, mock_say, mock_app_client, mock_openai):
+        mock_openai.chat.completions.create.return_value = make_stream(["cut"], "length")
+
+        handler.reply_text(standalone(), mock_say, "C_CHAN", "thread-1", "ts-1", "U_USER")
+
+        assert response_cache.stats()["size"] == 0
+
+    def test_shared_tier_is_compressed(self, response_cache, mock_dynamo_table):
+        text = "반복되는 답변 " * 200
+
+        with patch.object(handler, "RESPONSE_CACHE_DYNAMODB", True):
+            handler.set_cached_response("k", text)
+            item = mock_dynamo_table.put_item.call_args.kwargs["Item"]
+            assert item["id"] == "response#k"
+            assert len(item["reply"]) < len(text)
+
+            response_cache.clear()
+            mock_dynamo_table.get_item.return_value = {"Item": item}
+            assert handler.get_cached_response("k") == text
+
+    def test_disabled_by_default(self, mock_say, mock_app_client, mock_openai):
+        mock_openai.chat.completions.create.side_effect = [
+            make_stream(["a"], "stop"),
+            make_stream(["b"], "stop"),
+        ]
+
+        handler.reply_text(standalone(), mock_say, "C_CHAN", "thread-1", "ts-1", "U_USER")
+        result = handler.reply_text(standalone(), mock_say, "C_CHAN", "thread-1", "ts-1", "U_USER")
+
+        assert result == "b"
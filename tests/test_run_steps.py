@@ -0,0 +1,56 @@
+"""Tests for handler.run_steps — concurrent per-event steps with dependencies."""
+
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+
+import handler
+
+
+class TestRunSteps:
+    """Tests for handler.run_steps."""
+
+    def test_returns_results_by_name(self):
+        results = handler.run_steps("test", {
+            "a": (lambda: 1, []),
+            "b": (lambda: 2, []),
+        })
+
+        assert results == {"a": 1, "b": 2}
+
+    def test_dependent_step_receives_results(self):
+        results = handler.run_steps("test", {
+            "cursor": (lambda: {"ts": "1.0"}, []),
+            "update": (lambda cursor: cursor["ts"] + "!", ["cursor"]),
+        })
+
+        assert results["update"] == "1.0!"
+
+    def test_independent_steps_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        # Each step waits for the other; this only finishes if both run at once
+        results = handler.run_steps("test", {
+            "a": (lambda: barrier.wait() is not None, []),
+            "b": (lambda: barrier.wait() is not None, []),
+        })
+
+        assert results == {"a": True, "b": True}
+
+    def test_step_error_is_raised(self):
+        def boom():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            handler.run_steps("test", {"a": (boom, [])})
+
+    def test_logs_per_step_timings(self):
+        with patch("builtins.print") as mock_print:
+            handler.run_steps("test", {"a": (lambda: 1, [])})
+
+        record = json.loads(mock_print.call_args[0][0])
+        assert record["event"] == "test"
+        assert set(record["steps"]) == {"a"}
+        assert "total" in record
@@ -0,0 +1,166 @@
+"""Tests for handler.TokenBucket and handler.SlackRateLimiter — Slack Web API pacing."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from slack_sdk.errors import SlackApiError
+
+import handler
+from tests.conftest import FakeClock
+
+
+def rate_limited(retry_after="2"):
+    """Build a SlackApiError for an HTTP 429 response."""
+    response = MagicMock()
+    response.status_code = 429
+    response.headers = {"Retry-After": retry_after}
+    return SlackApiError("ratelimited", response)
+
+
+def make_limiter(clock, enabled=True):
+    return handler.SlackRateLimiter(enabled, max_retries=2, clock=clock, sleep=clock.sleep)
+
+
+class TestTokenBucket:
+    """Tests for handler.TokenBucket."""
+
+    def test_burst_is_free_then_waits(self):
+        clock = FakeClock()
+        bucket = handler.TokenBucket(rate=1.0, capacity=2, clock=clock)
+
+        assert bucket.reserve() == 0.0
+        assert bucket.reserve() == 0.0
+        assert bucket.reserve() == 1.0
+        assert bucket.reserve() == 2.0
+
+    def test_refills_over_time(self):
+        clock = FakeClock()
+        bucket = handler.TokenBucket(rate=1.0, capacity=1, clock=clock)
+        bucket.reserve()
+
+        clock.now = 1.0
+
+        assert bucket.reserve() == 0.0
+
+    def test_pause_holds_back_next_caller(self):
+        clock = FakeClock()
+        bucket = handler.TokenBucket(rate=1.0, capacity=5, clock=clock)
+
+        bucket.pause(3.0)
+
+        assert bucket.reserve() == 4.0
+
+
+class TestSlackRateLimiter:
+    """Tests for handler.SlackRateLimiter."""
+
+    def test_waits_when_channel_bucket_is_empty(self):
+        clock = FakeClock()
+        limiter = make_limiter(clock)
+        client = MagicMock()
+
+        for _ in range(handler.SLACK_CHANNEL_BURST + 1):
+            limiter.call(client, "chat_update", channel="C1", ts="1.0", text="x")
+
+        assert len(clock.slept) == 1
+        assert limiter.stats()["chat_update"]["waits"] == 1
+
+    def test_channels_are_paced_independently(self):
+        clock = FakeClock()
+        limiter = make_limiter(clock)
+        client = MagicMock()
+
+        for channel in ["C1", "C2"]:
+            for _ in range(handler.SLACK_CHANNEL_BURST):
+                limiter.call(client, "chat_postMessage", channel=channel, text="x")
+
+        assert clock.slept == []
+
+    def test_disabled_limiter_never_waits(self):
+        clock = FakeClock()
+        limiter = make_limiter(clock, enabled=False)
+        client = MagicMock()
+
+        for _ in range(100):
+            limiter.call(client, "chat_update", channel="C1", ts="1.0", text="x")
+
+        assert clock.slept == []
+        assert limiter.stats()["chat_update"]["calls"] == 100
+
+    def test_retries_after_429(self):
+        clock = FakeClock()
+        limiter = make_limiter(clock)
+        client = MagicMock()
+        client.chat_update.side_effect = [rate_limited("2"), {"ok": True}]
+
+        result = limiter.call(client, "chat_update", channel="C1", ts="1.0", text="x")
+
+        assert result == {"ok": True}
+        assert clock.slept == [2.0]
+        assert limiter.stats()["chat_update"]["retries"] == 1
+
+    def test_gives_up_after_max_retries(self):
+        clock = FakeClock()
+        limiter = make_limiter(clock)
+        client = MagicMock()
+        client.chat_update.side_effect = rate_limited("1")
+
+        with pytest.raises(SlackApiError):
+            limiter.call(client, "chat_update", channel="C1", ts="1.0", text="x")
+
+        assert client.chat_update.call_count == 3
+
+    def test_other_errors_are_not_retried(self):
+        clock = FakeClock()
+        limiter = make_limiter(clock)
+        client = MagicMock()
+        client.users_info.side_effect = SlackApiError("nope", {"error": "user_not_found"})
+
+        with pytest.raises(SlackApiError):
+            limiter.call(client, "users_info", user="U1")
+
+        assert client.users_info.call_count == 1
+
+    def test_queued_update_is_superseded_by_newer_one(self):
+        clock = FakeClock()
+        limiter = make_limiter(clock)
+        client = MagicMock()
+
+        # Drain the channel bucket so the next update has to wait
+        for _ in range(handler.SLACK_CHANNEL_BURST):
+            limiter.call(client, "chat_update", channel="C1", ts="1.0", text="x")
+        client.reset_mock()
+
+        # While the first update waits, a newer one for the same message arrives
+        def sleep(seconds):
+            limiter.sleep = clock.sleep
+            limiter.call(client, "chat_update", channel="C1", ts="1.0", text="newer")
+            clock.sleep(seconds)
+
+        limiter.sleep = sleep
+        result = limiter.call(client, "chat_update", channel="C1", ts="1.0", text="older")
+
+        assert result["superseded"] is True
+        client.chat_update.assert_called_once_with(channel="C1", ts="1.0", text="newer")
+        assert limiter.stats()["chat_update"]["superseded"] == 1
+
+    def test_async_call_retries_after_429(self):
+        limiter = handler.SlackRateLimiter(True, max_retries=2)
+        client = MagicMock()
+        client.chat_update = AsyncMock(side_effect=[rate_limited("0"), {"ok": True}])
+
+        result = handler.run_async(
+            limiter.call_async(client, "chat_update", channel="C1", ts="1.0", text="x")
+        )
+
+        assert result == {"ok": True}
+        assert client.chat_update.await_count == 2
+
+
+class TestRateLimitedClient:
+    """handler.slack_api forwards calls to app.client."""
+
+    def test_forwards_to_app_client(self, mock_app_client):
+        handler.slack_api.chat_update(channel="C1", ts="1.0", text="x")
+
+        mock_app_client.chat_update.assert_called_once_with(channel="C1", ts="1.0", text="x")
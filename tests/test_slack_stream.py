@@ -0,0 +1,253 @@
+"""Tests for handler.SlackStream — replies sent with Slack's native message streaming."""
+
+import urllib.error
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from slack_sdk.errors import SlackApiError
+
+import handler
+from tests.conftest import make_slack_event
+from tests.test_async_engine import _real_handle_mention, make_stream as make_async_stream
+from tests.test_reply_text import make_stream
+
+
+def slack_error(error="unknown_method"):
+    return SlackApiError(error, {"ok": False, "error": error})
+
+
+def calls(client, method):
+    return [c.kwargs for c in getattr(client, method).call_args_list]
+
+
+@pytest.fixture
+def native(mock_app_client, mock_openai):
+    """Stream natively, flushing as often as possible."""
+    mock_app_client.chat_startStream.return_value = {"ok": True, "ts": "stream-1"}
+    mock_openai.chat.completions.create.side_effect = None
+    with (
+        patch.object(handler, "STREAM_RENDERER", "native"),
+        patch.object(handler, "STREAM_FLUSH_INTERVAL", 0),
+    ):
+        yield mock_app_client
+
+
+class TestSlackStreamCalls:
+    """Tests for handler.SlackStream.calls — what each flush sends."""
+
+    def test_first_flush_starts_the_stream(self):
+        stream = handler.SlackStream("C_CHAN", "1.0", "1.1", "U_USER", "T_USER")
+
+        assert stream.calls("Hello", False) == [
+            ("chat_startStream", {
+                "channel": "C_CHAN",
+                "thread_ts": "1.0",
+                "recipient_user_id": "U_USER",
+                "recipient_team_id": "T_USER",
+                "markdown_text": "Hello",
+            }),
+        ]
+
+    def test_only_new_text_is_appended(self):
+        stream = handler.SlackStream("C_CHAN", "1.0", "1.1")
+        stream.ts = "stream-1"
+        stream.sent = 5
+
+        assert stream.calls("Hello world", False) == [
+            ("chat_appendStream", {"channel": "C_CHAN", "markdown_text": " world"}),
+        ]
+
+    def test_final_flush_stops_with_the_rest(self):
+        stream = handler.SlackStream("C_CHAN", "1.0", "1.1")
+        stream.ts = "stream-1"
+        stream.sent = 5
+
+        assert stream.calls("Hello", True) == [("chat_stopStream", {"channel": "C_CHAN"})]
+        assert stream.calls("Hello!", True) == [("chat_stopStream", {"channel": "C_CHAN", "markdown_text": "!"})]
+
+    def test_long_text_is_split(self):
+        stream = handler.SlackStream("C_CHAN", "1.0", "1.1")
+        stream.ts = "stream-1"
+
+        with patch.object(handler, "SLACK_STREAM_MAX_CHARS", 4):
+            result = stream.calls("abcdefghij", True)
+
+        assert result == [
+            ("chat_appendStream", {"channel": "C_CHAN", "markdown_text": "abcd"}),
+            ("chat_appendStream", {"channel": "C_CHAN", "markdown_text": "efgh"}),
+            ("chat_stopStream", {"channel": "C_CHAN", "markdown_text": "ij"}),
+        ]
+
+
+class TestReplyTextNative:
+    """Tests for handler.reply_text with STREAM_RENDERER="native"."""
+
+    def test_streams_deltas_and_removes_placeholder(self, native, mock_say, mock_openai):
+        mock_openai.chat.completions.create.return_value = make_stream(["Hello", " ", "world"])
+
+        result = handler.reply_text([], mock_say, "C_CHAN", "1.0", "1.1", "U_USER")
+
+        assert result == "Hello world"
+        assert calls(native, "chat_startStream")[0]["markdown_text"] == "Hello"
+        rest = calls(native, "chat_appendStream") + calls(native, "chat_stopStream")
+        assert "".join(c.get("markdown_text", "") for c in rest) == " world"
+        assert all(c["ts"] == "stream-1" for c in rest)
+        native.chat_stopStream.assert_called_once()
+        assert calls(native, "chat_delete") == [{"channel": "C_CHAN", "ts": "1.1"}]
+        native.chat_update.assert_not_called()
+
+    def test_mention_streams_to_the_sender_team(self, native, mock_say, mock_openai):
+        mock_openai.chat.completions.create.return_value = make_stream(["Hello"])
+        body = make_slack_event(text="<@U_TEST_BOT> hi", thread_ts="1.0", team="T_OTHER")
+        body["event"]["user_team"] = "T_SHARED"
+
+        with (
+            patch.object(handler, "content_from_message", return_value=([{"type": "text", "text": "hi"}], None)),
+            patch.object(handler, "conversations_replies", return_value=[]),
+        ):
+            _real_handle_mention(body, mock_say)
+
+        kwargs = native.chat_startStream.call_args.kwargs
+        assert (kwargs["recipient_user_id"], kwargs["recipient_team_id"]) == ("U_USER", "T_SHARED")
+
+    def test_top_level_dm_uses_chat_update(self, native, mock_say, mock_openai):
+        mock_openai.chat.completions.create.return_value = make_stream(["Hello"])
+
+        handler.reply_text([], mock_say, "D_CHAN", None, "1.1", "U_USER")
+
+        native.chat_startStream.assert_not_called()
+        assert native.chat_update.call_args.kwargs["text"] == "Hello"
+
+    def test_start_failure_falls_back_to_chat_update(self, native, mock_say, mock_openai):
+        native.chat_startStream.side_effect = slack_error()
+        mock_openai.chat.completions.create.return_value = make_stream(["Hello", " world"])
+
+        result = handler.reply_text([], mock_say, "C_CHAN", "1.0", "1.1", "U_USER")
+
+        assert result == "Hello world"
+        native.chat_startStream.assert_called_once()
+        assert native.chat_update.call_args.kwargs == {"channel": "C_CHAN", "ts": "1.1", "text": "Hello world"}
+        native.chat_delete.assert_not_called()
+
+    def test_failure_after_start_moves_reply_to_placeholder(self, native, mock_say, mock_openai):
+        native.chat_appendStream.side_effect = slack_error("message_not_in_streaming_state")
+        native.chat_stopStream.side_effect = slack_error("message_not_in_streaming_state")
+        mock_openai.chat.completions.create.return_value = make_stream(["Hello", " ", "world"])
+
+        handler.reply_text([], mock_say, "C_CHAN", "1.0", "1.1", "U_USER")
+
+        assert calls(native, "chat_delete") == [{"channel": "C_CHAN", "ts": "stream-1"}]
+        assert native.chat_update.call_args.kwargs == {"channel": "C_CHAN", "ts": "1.1", "text": "Hello world"}
+
+    def test_transport_error_moves_reply_to_placeholder(self, native, mock_say, mock_openai):
+        native.chat_appendStream.side_effect = urllib.error.URLError("timed out")
+        native.chat_stopStream.side_effect = urllib.error.URLError("timed out")
+        mock_openai.chat.completions.create.return_value = make_stream(["Hello", " ", "world"])
+
+        result = handler.reply_text([], mock_say, "C_CHAN", "1.0", "1.1", "U_USER")
+
+        assert result == "Hello world"
+        assert calls(native, "chat_delete") == [{"channel": "C_CHAN", "ts": "stream-1"}]
+        assert native.chat_update.call_args.kwargs == {"channel": "C_CHAN", "ts": "1.1", "text": "Hello world"}
+
+    def test_client_without_streaming_methods_falls_back(self, native, mock_say, mock_openai):
+        native.chat_startStream.side_effect = AttributeError("chat_startStream")
+        mock_openai.chat.completions.create.return_value = make_stream(["Hello"])
+
+        handler.reply_text([], mock_say, "C_CHAN", "1.0", "1.1", "U_USER")
+
+        assert native.chat_update.call_args.kwargs["text"] == "Hello"
+        native.chat_delete.assert_not_called()
+
+    def test_empty_reply_stays_on_placeholder(self, native, mock_say, mock_openai):
+        mock_openai.chat.completions.create.return_value = make_stream([])
+
+        handler.reply_text([], mock_say, "C_CHAN", "1.0", "1.1", "U_USER")
+
+        native.chat_startStream.assert_not_called()
+        native.chat_update.assert_called_once()
+
+    def test_broken_openai_stream_drops_partial_message(self, native, mock_say, mock_openai):
+        def broken():
+            yield from make_stream(["Hello"])
+            raise RuntimeError("connection reset")
+
+        mock_openai.chat.completions.create.return_value = broken()
+
+        with pytest.raises(RuntimeError):
+            handler.reply_text([], mock_say, "C_CHAN", "1.0", "1.1", "U_USER")
+
+        assert calls(native, "chat_delete") == [{"channel": "C_CHAN", "ts": "stream-1"}]
+
+
+class TestReplyTextNativeAsync:
+    """Tests for handler.reply_text_async with STREAM_RENDERER="native"."""
+
+    @pytest.fixture
+    def async_slack(self):
+        client = MagicMock()
+        client.chat_update = AsyncMock(return_value={"ok": True})
+        client.chat_startStream = AsyncMock(return_value={"ok": True, "ts": "stream-1"})
+        client.chat_appendStream = AsyncMock(return_value={"ok": True})
+        client.chat_stopStream = AsyncMock(return_value={"ok": True})
+        client.chat_delete = AsyncMock(return_value={"ok": True})
+        with (
+            patch.object(handler, "async_slack_client", client),
+            patch.object(handler, "STREAM_RENDERER", "native"),
+        ):
+            yield client
+
+    @pytest.fixture
+    def async_openai(self):
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock()
+        with patch.object(handler, "async_openai_client", client):
+            yield client
+
+    def test_streams_whole_reply(self, async_slack, async_openai):
+        async_openai.chat.completions.create.return_value = make_async_stream(["a"] * 50)
+        say = handler.async_say("C_CHAN")
+
+        result = handler.run_async(handler.reply_text_async([], say, "C_CHAN", "1.0", "1.1", "U_USER"))
+
+        sent = [async_slack.chat_startStream.await_args.kwargs["markdown_text"]]
+        sent += [c.kwargs.get("markdown_text", "") for c in async_slack.chat_appendStream.await_args_list]
+        sent += [c.kwargs.get("markdown_text", "") for c in async_slack.chat_stopStream.await_args_list]
+        assert result == "".join(sent) == "a" * 50
+        async_slack.chat_delete.assert_awaited_once_with(channel="C_CHAN", ts="1.1")
+        async_slack.chat_update.assert_not_awaited()
+
+    def test_start_failure_falls_back_to_chat_update(self, async_slack, async_openai):
+        async_slack.chat_startStream.side_effect = slack_error()
+        async_openai.chat.completions.create.return_value = make_async_stream(["Hello", " world"])
+        say = handler.async_say("C_CHAN")
+
+        handler.run_async(handler.reply_text_async([], say, "C_CHAN", "1.0", "1.1", "U_USER"))
+
+        assert async_slack.chat_update.await_args.kwargs["text"] == "Hello world"
+        async_slack.chat_delete.assert_not_awaited()
+
+    def test_transport_error_falls_back_to_chat_update(self, async_slack, async_openai):
+        async_slack.chat_appendStream.side_effect = urllib.error.URLError("timed out")
+        async_slack.chat_stopStream.side_effect = urllib.error.URLError("timed out")
+        async_openai.chat.completions.create.return_value = make_async_stream(["Hello", " world"])
+        say = handler.async_say("C_CHAN")
+
+        handler.run_async(handler.reply_text_async([], say, "C_CHAN", "1.0", "1.1", "U_USER"))
+
+        async_slack.chat_delete.assert_awaited_once_with(channel="C_CHAN", ts="stream-1")
+        assert async_slack.chat_update.await_args.kwargs["text"] == "Hello world"
+
+    def test_broken_openai_stream_drops_partial_message(self, async_slack, async_openai):
+        async def broken():
+            async for part in make_async_stream(["Hello"] * 20):
+                yield part
+            raise RuntimeError("connection reset")
+
+        async_openai.chat.completions.create.return_value = broken()
+        say = handler.async_say("C_CHAN")
+
+        with pytest.raises(RuntimeError):
+            handler.run_async(handler.reply_text_async([], say, "C_CHAN", "1.0", "1.1", "U_USER"))
+
+        async_slack.chat_delete.assert_awaited_once_with(channel="C_CHAN", ts="stream-1")
@@ -0,0 +1,152 @@
+"""Tests for the state stores behind dedupe and the DynamoDB cache tiers."""
+
+from unittest.mock import patch
+
+import pytest
+from botocore.exceptions import ClientError
+
+import handler
+from tests.conftest import FakeClock, make_lambda_event
+
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "PutItem")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def local_store(request, tmp_path):
+    if request.param == "memory":
+        return handler.MemoryStateStore(clock=FakeClock(1000.0))
+    return handler.SQLiteStateStore(str(tmp_path / "state.db"), clock=FakeClock(1000.0))
+
+
+class TestLocalStateStores:
+    """Shared behaviour of the memory and SQLite stores."""
+
+    def test_claim_once(self, local_store):
+        assert local_store.claim("msg-1", 60) is True
+        assert local_store.claim("msg-1", 60) is False
+
+    def test_claim_after_expiry(self, local_store):
+        local_store.claim("msg-1", 60)
+
+        local_store.clock.now += 61
+
+        assert local_store.claim("msg-1", 60) is True
+
+    def test_put_and_get(self, local_store):
+        local_store.put("user#U1", {"name": "이름"}, 60)
+
+        assert local_store.get("user#U1") == {"name": "이름"}
+        assert local_store.get("user#U2") is None
+
+    def test_expired_fields_are_not_returned(self, local_store):
+        local_store.put("user#U1", {"name": "A"}, 60)
+
+        local_store.clock.now += 61
+
+        assert local_store.get("user#U1") is None
+
+    def test_put_without_ttl_does_not_expire(self, local_store):
+        local_store.put("bot#x", {"identity": "{}"})
+
+        local_store.clock.now += 10 ** 9
+
+        assert local_store.get("bot#x") == {"identity": "{}"}
+
+    def test_delete(self, local_store):
+        local_store.put("k", {"a": 1})
+        local_store.delete("k")
+
+        assert local_store.get("k") is None
+
+
+class TestDynamoDBStateStore:
+    """Compact records and throttle handling of handler.DynamoDBStateStore."""
+
+    def test_claim_writes_key_only_record(self, mock_dynamo_table):
+        store = handler.DynamoDBStateStore()
+
+        assert store.claim("msg-1", 60) is True
+
+        item = mock_dynamo_table.put_item.call_args.kwargs["Item"]
+        assert set(item) == {"id", "expire_at"}
+
+    def test_claim_of_existing_record_fails(self, mock_dynamo_table):
+        mock_dynamo_table.put_item.side_effect = client_error("ConditionalCheckFailedException")
+
+        assert handler.DynamoDBStateStore().claim("msg-1", 60) is False
+
+    def test_throttled_write_is_retried_with_backoff(self, mock_dynamo_table):
+        sleeps = []
+        mock_dynamo_table.put_item.side_effect = [
+            client_error("ProvisionedThroughputExceededException"),
+            client_error("ThrottlingException"),
+            {},
+        ]
+
+        store = handler.DynamoDBStateStore(max_retries=4, backoff=0.1, sleep=sleeps.append)
+
+        assert store.claim("msg-1", 60) is True
+        assert len(sleeps) == 2
+        assert 0.05 <= sleeps[0] <= 0.1
+        assert 0.1 <= sleeps[1] <= 0.2
+
+    def test_claim_lets_event_through_when_throttling_persists(self, mock_dynamo_table):
+        mock_dynamo_table.put_item.side_effect = client_error("ProvisionedThroughputExceededException")
+
+        store = handler.DynamoDBStateStore(max_retries=2, sleep=lambda _: None)
+
+        assert store.claim("msg-1", 60) is True
+        assert mock_dynamo_table.put_item.call_count == 3
+
+    def test_other_errors_are_raised(self, mock_dynamo_table):
+        mock_dynamo_table.put_item.side_effect = client_error("ValidationException")
+
+        with pytest.raises(ClientError):
+            handler.DynamoDBStateStore(sleep=lambda _: None).claim("msg-1", 60)
+
+        assert mock_dynamo_table.put_item.call_count == 1
+
+    def test_get_strips_key_and_checks_expiry(self, mock_dynamo_table):
+        store = handler.DynamoDBStateStore()
+
+        mock_dynamo_table.get_item.return_value = {"Item": {"id": "k", "name": "A", "expire_at": 9999999999}}
+        assert store.get("k") == {"name": "A"}
+
+        mock_dynamo_table.get_item.return_value = {"Item": {"id": "k", "name": "A", "expire_at": 1}}
+        assert store.get("k") is None
+
+
+class TestGetStateStore:
+    """Backend selection by STATE_BACKEND."""
+
+    def test_memory_backend(self):
+        with (
+            patch.object(handler, "STATE_BACKEND", "memory"),
+            patch.object(handler, "state_store", None),
+        ):
+            assert isinstance(handler.get_state_store(), handler.MemoryStateStore)
+
+    def test_unknown_backend_raises(self):
+        with (
+            patch.object(handler, "STATE_BACKEND", "bogus"),
+            patch.object(handler, "state_store", None),
+        ):
+            with pytest.raises(ValueError):
+                handler.get_state_store()
+
+    def test_dedupe_runs_without_aws(self, mock_dynamo_table):
+        event = make_lambda_event({"event": {"text": "hi", "client_msg_id": "msg-mem"}})
+
+        with (
+            patch.object(handler, "STATE_BACKEND", "memory"),
+            patch.object(handler, "state_store", None),
+            patch.object(handler.handler, "handle", return_value={"statusCode": 200}) as mock_handle,
+        ):
+            handler.lambda_handler(event, {})
+            handler.seen_events.clear()
+            handler.lambda_handler(event, {})
+
+        mock_handle.assert_called_once()
+        mock_dynamo_table.put_item.assert_not_called()
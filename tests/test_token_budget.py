@@ -0,0 +1,108 @@
+"""Tests for the token-aware context budget: count_*_tokens, context_budget and fit_messages."""
+
+from unittest.mock import patch
+
+import handler
+
+
+class TestCountTokens:
+    """Tests for handler.count_text_tokens and handler.count_message_tokens."""
+
+    def test_ascii_is_about_four_chars_per_token(self):
+        assert handler.count_text_tokens("a" * 400) == 100
+
+    def test_hangul_is_about_one_token_per_char(self):
+        assert handler.count_text_tokens("안녕하세요") == 5
+
+    def test_empty_text_has_no_tokens(self):
+        assert handler.count_text_tokens("") == 0
+
+    def test_message_adds_overhead(self):
+        assert handler.count_message_tokens({"role": "user", "content": "a" * 40}) == 14
+
+    def test_image_parts_use_detail_cost(self):
+        message = {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "a" * 40},
+                {"type": "image_url", "image_url": {"url": "data:", "detail": "low"}},
+            ],
+        }
+
+        assert handler.count_message_tokens(message) == 4 + 10 + 85
+
+
+class TestContextBudget:
+    """Tests for handler.context_budget — per-model prompt budget."""
+
+    def test_capped_by_max_tokens_openai(self):
+        with patch.object(handler, "MAX_TOKENS_OPENAI", 16000):
+            assert handler.context_budget("gpt-5.4") == 16000
+
+    def test_small_window_leaves_room_for_reply(self):
+        with (
+            patch.object(handler, "MAX_TOKENS_OPENAI", 16000),
+            patch.object(handler, "MAX_TOKENS_REPLY", 4096),
+        ):
+            assert handler.context_budget("gpt-4-0613") == 8192 - 4096
+
+    def test_longest_prefix_wins(self):
+        with patch.object(handler, "MAX_TOKENS_OPENAI", 0):
+            assert handler.context_budget("gpt-4.1-mini") == 1047576 - handler.MAX_TOKENS_REPLY
+            assert handler.context_budget("gpt-4o") == 128000 - handler.MAX_TOKENS_REPLY
+
+
+class TestTrimHistory:
+    """Tests for handler.trim_history — drops the oldest messages in fixed steps."""
+
+    def test_everything_fits(self):
+        messages = [{"role": "user", "content": "hi"}]
+
+        assert handler.trim_history(messages, 100) == messages
+
+    def test_cut_is_aligned_to_step(self):
+        messages = [{"role": "user", "content": str(i) + "a" * 40} for i in range(10)]
+        one = handler.count_message_tokens(messages[0])
+
+        result = handler.trim_history(messages, one * 8, step=4)
+
+        # Two messages must go; the cut rounds up to the step
+        assert result == messages[4:]
+
+    def test_prefix_is_stable_while_thread_grows(self):
+        messages = [{"role": "user", "content": str(i) + "a" * 40} for i in range(30)]
+        one = handler.count_message_tokens(messages[0])
+
+        firsts = [
+            handler.trim_history(messages[:n], one * 10, step=8)[0]["content"]
+            for n in range(11, 19)
+        ]
+
+        assert len(set(firsts)) == 1
+
+    def test_oldest_first_order_is_kept(self):
+        messages = [{"role": "user", "content": "a" * 40} for _ in range(5)]
+        messages[-1] = {"role": "user", "content": "newest" + "a" * 34}
+
+        result = handler.trim_history(messages, 30, step=1)
+
+        assert result[-1] is messages[-1]
+        assert handler.count_message_tokens(result[0]) * len(result) <= 30
+
+
+class TestConversationBudget:
+    """conversation reserves the system message and prompt before thread history."""
+
+    def test_history_trimmed_to_remaining_budget(self, mock_say, mock_app_client, mock_openai):
+        history = [{"role": "user", "content": "a" * 400} for _ in range(10)]  # 104 tokens each
+
+        with (
+            patch.object(handler, "MAX_TOKENS_OPENAI", 500),
+            patch.object(handler, "conversations_replies", return_value=history),
+            patch.object(handler, "reply_text") as mock_reply_text,
+        ):
+            handler.conversation(mock_say, "thread-1", "b" * 400, "C_CHAN", "U_USER", "msg-001")
+
+        messages = mock_reply_text.call_args[0][0]
+        assert sum(handler.count_message_tokens(m) for m in messages) <= 500
+        assert messages[-1]["content"] == "b" * 400
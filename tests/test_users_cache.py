@@ -0,0 +1,181 @@
+"""Tests for handler.LRUCache and the cross-invocation display name cache."""
+
+from unittest.mock import patch
+
+from slack_sdk.errors import SlackApiError
+
+import handler
+from tests.conftest import FakeClock, mock_slack_app
+
+# The @app.event decorator on a MagicMock app captures the original function.
+_real_handle_user_change = next(
+    c[0][0] for c in mock_slack_app.event.return_value.call_args_list
+    if c[0][0].__name__ == "handle_user_change"
+)
+
+
+class TestLRUCache:
+    """Tests for handler.LRUCache — TTL, LRU eviction and counters."""
+
+    def test_get_returns_stored_value(self):
+        cache = handler.LRUCache(maxsize=10, ttl=60)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.stats()["hits"] == 1
+
+    def test_missing_key_counts_miss(self):
+        cache = handler.LRUCache(maxsize=10, ttl=60)
+
+        assert cache.get("a") is None
+        assert cache.stats()["misses"] == 1
+
+    def test_entry_expires_after_ttl(self):
+        clock = FakeClock()
+        cache = handler.LRUCache(maxsize=10, ttl=60, clock=clock)
+        cache.set("a", 1)
+
+        clock.now = 61
+
+        assert cache.get("a") is None
+        assert cache.stats()["size"] == 0
+
+    def test_per_entry_ttl_overrides_default(self):
+        clock = FakeClock()
+        cache = handler.LRUCache(maxsize=10, ttl=60, clock=clock)
+        cache.set("a", 1, ttl=5)
+
+        clock.now = 6
+
+        assert cache.get("a") is None
+
+    def test_least_recently_used_is_evicted(self):
+        cache = handler.LRUCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_add_keeps_live_entry(self):
+        clock = FakeClock()
+        cache = handler.LRUCache(maxsize=10, ttl=60, clock=clock)
+
+        assert cache.add("a", 1) is True
+        assert cache.add("a", 2) is False
+        assert cache.get("a") == 1
+
+        clock.now = 61
+
+        assert cache.add("a", 3) is True
+        assert cache.get("a") == 3
+
+    def test_replace_only_touches_live_entries(self):
+        clock = FakeClock()
+        cache = handler.LRUCache(maxsize=10, ttl=60, clock=clock)
+        cache.set("a", 1)
+
+        assert cache.replace("a", 2) is True
+        assert cache.replace("b", 2) is False
+        assert cache.get("a") == 2
+        assert cache.stats()["size"] == 1
+
+        clock.now = 121
+
+        assert cache.replace("a", 3) is False
+        assert cache.get("a") is None
+
+
+class TestGetUserName:
+    """Tests for handler.get_user_name — shared users_info cache."""
+
+    def test_second_lookup_is_served_from_cache(self, mock_app_client):
+        assert handler.get_user_name("U1") == "TestUser"
+        assert handler.get_user_name("U1") == "TestUser"
+
+        mock_app_client.users_info.assert_called_once_with(user="U1")
+
+    def test_cache_is_shared_across_callers(self, mock_app_client):
+        handler.get_reactions([{"name": "thumbsup", "users": ["U1"]}])
+        handler.content_from_message("hello", {}, "U1")
+
+        mock_app_client.users_info.assert_called_once_with(user="U1")
+
+    def test_unknown_user_is_negatively_cached(self, mock_app_client):
+        mock_app_client.users_info.side_effect = SlackApiError(
+            "user_not_found", {"ok": False, "error": "user_not_found"}
+        )
+
+        assert handler.get_user_name("U_GONE") == "Unknown"
+        assert handler.get_user_name("U_GONE") == "Unknown"
+
+        mock_app_client.users_info.side_effect = None
+        assert mock_app_client.users_info.call_count == 1
+
+    def test_none_user_skips_lookup(self, mock_app_client):
+        assert handler.get_user_name(None) == "Unknown"
+
+        mock_app_client.users_info.assert_not_called()
+
+    def test_dynamodb_tier_is_consulted_before_slack(self, mock_app_client, mock_dynamo_table):
+        mock_dynamo_table.get_item.return_value = {
+            "Item": {"id": "user#U1", "name": "Stored", "expire_at": 9999999999}
+        }
+
+        with patch.object(handler, "USERS_CACHE_DYNAMODB", True):
+            assert handler.get_user_name("U1") == "Stored"
+
+        mock_dynamo_table.get_item.assert_called_once_with(Key={"id": "user#U1"})
+        mock_app_client.users_info.assert_not_called()
+
+    def test_dynamodb_tier_is_written_on_miss(self, mock_app_client, mock_dynamo_table):
+        mock_dynamo_table.get_item.return_value = {}
+
+        with patch.object(handler, "USERS_CACHE_DYNAMODB", True):
+            assert handler.get_user_name("U1") == "TestUser"
+
+        item = mock_dynamo_table.put_item.call_args.kwargs["Item"]
+        assert item["id"] == "user#U1"
+        assert item["name"] == "TestUser"
+
+
+class TestHandleUserChange:
+    """user_change events refresh display names that are already cached."""
+
+    def test_user_change_updates_cache(self, mock_app_client):
+        handler.get_user_name("U1")
+
+        _real_handle_user_change(
+            {"event": {"type": "user_change", "user": {"id": "U1", "profile": {"display_name": "Renamed"}}}}
+        )
+
+        assert handler.get_user_name("U1") == "Renamed"
+        mock_app_client.users_info.assert_called_once()
+
+    def test_unknown_user_is_not_cached(self, mock_app_client, mock_dynamo_table):
+        mock_dynamo_table.get_item.return_value = {}
+
+        with patch.object(handler, "USERS_CACHE_DYNAMODB", True):
+            _real_handle_user_change(
+                {"event": {"type": "user_change", "user": {"id": "U2", "profile": {"display_name": "Stranger"}}}}
+            )
+
+        assert handler.users_cache.stats()["size"] == 0
+        mock_dynamo_table.put_item.assert_not_called()
+
+    def test_stored_user_is_refreshed(self, mock_app_client, mock_dynamo_table):
+        mock_dynamo_table.get_item.return_value = {
+            "Item": {"id": "user#U1", "name": "Stored", "expire_at": 9999999999}
+        }
+
+        with patch.object(handler, "USERS_CACHE_DYNAMODB", True):
+            _real_handle_user_change(
+                {"event": {"type": "user_change", "user": {"id": "U1", "profile": {"display_name": "Renamed"}}}}
+            )
+
+        item = mock_dynamo_table.put_item.call_args.kwargs["Item"]
+        assert (item["id"], item["name"]) == ("user#U1", "Renamed")
@@ -0,0 +1,154 @@
+"""Tests for async-acknowledge mode: event queues, lambda_handler enqueue and worker_handler."""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+import handler
+from tests.conftest import make_lambda_event, make_slack_event
+
+
+@pytest.fixture
+def memory_queue():
+    """Enable async-acknowledge mode with an in-process queue."""
+    queue = handler.MemoryEventQueue()
+    with (
+        patch.object(handler, "EVENT_QUEUE", "memory"),
+        patch.object(handler, "event_queue", queue),
+    ):
+        yield queue
+
+
+class TestEventQueues:
+    """Round-trips through the local queue implementations."""
+
+    def test_memory_queue_fifo(self):
+        queue = handler.MemoryEventQueue()
+        queue.put("a")
+        queue.put("b")
+
+        items = queue.get()
+
+        assert [body for _, body in items] == ["a", "b"]
+        assert queue.get() == []
+
+    def test_sqlite_queue_hides_taken_items_until_deleted(self, tmp_path):
+        queue = handler.SQLiteEventQueue(str(tmp_path / "events.db"))
+        queue.put("a")
+        queue.put("b")
+
+        first = queue.get(max_count=1)
+        second = queue.get()
+
+        assert [body for _, body in first] == ["a"]
+        assert [body for _, body in second] == ["b"]
+
+        queue.delete(first[0][0])
+        queue.delete(second[0][0])
+        assert queue.get() == []
+
+    def test_sqlite_queue_redelivers_after_visibility_timeout(self, tmp_path):
+        queue = handler.SQLiteEventQueue(str(tmp_path / "events.db"), visibility_timeout=0)
+        queue.put("a")
+
+        queue.get()
+
+        assert [body for _, body in queue.get()] == ["a"]
+
+    def test_unknown_queue_raises(self):
+        with (
+            patch.object(handler, "EVENT_QUEUE", "bogus"),
+            patch.object(handler, "event_queue", None),
+        ):
+            with pytest.raises(ValueError):
+                handler.get_event_queue()
+
+
+class TestLambdaHandlerAsyncAck:
+    """lambda_handler enqueues instead of running the bolt pipeline."""
+
+    def test_signed_event_is_enqueued(self, memory_queue, mock_dynamo_table):
+        event = make_lambda_event(make_slack_event(text="hello"))
+
+        with patch.object(handler.handler, "handle") as mock_handle:
+            result = handler.lambda_handler(event, {})
+
+        assert result["statusCode"] == 200
+        mock_handle.assert_not_called()
+        items = memory_queue.get()
+        assert len(items) == 1
+        assert json.loads(items[0][1])["event"]["text"] == "hello"
+
+    def test_bad_signature_is_rejected(self, memory_queue, mock_dynamo_table):
+        event = make_lambda_event(make_slack_event(text="hello"), secret="wrong")
+
+        result = handler.lambda_handler(event, {})
+
+        assert result["statusCode"] == 401
+        assert memory_queue.get() == []
+
+    def test_bad_signature_leaves_dedupe_state_alone(self, memory_queue, mock_dynamo_table):
+        body = make_slack_event(text="hello")
+
+        handler.lambda_handler(make_lambda_event(body, secret="wrong"), {})
+        result = handler.lambda_handler(make_lambda_event(body), {})
+
+        assert result["statusCode"] == 200
+        assert "X-Slack-No-Retry" not in result["headers"]
+        assert len(memory_queue.get()) == 1
+        mock_dynamo_table.put_item.assert_called_once()
+
+
+class TestWorkerHandler:
+    """worker_handler dispatches queued events to the event handlers."""
+
+    def test_drains_local_queue(self, memory_queue):
+        body = make_slack_event(text="hello")
+        body["event"]["type"] = "app_mention"
+        memory_queue.put(json.dumps(body))
+
+        with patch.object(handler, "handle_mention") as mock_mention:
+            result = handler.worker_handler({}, None)
+
+        assert result == {"processed": 1}
+        mock_mention.assert_called_once()
+        assert mock_mention.call_args[0][0] == body
+        assert memory_queue.get() == []
+
+    def test_processes_sqs_records(self):
+        body = make_slack_event(text="hello")
+        body["event"]["type"] = "message"
+
+        with patch.object(handler, "handle_message") as mock_message:
+            result = handler.worker_handler({"Records": [{"body": json.dumps(body)}]}, None)
+
+        assert result == {"processed": 1}
+        say = mock_message.call_args[0][1]
+        assert say.channel == "C_CHAN"
+
+    def test_failed_sqs_record_is_logged_not_redelivered(self, capsys):
+        bodies = []
+        for text in ["first", "second"]:
+            body = make_slack_event(text=text)
+            body["event"]["type"] = "app_mention"
+            bodies.append({"body": json.dumps(body)})
+
+        with patch.object(handler, "handle_mention", side_effect=[Exception("boom"), None]) as mock_mention:
+            result = handler.worker_handler({"Records": bodies}, None)
+
+        assert result == {"processed": 2}
+        assert mock_mention.call_count == 2
+        assert '"event": "worker_handler"' in capsys.readouterr().out
+
+    def test_failed_event_does_not_block_queue(self, memory_queue):
+        for text in ["first", "second"]:
+            body = make_slack_event(text=text)
+            body["event"]["type"] = "app_mention"
+            memory_queue.put(json.dumps(body))
+
+        with patch.object(handler, "handle_mention", side_effect=[Exception("boom"), None]) as mock_mention:
+            result = handler.worker_handler({}, None)
+
+        assert result == {"processed": 2}
+        assert mock_mention.call_count == 2